@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import re
 from dotenv import load_dotenv
 import sys
 
@@ -42,6 +43,7 @@ SECRET_KEY = GEODJANGO_SECRET_KEY
 IS_HEROKU_APP = "DYNO" in os.environ and not "CI" in os.environ
 
 # SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
 if not IS_HEROKU_APP:
     DEBUG = True
 
@@ -80,6 +82,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Report the SQL run by each request in development and tests
+# (see route_rangers_api.middleware)
+if DEBUG or "test" in sys.argv:
+    MIDDLEWARE.insert(0, "route_rangers_api.middleware.QueryBudgetMiddleware")
+
 
 ROOT_URLCONF = "geodjango.urls"
 
@@ -126,6 +133,29 @@ if "test" in sys.argv or "test_coverage" in sys.argv:
     DATABASES["default"]["ENGINE"] = "django.db.backends.sqlite3"
     DATABASES["default"]["NAME"] = "db.sqlite3"
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Stored in the database so that every dyno and the ingestion scripts share it.
+# The table is created with `python -m manage createcachetable`
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "route_rangers_cache",
+        "TIMEOUT": 60 * 60 * 6,
+        # every mode and bounding box of a map layer takes one entry
+        "OPTIONS": {"MAX_ENTRIES": 200_000},
+    }
+}
+
+# Survey write buffer
+# Path of a SQLite file the survey pages append their answers to instead of
+# writing them to the database, applied by
+# `python -m manage runscript flush_survey_buffer`. Unset to write them on the
+# request. See route_rangers_api/utils/survey_buffer.py
+
+SURVEY_WRITE_BUFFER = os.getenv("SURVEY_WRITE_BUFFER")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -165,6 +195,18 @@ print(f"Base dir is: {BASE_DIR}")
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
 
+def is_fingerprinted_file(path, url):
+    """
+    Files with a content hash in their name (see
+    route_rangers_api.utils.static_artifacts) never change, let clients
+    cache them forever
+    """
+    return re.search(r"\.[0-9a-f]{12}\.[a-z]+$", url) is not None
+
+
+WHITENOISE_IMMUTABLE_FILE_TEST = is_fingerprinted_file
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
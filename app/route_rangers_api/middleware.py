@@ -0,0 +1,43 @@
+import logging
+
+from route_rangers_api.utils.query_budget import record_queries
+
+logger = logging.getLogger(__name__)
+
+# requests running more queries than this are logged
+QUERY_WARNING_THRESHOLD = 20
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the queries run by every request and report them in the response
+    headers (X-Query-Count, X-Query-Time and Server-Timing, shown by the
+    browser dev tools). Requests running too many or duplicated queries are
+    logged. Only enabled in development and tests, see settings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        total_ms = recorder.total_time * 1000
+        response["X-Query-Count"] = str(recorder.count)
+        response["X-Query-Time"] = f"{total_ms:.1f}ms"
+        response["Server-Timing"] = (
+            f'db;dur={total_ms:.1f};desc="{recorder.count} queries"'
+        )
+
+        duplicates = recorder.duplicates
+        if recorder.count > QUERY_WARNING_THRESHOLD or duplicates:
+            logger.warning(
+                "%s ran %s queries in %.1fms, %s repeated: %s",
+                request.path,
+                recorder.count,
+                total_ms,
+                len(duplicates),
+                "; ".join(f"{n}x {sql}" for sql, n in duplicates.items()),
+            )
+        return response
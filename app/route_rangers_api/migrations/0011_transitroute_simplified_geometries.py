@@ -0,0 +1,54 @@
+# Generated by Django 5.0.4 on 2024-05-28 18:02
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+# Same tolerances as utils.geometry_processing.ROUTE_SIMPLIFICATION_LEVELS,
+# hardcoded so the migration does not change if the constants do
+BACKFILL_SIMPLIFIED_ROUTES = """
+UPDATE route_rangers_api_transitroute SET
+    geo_simplified_fine = ST_Multi(
+        ST_SimplifyPreserveTopology(geo_representation, 0.00005)
+    ),
+    geo_simplified_medium = ST_Multi(
+        ST_SimplifyPreserveTopology(geo_representation, 0.0002)
+    ),
+    geo_simplified_coarse = ST_Multi(
+        ST_SimplifyPreserveTopology(geo_representation, 0.001)
+    );
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "route_rangers_api",
+            "0010_alter_surveyresponse_transit_improvement_open_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transitroute",
+            name="geo_simplified_fine",
+            field=django.contrib.gis.db.models.fields.MultiLineStringField(
+                null=True, srid=4326
+            ),
+        ),
+        migrations.AddField(
+            model_name="transitroute",
+            name="geo_simplified_medium",
+            field=django.contrib.gis.db.models.fields.MultiLineStringField(
+                null=True, srid=4326
+            ),
+        ),
+        migrations.AddField(
+            model_name="transitroute",
+            name="geo_simplified_coarse",
+            field=django.contrib.gis.db.models.fields.MultiLineStringField(
+                null=True, srid=4326
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SIMPLIFIED_ROUTES, migrations.RunSQL.noop),
+    ]
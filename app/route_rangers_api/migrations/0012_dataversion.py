@@ -0,0 +1,41 @@
+# Generated by Django 5.0.4 on 2024-05-28 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0011_transitroute_simplified_geometries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                        unique=True,
+                    ),
+                ),
+                ("version", models.PositiveIntegerField(default=1)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
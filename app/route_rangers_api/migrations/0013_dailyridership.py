@@ -0,0 +1,89 @@
+# Generated by Django 5.0.4 on 2024-05-29 10:15
+
+from django.db import migrations, models
+
+# Build the rollup from the ridership already ingested
+BACKFILL_DAILY_RIDERSHIP = """
+INSERT INTO route_rangers_api_dailyridership
+    (city, mode, unit_level, date, ridership)
+SELECT r.city, r.mode, 'route', rr.date, SUM(rr.ridership)
+FROM route_rangers_api_ridershiproute rr
+JOIN route_rangers_api_transitroute r ON r.id = rr.route_id
+GROUP BY r.city, r.mode, rr.date
+UNION ALL
+SELECT s.city, s.mode, 'station', rs.date, SUM(rs.ridership)
+FROM route_rangers_api_ridershipstation rs
+JOIN route_rangers_api_transitstation s ON s.id = rs.station_id
+GROUP BY s.city, s.mode, rs.date
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0012_dataversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyRidership",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "mode",
+                    models.IntegerField(
+                        choices=[
+                            (0, "Tram, Streetcar, Light rail."),
+                            (1, "Subway, Metro"),
+                            (2, "Rail"),
+                            (3, "Bus"),
+                            (4, "Ferry"),
+                            (5, "Cable car"),
+                            (6, " Aerial lift, suspended cable car"),
+                            (7, "Funicular"),
+                            (11, "Trolleybus"),
+                            (12, "Monorail"),
+                        ],
+                        verbose_name="Mode of transportation",
+                    ),
+                ),
+                (
+                    "unit_level",
+                    models.CharField(
+                        choices=[("route", "Route"), ("station", "Station")],
+                        max_length=10,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("ridership", models.BigIntegerField()),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("city", "mode", "unit_level", "date"),
+                        name="daily_ridership",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_DAILY_RIDERSHIP, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 5.0.4 on 2024-05-29 14:40
+
+from django.db import migrations, models
+
+# Rank the ridership already ingested, same as utils.leaderboards for every
+# year and month in the data: the top 50 units of each mode by average daily
+# ridership, ties broken by name. Weekends are Saturday and Sunday.
+BACKFILL_LEADERBOARDS = """
+WITH ridership AS (
+    SELECT s.city, s.mode, 'station' AS unit_level, s.station_name AS name,
+        rs.date, rs.ridership
+    FROM route_rangers_api_ridershipstation rs
+    JOIN route_rangers_api_transitstation s ON s.id = rs.station_id
+    UNION ALL
+    SELECT r.city, r.mode, 'route', r.route_name, rr.date, rr.ridership
+    FROM route_rangers_api_ridershiproute rr
+    JOIN route_rangers_api_transitroute r ON r.id = rr.route_id
+),
+averages AS (
+    SELECT city, mode, unit_level,
+        CASE WHEN extract(isodow FROM date) IN (6, 7)
+            THEN 'weekend' ELSE 'weekday' END AS day_type,
+        period, name, sum(ridership) / count(ridership) AS avg_ridership
+    FROM ridership
+    CROSS JOIN LATERAL (
+        VALUES (to_char(date, 'YYYY')), (to_char(date, 'YYYY-MM'))
+    ) AS periods (period)
+    GROUP BY 1, 2, 3, 4, 5, 6
+),
+ranked AS (
+    SELECT *, row_number() OVER (
+        PARTITION BY city, mode, unit_level, day_type, period
+        ORDER BY avg_ridership DESC, name COLLATE "C"
+    ) AS rank
+    FROM averages
+)
+INSERT INTO route_rangers_api_leaderboard
+    (city, mode, unit_level, day_type, period, rank, name, avg_ridership)
+SELECT city, mode, unit_level, day_type, period, rank, name, avg_ridership
+FROM ranked
+WHERE rank <= 50
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0013_dailyridership"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Leaderboard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "mode",
+                    models.IntegerField(
+                        choices=[
+                            (0, "Tram, Streetcar, Light rail."),
+                            (1, "Subway, Metro"),
+                            (2, "Rail"),
+                            (3, "Bus"),
+                            (4, "Ferry"),
+                            (5, "Cable car"),
+                            (6, " Aerial lift, suspended cable car"),
+                            (7, "Funicular"),
+                            (11, "Trolleybus"),
+                            (12, "Monorail"),
+                        ],
+                        verbose_name="Mode of transportation",
+                    ),
+                ),
+                (
+                    "unit_level",
+                    models.CharField(
+                        choices=[("route", "Route"), ("station", "Station")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "day_type",
+                    models.CharField(
+                        choices=[("weekday", "Weekday"), ("weekend", "Weekend")],
+                        max_length=10,
+                    ),
+                ),
+                ("period", models.CharField(max_length=7)),
+                ("rank", models.PositiveIntegerField()),
+                ("name", models.CharField(max_length=64)),
+                ("avg_ridership", models.IntegerField()),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "city",
+                            "mode",
+                            "unit_level",
+                            "day_type",
+                            "period",
+                            "rank",
+                        ),
+                        name="leaderboard_rank",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_LEADERBOARDS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2024-05-30 09:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0014_leaderboard"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ridershiproute",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["date"], name="route_ridership_date_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ridershiproute",
+            index=models.Index(
+                fields=["route", "date"],
+                include=("ridership",),
+                name="route_ridership_covering",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ridershipstation",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["date"], name="station_ridership_date_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ridershipstation",
+            index=models.Index(
+                fields=["station", "date"],
+                include=("ridership",),
+                name="station_ridership_covering",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transitroute",
+            index=models.Index(fields=["city", "mode"], name="route_city_mode"),
+        ),
+        migrations.AddIndex(
+            model_name="transitstation",
+            index=models.Index(fields=["city", "mode"], name="station_city_mode"),
+        ),
+    ]
@@ -0,0 +1,189 @@
+# Generated by Django 5.0.4 on 2024-05-30 16:40
+
+from django.db import migrations, models
+
+CITY_CHOICES = [("CHI", "Chicago"), ("NYC", "New York"), ("PDX", "Portland")]
+
+# Rebuild a ridership table as one partitioned by year (RANGE on date) and
+# each year by city (LIST), with the city copied from the route or station.
+# Years in the data get their partitions here, later years are added by
+# utils.ridership_partitions before ingesting them. Rows outside every
+# partition land in the default ones.
+PARTITION_RIDERSHIP = """
+ALTER TABLE route_rangers_api_{table} RENAME TO route_rangers_api_{table}_old;
+ALTER TABLE route_rangers_api_{table}_old DROP CONSTRAINT {unit}_ridership;
+ALTER TABLE route_rangers_api_{table}_old
+    RENAME CONSTRAINT route_rangers_api_{table}_pkey
+    TO route_rangers_api_{table}_old_pkey;
+DROP INDEX {unit}_ridership_date_brin;
+DROP INDEX {unit}_ridership_covering;
+
+CREATE TABLE route_rangers_api_{table} (
+    id bigint NOT NULL,
+    date date NOT NULL,
+    ridership integer NOT NULL,
+    {unit}_id bigint NOT NULL
+        REFERENCES route_rangers_api_transit{unit} (id)
+        DEFERRABLE INITIALLY DEFERRED,
+    city varchar(30) NOT NULL,
+    CONSTRAINT route_rangers_api_{table}_pkey PRIMARY KEY (id, date, city),
+    CONSTRAINT {unit}_ridership UNIQUE ({unit}_id, date, city)
+) PARTITION BY RANGE (date);
+
+DO $$
+DECLARE
+    year integer;
+    city text;
+BEGIN
+    FOR year IN
+        SELECT DISTINCT extract(year FROM date)::integer
+        FROM route_rangers_api_{table}_old
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE route_rangers_api_{table}_%s '
+            'PARTITION OF route_rangers_api_{table} '
+            'FOR VALUES FROM (%L) TO (%L) PARTITION BY LIST (city)',
+            year, make_date(year, 1, 1), make_date(year + 1, 1, 1)
+        );
+        FOREACH city IN ARRAY ARRAY[{cities}] LOOP
+            EXECUTE format(
+                'CREATE TABLE route_rangers_api_{table}_%s_%s '
+                'PARTITION OF route_rangers_api_{table}_%s FOR VALUES IN (%L)',
+                year, lower(city), year, city
+            );
+        END LOOP;
+        EXECUTE format(
+            'CREATE TABLE route_rangers_api_{table}_%s_default '
+            'PARTITION OF route_rangers_api_{table}_%s DEFAULT',
+            year, year
+        );
+    END LOOP;
+END $$;
+CREATE TABLE route_rangers_api_{table}_default
+    PARTITION OF route_rangers_api_{table} DEFAULT;
+
+INSERT INTO route_rangers_api_{table} (id, date, ridership, {unit}_id, city)
+SELECT old.id, old.date, old.ridership, old.{unit}_id, unit.city
+FROM route_rangers_api_{table}_old old
+JOIN route_rangers_api_transit{unit} unit ON unit.id = old.{unit}_id;
+DROP TABLE route_rangers_api_{table}_old;
+
+CREATE SEQUENCE route_rangers_api_{table}_id_seq
+    OWNED BY route_rangers_api_{table}.id;
+SELECT setval(
+    'route_rangers_api_{table}_id_seq',
+    COALESCE(max(id), 0) + 1,
+    false
+) FROM route_rangers_api_{table};
+ALTER TABLE route_rangers_api_{table}
+    ALTER COLUMN id SET DEFAULT nextval('route_rangers_api_{table}_id_seq');
+
+CREATE INDEX {unit}_ridership_date_brin
+    ON route_rangers_api_{table} USING brin (date);
+CREATE INDEX {unit}_ridership_covering
+    ON route_rangers_api_{table} ({unit}_id, date) INCLUDE (ridership);
+"""
+
+# Reverse of PARTITION_RIDERSHIP: rebuild the plain table as created by
+# Django, without the city, and copy the rows back
+UNPARTITION_RIDERSHIP = """
+ALTER TABLE route_rangers_api_{table} RENAME TO route_rangers_api_{table}_old;
+ALTER TABLE route_rangers_api_{table}_old DROP CONSTRAINT {unit}_ridership;
+ALTER TABLE route_rangers_api_{table}_old
+    RENAME CONSTRAINT route_rangers_api_{table}_pkey
+    TO route_rangers_api_{table}_old_pkey;
+ALTER SEQUENCE route_rangers_api_{table}_id_seq
+    RENAME TO route_rangers_api_{table}_old_id_seq;
+DROP INDEX {unit}_ridership_date_brin;
+DROP INDEX {unit}_ridership_covering;
+
+CREATE TABLE route_rangers_api_{table} (
+    id bigint GENERATED BY DEFAULT AS IDENTITY,
+    date date NOT NULL,
+    ridership integer NOT NULL,
+    {unit}_id bigint NOT NULL
+        REFERENCES route_rangers_api_transit{unit} (id)
+        DEFERRABLE INITIALLY DEFERRED,
+    CONSTRAINT route_rangers_api_{table}_pkey PRIMARY KEY (id),
+    CONSTRAINT {unit}_ridership UNIQUE ({unit}_id, date)
+);
+
+INSERT INTO route_rangers_api_{table} (id, date, ridership, {unit}_id)
+SELECT id, date, ridership, {unit}_id
+FROM route_rangers_api_{table}_old;
+DROP TABLE route_rangers_api_{table}_old;
+
+SELECT setval(
+    pg_get_serial_sequence('route_rangers_api_{table}', 'id'),
+    COALESCE(max(id), 0) + 1,
+    false
+) FROM route_rangers_api_{table};
+
+CREATE INDEX {unit}_ridership_date_brin
+    ON route_rangers_api_{table} USING brin (date);
+CREATE INDEX {unit}_ridership_covering
+    ON route_rangers_api_{table} ({unit}_id, date) INCLUDE (ridership);
+"""
+
+
+def partition_sql(table: str, unit: str) -> str:
+    cities = ", ".join(f"'{city}'" for city, _ in CITY_CHOICES)
+    return PARTITION_RIDERSHIP.format(table=table, unit=unit, cities=cities)
+
+
+def ridership_partitions(table: str, unit: str) -> migrations.RunSQL:
+    return migrations.RunSQL(
+        partition_sql(table, unit),
+        UNPARTITION_RIDERSHIP.format(table=table, unit=unit),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0015_ridership_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                ridership_partitions("ridershiproute", "route"),
+                ridership_partitions("ridershipstation", "station"),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name="ridershiproute",
+                    name="city",
+                    field=models.CharField(choices=CITY_CHOICES, max_length=30),
+                    preserve_default=False,
+                ),
+                migrations.AddField(
+                    model_name="ridershipstation",
+                    name="city",
+                    field=models.CharField(choices=CITY_CHOICES, max_length=30),
+                    preserve_default=False,
+                ),
+                migrations.RemoveConstraint(
+                    model_name="ridershiproute",
+                    name="route_ridership",
+                ),
+                migrations.AddConstraint(
+                    model_name="ridershiproute",
+                    constraint=models.UniqueConstraint(
+                        fields=("route_id", "date", "city"), name="route_ridership"
+                    ),
+                ),
+                migrations.RemoveConstraint(
+                    model_name="ridershipstation",
+                    name="station_ridership",
+                ),
+                migrations.AddConstraint(
+                    model_name="ridershipstation",
+                    constraint=models.UniqueConstraint(
+                        fields=("station_id", "date", "city"),
+                        name="station_ridership",
+                    ),
+                ),
+            ],
+        ),
+    ]
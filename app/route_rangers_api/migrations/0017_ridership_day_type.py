@@ -0,0 +1,129 @@
+# Generated by Django 5.0.4 on 2024-05-31 10:20
+
+import datetime
+from django.db import migrations, models
+
+# Rows are added as weekdays, then weekends and holidays are set
+BACKFILL_WEEKENDS = """
+UPDATE route_rangers_api_{table}
+SET day_type = CASE extract(isodow FROM date)
+    WHEN 6 THEN 'saturday' WHEN 7 THEN 'sunday' END
+WHERE extract(isodow FROM date) IN (6, 7)
+"""
+
+# Same federal holidays as utils.service_calendar, hardcoded so the migration
+# does not change if the calendar does.
+# (month, day, first year) of the holidays on a fixed date, observed on the
+# closest weekday
+FIXED_HOLIDAYS = [
+    (1, 1, None),
+    (6, 19, 2021),
+    (7, 4, None),
+    (11, 11, None),
+    (12, 25, None),
+]
+# (month, weekday with Monday as 0, nth or -1 for the last one)
+FLOATING_HOLIDAYS = [
+    (1, 0, 3),
+    (2, 0, 3),
+    (5, 0, -1),
+    (9, 0, 1),
+    (10, 0, 2),
+    (11, 3, 4),
+]
+
+
+def holidays_of(year):
+    holidays = []
+    for month, day, first_year in FIXED_HOLIDAYS:
+        if first_year is not None and year < first_year:
+            continue
+        holiday = datetime.date(year, month, day)
+        if holiday.weekday() == 5:
+            holiday -= datetime.timedelta(days=1)
+        elif holiday.weekday() == 6:
+            holiday += datetime.timedelta(days=1)
+        holidays.append(holiday)
+    for month, weekday, n in FLOATING_HOLIDAYS:
+        if n > 0:
+            first = datetime.date(year, month, 1)
+            offset = (weekday - first.weekday()) % 7 + 7 * (n - 1)
+            holidays.append(first + datetime.timedelta(days=offset))
+        else:
+            last = datetime.date(year + month // 12, month % 12 + 1, 1)
+            last -= datetime.timedelta(days=1)
+            offset = (last.weekday() - weekday) % 7
+            holidays.append(last - datetime.timedelta(days=offset))
+    return holidays
+
+
+def backfill_holidays(apps, schema_editor):
+    for model_name in ["RidershipRoute", "RidershipStation"]:
+        model = apps.get_model("route_rangers_api", model_name)
+        years = model.objects.dates("date", "year")
+        # New Year's Day can be observed on December 31 of the year before
+        holidays = [
+            holiday
+            for year in years
+            for holiday in [*holidays_of(year.year), *holidays_of(year.year + 1)]
+        ]
+        model.objects.filter(date__in=holidays).update(day_type="holiday")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0016_ridership_partitions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ridershiproute",
+            name="day_type",
+            field=models.CharField(
+                choices=[
+                    ("weekday", "Weekday"),
+                    ("saturday", "Saturday"),
+                    ("sunday", "Sunday"),
+                    ("holiday", "Holiday"),
+                ],
+                default="weekday",
+                max_length=10,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="ridershipstation",
+            name="day_type",
+            field=models.CharField(
+                choices=[
+                    ("weekday", "Weekday"),
+                    ("saturday", "Saturday"),
+                    ("sunday", "Sunday"),
+                    ("holiday", "Holiday"),
+                ],
+                default="weekday",
+                max_length=10,
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            BACKFILL_WEEKENDS.format(table="ridershiproute"), migrations.RunSQL.noop
+        ),
+        migrations.RunSQL(
+            BACKFILL_WEEKENDS.format(table="ridershipstation"), migrations.RunSQL.noop
+        ),
+        migrations.RunPython(backfill_holidays, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="ridershiproute",
+            index=models.Index(
+                fields=["day_type", "date"], name="route_ridership_day_type"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ridershipstation",
+            index=models.Index(
+                fields=["day_type", "date"], name="station_ridership_day_type"
+            ),
+        ),
+    ]
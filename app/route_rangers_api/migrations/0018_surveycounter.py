@@ -0,0 +1,81 @@
+# Generated by Django 5.0.4 on 2024-05-31 15:05
+
+from django.db import migrations, models
+
+# Count the answers already collected, see utils.survey_counters
+BACKFILL_SURVEY_COUNTERS = """
+INSERT INTO route_rangers_api_surveycounter (city, question, answer, count)
+SELECT u.city, 'users', 1, count(*)
+FROM route_rangers_api_surveyuser u
+GROUP BY u.city
+UNION ALL
+SELECT u.city, 'frequent_transit', u.frequent_transit, count(*)
+FROM route_rangers_api_surveyuser u
+WHERE u.frequent_transit IS NOT NULL
+GROUP BY u.city, u.frequent_transit
+UNION ALL
+SELECT r.city, question.name, question.answer, count(*)
+FROM route_rangers_api_surveyresponse r
+JOIN route_rangers_api_surveyuser u ON u.user_id = r.user_id_id
+CROSS JOIN LATERAL (
+    VALUES
+        ('modes_of_transit', r.modes_of_transit),
+        ('trip_tod', r.trip_tod),
+        ('satisfied', r.satisfied),
+        (
+            CASE u.car_owner
+                WHEN 1 THEN 'transit_improvement_drivers'
+                WHEN 2 THEN 'transit_improvement_riders'
+            END,
+            r.transit_improvement
+        )
+) AS question (name, answer)
+WHERE question.name IS NOT NULL AND question.answer IS NOT NULL
+GROUP BY r.city, question.name, question.answer
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0017_ridership_day_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SurveyCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("question", models.CharField(max_length=32)),
+                ("answer", models.IntegerField()),
+                ("count", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("city", "question", "answer"), name="survey_counter"
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SURVEY_COUNTERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2024-06-01 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0018_surveycounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteDensityCell",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("x", models.IntegerField()),
+                ("y", models.IntegerField()),
+                ("routes", models.IntegerField(default=0)),
+                ("starts", models.IntegerField(default=0)),
+                ("ends", models.IntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("city", "x", "y"), name="route_density_cell"
+                    )
+                ],
+            },
+        ),
+    ]
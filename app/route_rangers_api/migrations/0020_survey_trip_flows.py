@@ -0,0 +1,141 @@
+# Generated by Django 5.0.4 on 2024-06-01 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Locate the responses already collected in the tracts and count their trips,
+# see utils.survey_flows
+BACKFILL_TRACTS = """
+UPDATE route_rangers_api_surveyresponse r
+SET origin_tract_id = (
+        SELECT d.id FROM route_rangers_api_demographics d
+        WHERE ST_Contains(d.geographic_delimitation, r.starting_point)
+        ORDER BY d.id LIMIT 1
+    ),
+    destination_tract_id = (
+        SELECT d.id FROM route_rangers_api_demographics d
+        WHERE ST_Contains(d.geographic_delimitation, r.end_point)
+        ORDER BY d.id LIMIT 1
+    )
+"""
+BACKFILL_FLOWS = """
+INSERT INTO route_rangers_api_surveytripflow
+    (city, origin_id, destination_id, modes_of_transit, trip_tod, count)
+SELECT city, origin_tract_id, destination_tract_id, modes_of_transit, trip_tod,
+    count(*)
+FROM route_rangers_api_surveyresponse
+WHERE origin_tract_id IS NOT NULL AND destination_tract_id IS NOT NULL
+    AND modes_of_transit IS NOT NULL AND trip_tod IS NOT NULL
+GROUP BY city, origin_tract_id, destination_tract_id, modes_of_transit, trip_tod
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0019_routedensitycell"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="surveyresponse",
+            name="destination_tract",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="route_rangers_api.demographics",
+            ),
+        ),
+        migrations.AddField(
+            model_name="surveyresponse",
+            name="origin_tract",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="route_rangers_api.demographics",
+            ),
+        ),
+        migrations.CreateModel(
+            name="SurveyTripFlow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "city",
+                    models.CharField(
+                        choices=[
+                            ("CHI", "Chicago"),
+                            ("NYC", "New York"),
+                            ("PDX", "Portland"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "modes_of_transit",
+                    models.IntegerField(
+                        choices=[
+                            (1, "Bus"),
+                            (2, "Train"),
+                            (3, "Car"),
+                            (4, "Bike"),
+                            (5, "Walking"),
+                            (6, "Rideshare"),
+                        ]
+                    ),
+                ),
+                (
+                    "trip_tod",
+                    models.IntegerField(
+                        choices=[
+                            (1, "Peak commute hours"),
+                            (2, "Daytime"),
+                            (3, "Nighttime"),
+                        ]
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="route_rangers_api.demographics",
+                    ),
+                ),
+                (
+                    "origin",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="route_rangers_api.demographics",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "city",
+                            "origin",
+                            "destination",
+                            "modes_of_transit",
+                            "trip_tod",
+                        ),
+                        name="survey_trip_flow",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_TRACTS, migrations.RunSQL.noop),
+        migrations.RunSQL(BACKFILL_FLOWS, migrations.RunSQL.noop),
+    ]
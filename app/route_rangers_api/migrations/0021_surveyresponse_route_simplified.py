@@ -0,0 +1,42 @@
+# Generated by Django 5.0.4 on 2024-06-02 10:15
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+# Same as utils.geometry_processing.simplify_user_route (tolerance 0.00005,
+# doubled until at most 250 points are left), hardcoded so the migration does
+# not change if the constants do
+BACKFILL_ROUTE_SIMPLIFIED = """
+UPDATE route_rangers_api_surveyresponse SET
+    route_simplified = (
+        SELECT simplified.geom
+        FROM (
+            SELECT 0 AS step, ST_SimplifyPreserveTopology(route, 0.00005) AS geom
+            UNION ALL
+            SELECT step, ST_Simplify(route, 0.00005 * 2 ^ step)
+            FROM generate_series(1, 40) step
+        ) simplified
+        WHERE ST_NPoints(simplified.geom) <= 250
+        ORDER BY simplified.step
+        LIMIT 1
+    )
+WHERE route IS NOT NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("route_rangers_api", "0020_survey_trip_flows"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="surveyresponse",
+            name="route_simplified",
+            field=django.contrib.gis.db.models.fields.LineStringField(
+                null=True, srid=4326
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_ROUTE_SIMPLIFIED, migrations.RunSQL.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import BrinIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
 from app.route_rangers_api.utils.city_mapping import (
     CITIES_CHOICES,
@@ -78,6 +79,17 @@ class Demographics(models.Model):
 #################################
 
 
+UNIT_LEVELS = [("route", "Route"), ("station", "Station")]
+DAY_TYPES = [("weekday", "Weekday"), ("weekend", "Weekend")]
+# see utils.service_calendar
+SERVICE_DAY_TYPES = [
+    ("weekday", "Weekday"),
+    ("saturday", "Saturday"),
+    ("sunday", "Sunday"),
+    ("holiday", "Holiday"),
+]
+
+
 class TransitModes(models.IntegerChoices):
     LIGHT_RAIL = 0, "Tram, Streetcar, Light rail."
     SUBWAY = 1, "Subway, Metro"
@@ -101,6 +113,11 @@ class TransitRoute(models.Model):
     route_name = models.CharField(max_length=64)
     color = models.CharField(max_length=30, null=True)
     geo_representation = models.MultiLineStringField()
+    # Simplified copies of geo_representation filled at ingestion time
+    # (see utils.geometry_processing.ROUTE_SIMPLIFICATION_LEVELS)
+    geo_simplified_fine = models.MultiLineStringField(null=True)
+    geo_simplified_medium = models.MultiLineStringField(null=True)
+    geo_simplified_coarse = models.MultiLineStringField(null=True)
     mode = models.IntegerField(
         verbose_name="Mode of transportation", choices=TransitModes.choices
     )
@@ -109,6 +126,7 @@ class TransitRoute(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["city", "route_id"], name="city route id")
         ]
+        indexes = [models.Index(fields=["city", "mode"], name="route_city_mode")]
 
 
 class TransitStation(models.Model):
@@ -129,6 +147,7 @@ class TransitStation(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["city", "station_id"], name="city station")
         ]
+        indexes = [models.Index(fields=["city", "mode"], name="station_city_mode")]
 
 
 class StationRouteRelation(models.Model):
@@ -150,32 +169,121 @@ class StationRouteRelation(models.Model):
 
 class RidershipRoute(models.Model):
     """
-    Class that represent ridership at the route level
+    Class that represent ridership at the route level.
+    The table is partitioned by year and each year by city (see
+    utils.ridership_partitions), so filter on date and city to prune them.
     """
 
     route = models.ForeignKey(TransitRoute, on_delete=models.PROTECT)
+    # copy of route.city, the partition key within a year
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
     date = models.DateField()
+    # set at ingestion from the date, see utils.service_calendar
+    day_type = models.CharField(max_length=10, choices=SERVICE_DAY_TYPES)
     ridership = models.IntegerField()
 
     class Meta:
+        # unique constraints of a partitioned table must include its keys
         constraints = [
-            models.UniqueConstraint(fields=["route_id", "date"], name="route_ridership")
+            models.UniqueConstraint(
+                fields=["route_id", "date", "city"], name="route_ridership"
+            )
+        ]
+        indexes = [
+            # rows are appended in date order, so a BRIN index stays tiny and
+            # still narrows date range scans down to a few blocks
+            BrinIndex(fields=["date"], name="route_ridership_date_brin"),
+            # lets the per route sums be answered from the index alone
+            models.Index(
+                fields=["route", "date"],
+                include=["ridership"],
+                name="route_ridership_covering",
+            ),
+            models.Index(fields=["day_type", "date"], name="route_ridership_day_type"),
         ]
 
 
 class RidershipStation(models.Model):
     """
-    Class that represent ridership at the station level
+    Class that represent ridership at the station level, partitioned like
+    RidershipRoute
     """
 
     station = models.ForeignKey(TransitStation, on_delete=models.PROTECT)
+    # copy of station.city, the partition key within a year
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
     date = models.DateField()
+    day_type = models.CharField(max_length=10, choices=SERVICE_DAY_TYPES)
     ridership = models.IntegerField()
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["station_id", "date"], name="station_ridership"
+                fields=["station_id", "date", "city"], name="station_ridership"
+            )
+        ]
+        indexes = [
+            BrinIndex(fields=["date"], name="station_ridership_date_brin"),
+            models.Index(
+                fields=["station", "date"],
+                include=["ridership"],
+                name="station_ridership_covering",
+            ),
+            models.Index(
+                fields=["day_type", "date"], name="station_ridership_day_type"
+            ),
+        ]
+
+
+class DailyRidership(models.Model):
+    """
+    Class that represents the total ridership of a city for a day by mode of
+    transit and the level it is reported at (route or station). It is rebuilt
+    from RidershipRoute and RidershipStation by the ingestion scripts (see
+    utils.ridership_rollup) so the dashboard doesn't scan the raw ridership.
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
+    mode = models.IntegerField(
+        verbose_name="Mode of transportation", choices=TransitModes.choices
+    )
+    unit_level = models.CharField(max_length=10, choices=UNIT_LEVELS)
+    date = models.DateField()
+    ridership = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "mode", "unit_level", "date"],
+                name="daily_ridership",
+            )
+        ]
+
+
+class Leaderboard(models.Model):
+    """
+    Class that represents the stations or routes with the highest average
+    daily ridership of a city for a mode of transit, type of day and period
+    (a year, i.e. 2023, or a month, i.e. 2023-07). It is rebuilt after every
+    ridership ingestion (see utils.leaderboards)
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
+    mode = models.IntegerField(
+        verbose_name="Mode of transportation", choices=TransitModes.choices
+    )
+    unit_level = models.CharField(max_length=10, choices=UNIT_LEVELS)
+    day_type = models.CharField(max_length=10, choices=DAY_TYPES)
+    period = models.CharField(max_length=7)
+    rank = models.PositiveIntegerField()
+    name = models.CharField(max_length=64)
+    avg_ridership = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "mode", "unit_level", "day_type", "period", "rank"],
+                name="leaderboard_rank",
             )
         ]
 
@@ -250,8 +358,17 @@ class SurveyResponse(models.Model):
 
     # Map:
     route = models.LineStringField(null=True)
+    # drawn on the dashboard, see utils.geometry_processing.simplify_user_route
+    route_simplified = models.LineStringField(null=True)
     starting_point = models.PointField(null=True)
     end_point = models.PointField(null=True)
+    # census tracts of the starting and end points, see utils.survey_flows
+    origin_tract = models.ForeignKey(
+        Demographics, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    destination_tract = models.ForeignKey(
+        Demographics, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
 
     # Page 2:
     trip_frequency = models.IntegerField(choices=TRIP_FREQ, null=True)
@@ -275,6 +392,80 @@ class SurveyResponse(models.Model):
         ]
 
 
+class SurveyCounter(models.Model):
+    """
+    Class that represents the number of survey answers of a city that picked
+    an answer to a question. Kept up to date by the survey views (see
+    utils.survey_counters) so the responses page doesn't count every answer
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
+    question = models.CharField(max_length=32)
+    answer = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "question", "answer"], name="survey_counter"
+            )
+        ]
+
+
+class RouteDensityCell(models.Model):
+    """
+    Class that represents a cell of the square grid the user-drawn routes of
+    a city are counted on, kept up to date as routes are submitted (see
+    utils.route_density)
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
+    # floor(longitude / cell size) and floor(latitude / cell size)
+    x = models.IntegerField()
+    y = models.IntegerField()
+    routes = models.IntegerField(default=0)
+    starts = models.IntegerField(default=0)
+    ends = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["city", "x", "y"], name="route_density_cell"
+            )
+        ]
+
+
+class SurveyTripFlow(models.Model):
+    """
+    Class that represents the number of survey trips of a city between two
+    census tracts by mode and time of day, kept up to date as routes are
+    submitted (see utils.survey_flows)
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES)
+    origin = models.ForeignKey(Demographics, on_delete=models.CASCADE, related_name="+")
+    destination = models.ForeignKey(
+        Demographics, on_delete=models.CASCADE, related_name="+"
+    )
+    modes_of_transit = models.IntegerField(choices=MODES_OF_TRANSIT)
+    trip_tod = models.IntegerField(choices=TIME_OF_DAY)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "city",
+                    "origin",
+                    "destination",
+                    "modes_of_transit",
+                    "trip_tod",
+                ],
+                name="survey_trip_flow",
+            )
+        ]
+
+
 class PlannedRoute(models.Model):
     """
     Class that represents answers to 'Plan your route' feature
@@ -285,3 +476,20 @@ class PlannedRoute(models.Model):
     route = models.LineStringField()
     starting_point = models.PointField(null=True)
     end_point = models.PointField(null=True)
+
+
+#################################
+######### CACHE MODELS ##########
+#################################
+
+
+class DataVersion(models.Model):
+    """
+    Class that represents the version of the ingested data of a city. It is
+    bumped after every ingestion and is part of the cache keys, so new data
+    is served right away without flushing the cache
+    """
+
+    city = models.CharField(max_length=30, choices=CITIES_CHOICES, unique=True)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
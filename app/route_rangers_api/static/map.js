@@ -1,4 +1,6 @@
-export function initializeMap(coordinates, stations, iconUrl, userIconUrl, routes, userDrawn) {
+// Stations and routes are drawn with drawTransit(), called by the dashboard
+// every time it loads the ones around the visible extent of the map
+export function initializeMap(coordinates, iconUrl, userIconUrl) {
 
   // Add a tile layer
   var tileLayer = L.tileLayer('https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png', {
@@ -43,101 +45,160 @@ export function initializeMap(coordinates, stations, iconUrl, userIconUrl, route
     6: "Aerial tram"
   };
 
+  var baseMaps = {
+    "base": tileLayer
+  }
+
+  // Initialize layer control, overlays are added as each kind of
+  // station or route shows up
+  var layerControl = L.control.layers(baseMaps, {}).addTo(map);
+
   var markerClusterGroups = {};
+  var routeLayers = {};
 
-  // Add stations layers
-
-  L.geoJSON(stations, {
-    onEachFeature: function (feature, layer) {
-      var x = feature.geometry.coordinates[0];
-      var y = feature.geometry.coordinates[1];
-      var stationName = feature.properties.station_name;
-      var routeType = routeNames[feature.properties.mode];
-
-      var marker = L.marker([x, y], { icon: smallIcon });
-      marker.bindTooltip(stationName + '<br>(' + routeType + ')');
-
-      // create new cluster group for each type of route as needed
-      if (!markerClusterGroups[routeType]) {
-        // This isn't retrieving a valid value from the dictionary
-        // to correctly give different transit types different values
-        // for disableClusteringonZoom. TODO: fix (low priority)
-        var maxZoom = parseInt(zoomEnd[parseInt(routeType, 10)], 10);
-        if (isNaN(maxZoom)) {
-          maxZoom = 14;
-        }
-        markerClusterGroups[routeType] = L.markerClusterGroup({
-          disableClusteringAtZoom: maxZoom
-        });
+  function getMarkerClusterGroup(routeType) {
+    // create new cluster group for each type of route as needed
+    if (!markerClusterGroups[routeType]) {
+      // This isn't retrieving a valid value from the dictionary
+      // to correctly give different transit types different values
+      // for disableClusteringonZoom. TODO: fix (low priority)
+      var maxZoom = parseInt(zoomEnd[parseInt(routeType, 10)], 10);
+      if (isNaN(maxZoom)) {
+        maxZoom = 14;
       }
-      markerClusterGroups[routeType].addLayer(marker);
+      markerClusterGroups[routeType] = L.markerClusterGroup({
+        disableClusteringAtZoom: maxZoom
+      });
+      map.addLayer(markerClusterGroups[routeType]);
+      layerControl.addOverlay(markerClusterGroups[routeType], routeType + " stops");
     }
-  });
+    return markerClusterGroups[routeType];
+  }
 
-  var markerClustersLayer = L.layerGroup();
-  for (var routeType in markerClusterGroups) {
-    markerClustersLayer.addLayer(markerClusterGroups[routeType]);
+  function getRouteLayer(mode) {
+    if (!routeLayers[mode]) {
+      routeLayers[mode] = L.layerGroup();
+      layerControl.addOverlay(routeLayers[mode], mode + " routes");
+    }
+    return routeLayers[mode];
   }
-  map.addLayer(markerClustersLayer);
 
+  // Replace the stations and routes on the map with the given ones
+  function drawTransit(stations, routes) {
+    for (var routeType in markerClusterGroups) {
+      if (routeType !== "User-drawn") {
+        markerClusterGroups[routeType].clearLayers();
+      }
+    }
+    for (var mode in routeLayers) {
+      if (mode !== "User-drawn") {
+        routeLayers[mode].clearLayers();
+      }
+    }
 
-  // Add routes layers
+    // Add stations layers
 
-  var routeLayers = {};
+    L.geoJSON(stations, {
+      onEachFeature: function (feature, layer) {
+        var x = feature.geometry.coordinates[0];
+        var y = feature.geometry.coordinates[1];
+        var stationName = feature.properties.station_name;
+        var routeType = routeNames[feature.properties.mode];
 
-  L.geoJSON(routes, {
-    style: function (feature) {
-      return {
-        color: '#' + feature.properties.color,
-        weight: 3,
-        "opacity": .7
-      };
-    },
-    onEachFeature: function (feature, layer) {
-      var routeType = feature.properties.mode;
-      var mode = routeNames[routeType];
-      if (!routeLayers[mode]) {
-        routeLayers[mode] = L.layerGroup();
+        var marker = L.marker([x, y], { icon: smallIcon });
+        marker.bindTooltip(stationName + '<br>(' + routeType + ')');
+        getMarkerClusterGroup(routeType).addLayer(marker);
       }
-      routeLayers[mode].addLayer(layer);
-      layer.bindPopup(feature.properties.route_name + '<br> (' + mode + ')');
-    }
-  });
+    });
+
+    // Add routes layers
+
+    L.geoJSON(routes, {
+      style: function (feature) {
+        return {
+          color: '#' + feature.properties.color,
+          weight: (map.getZoom() / 4) - 0.5,
+          "opacity": .7
+        };
+      },
+      onEachFeature: function (feature, layer) {
+        var routeType = feature.properties.mode;
+        var mode = routeNames[routeType];
+        getRouteLayer(mode).addLayer(layer);
+        layer.bindPopup(feature.properties.route_name + '<br> (' + mode + ')');
+      }
+    });
+  }
 
   // Add user-drawn route and endpoint layers
 
-  routeLayers["User-drawn"] = L.layerGroup();
-  markerClusterGroups["User-drawn"] = L.markerClusterGroup();
-
-  L.geoJSON(userDrawn, {
-    onEachFeature: function (feature, layer) {
-
-      var geometries = feature.geometry.geometries;
-      geometries.forEach(function (geometry) {
-        if (geometry.type === "LineString") {
-          var user_route = L.polyline(geometry.coordinates, { color: "#aaaacc", opacity: 0.6, });
-          routeLayers["User-drawn"].addLayer(user_route);
-        } else if (geometry.type === "Point") {
-          var coords = geometry.coordinates;
-          if (coords && coords.length === 2) {
-            // TODO: figure out why the coords need to be reversed here and not above
-            var x = coords[1];
-            var y = coords[0];
-            if (x != undefined && y != undefined) {
-              var marker = L.marker([x, y], { icon: userIcon });
-              marker.bindTooltip("User-submitted endpoint");
-              markerClusterGroups["User-drawn"].addLayer(marker);
+  var userRoutes = getRouteLayer("User-drawn");
+  var userMarkers = L.markerClusterGroup();
+  markerClusterGroups["User-drawn"] = userMarkers;
+  layerControl.addOverlay(userMarkers, "User-drawn stops");
+
+  // Called with the user routes once they arrive, and with the new
+  // submissions from the user routes feed
+  function addUserDrawn(userDrawn) {
+    L.geoJSON(userDrawn, {
+      onEachFeature: function (feature, layer) {
+
+        var geometries = feature.geometry.geometries;
+        geometries.forEach(function (geometry) {
+          if (geometry.type === "LineString") {
+            var user_route = L.polyline(geometry.coordinates, { color: "#aaaacc", opacity: 0.6, });
+            userRoutes.addLayer(user_route);
+          } else if (geometry.type === "Point") {
+            var coords = geometry.coordinates;
+            if (coords && coords.length === 2) {
+              // TODO: figure out why the coords need to be reversed here and not above
+              var x = coords[1];
+              var y = coords[0];
+              if (x != undefined && y != undefined) {
+                var marker = L.marker([x, y], { icon: userIcon });
+                marker.bindTooltip("User-submitted endpoint");
+                userMarkers.addLayer(marker);
+              } else {
+                console.error("Invalid coordinates for Point:", coordinates);
+              }
             } else {
-              console.error("Invalid coordinates for Point:", coordinates);
+              console.error("Invalid coordinates array for Point:", coords);
             }
-          } else {
-            console.error("Invalid coordinates array for Point:", coords);
+
           }
+        });
+      }
+    });
+  }
 
-        }
-      });
+  // Grid of how many user-drawn routes cross each cell, served by the
+  // user-routes/density endpoint (see utils/route_density.py)
+  var densityLayer = L.layerGroup();
+  layerControl.addOverlay(densityLayer, "User route density");
+
+  function drawDensity(density) {
+    densityLayer.clearLayers();
+    var stride = density.fields.length;
+    var size = density.cell_size;
+    var maxRoutes = 1;
+    for (var i = 2; i < density.cells.length; i += stride) {
+      maxRoutes = Math.max(maxRoutes, density.cells[i]);
     }
-  });
+    for (var i = 0; i < density.cells.length; i += stride) {
+      var x = density.cells[i];
+      var y = density.cells[i + 1];
+      var routes = density.cells[i + 2];
+      if (routes === 0) {
+        continue;
+      }
+      var cell = L.rectangle(
+        [[y * size, x * size], [(y + 1) * size, (x + 1) * size]],
+        { stroke: false, fillColor: "#d7301f", fillOpacity: 0.15 + 0.6 * (routes / maxRoutes) }
+      );
+      cell.bindTooltip(routes + " routes, " + density.cells[i + 3] + " start, " + density.cells[i + 4] + " end");
+      densityLayer.addLayer(cell);
+    }
+  }
 
   // Adjust width of routes with zoom level
   function updateRouteWidth() {
@@ -149,23 +210,96 @@ export function initializeMap(coordinates, stations, iconUrl, userIconUrl, route
     }
   }
 
-  var baseMaps = {
-    "base": tileLayer
+  map.on("zoom", updateRouteWidth);
+
+  return {
+    map: map,
+    drawTransit: drawTransit,
+    addUserDrawn: addUserDrawn,
+    drawDensity: drawDensity,
+  };
+};
+
+// Decode a layer served with format=compact (see utils/compact_geometry.py)
+// into the same GeoJSON FeatureCollection the JSON endpoint returns
+export function decodeCompactLayer(buffer) {
+  var view = new DataView(buffer);
+  var bytes = new Uint8Array(buffer);
+  var textDecoder = new TextDecoder();
+  var offset = 0;
+
+  function readVarint() {
+    // multiply instead of shifting, bitwise operators are limited to 32 bits
+    var value = 0;
+    var factor = 1;
+    var byte;
+    do {
+      byte = bytes[offset++];
+      value += (byte & 0x7f) * factor;
+      factor *= 128;
+    } while (byte & 0x80);
+    return value;
   }
 
-  // Initialize layer control
+  function readZigzag() {
+    var n = readVarint();
+    return n % 2 === 0 ? n / 2 : -(n + 1) / 2;
+  }
 
-  var overlays = {};
+  function readString() {
+    var length = readVarint();
+    var value = textDecoder.decode(bytes.subarray(offset, offset + length));
+    offset += length;
+    return value;
+  }
 
-  for (var key in markerClusterGroups) {
-    overlays[key + " stops"] = markerClusterGroups[key];
+  if (textDecoder.decode(bytes.subarray(0, 4)) !== "RRC1") {
+    throw new Error("Unknown compact layer format");
   }
-  for (var key in routeLayers) {
-    overlays[key + " routes"] = routeLayers[key];
+  var geometryType = bytes[4];
+  var originX = view.getFloat64(5, true);
+  var originY = view.getFloat64(13, true);
+  var scale = view.getFloat64(21, true);
+  offset = 29;
+
+  var properties = [];
+  var nProperties = readVarint();
+  for (var i = 0; i < nProperties; i++) {
+    var name = readString();
+    properties.push({ name: name, isString: bytes[offset++] === 1 });
   }
 
-  var layerControl = L.control.layers(baseMaps, overlays).addTo(map);
+  var features = [];
+  var x = 0;
+  var y = 0;
+  var nFeatures = readVarint();
+  for (var f = 0; f < nFeatures; f++) {
+    var featureProperties = {};
+    properties.forEach(function (property) {
+      featureProperties[property.name] = property.isString ? readString() : readZigzag();
+    });
 
-  map.on("zoom", updateRouteWidth);
+    var parts = [];
+    var nParts = readVarint();
+    for (var p = 0; p < nParts; p++) {
+      var points = [];
+      var nPoints = readVarint();
+      for (var k = 0; k < nPoints; k++) {
+        x += readZigzag();
+        y += readZigzag();
+        points.push([originX + x / scale, originY + y / scale]);
+      }
+      parts.push(points);
+    }
+
+    var geometry = null;
+    if (parts.length > 0) {
+      geometry = geometryType === 1
+        ? { type: "Point", coordinates: parts[0][0] }
+        : { type: "MultiLineString", coordinates: parts };
+    }
+    features.push({ type: "Feature", geometry: geometry, properties: featureProperties });
+  }
 
-};
\ No newline at end of file
+  return { type: "FeatureCollection", features: features };
+}
@@ -0,0 +1,127 @@
+from unittest.mock import Mock, patch
+from django.test import SimpleTestCase, override_settings
+
+from app.route_rangers_api.utils import caching
+from app.route_rangers_api.utils.caching import (
+    LAYER_MIN_AGES,
+    bump_data_version,
+    expire_layer,
+    get_data_version,
+    get_cached_layer,
+    invalidate_layer,
+    layer_cache_key,
+)
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class LayerCache(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        # the data version is read from the database, which these tests don't use
+        patcher = patch(
+            "app.route_rangers_api.utils.caching.get_data_version", return_value=1
+        )
+        self.data_version = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_layer_cache_key(self):
+        self.assertEqual(
+            layer_cache_key("Chicago", "routes", 1), "layer:Chicago:v1:routes"
+        )
+        self.assertEqual(
+            layer_cache_key("Chicago", "top", 2, "bus", "weekend"),
+            "layer:Chicago:v2:top:bus:weekend",
+        )
+
+    def test_layer_built_once(self):
+        build = Mock(return_value='{"type": "FeatureCollection"}')
+        get_cached_layer("Chicago", "routes", build)
+        payload = get_cached_layer("Chicago", "routes", build)
+        self.assertEqual(payload, '{"type": "FeatureCollection"}')
+        build.assert_called_once()
+
+    def test_variants_cached_separately(self):
+        build = Mock(return_value="[]")
+        get_cached_layer("Chicago", "routes", build, 1)
+        get_cached_layer("Chicago", "routes", build, 3)
+        self.assertEqual(build.call_count, 2)
+
+    def test_invalidate_only_affects_its_layer(self):
+        build_routes = Mock(return_value="routes")
+        build_user_routes = Mock(return_value="user routes")
+        get_cached_layer("Chicago", "routes", build_routes)
+        get_cached_layer("Chicago", "user_routes", build_user_routes)
+
+        invalidate_layer("Chicago", "user_routes")
+        get_cached_layer("Chicago", "routes", build_routes)
+        get_cached_layer("Chicago", "user_routes", build_user_routes)
+
+        build_routes.assert_called_once()
+        self.assertEqual(build_user_routes.call_count, 2)
+
+    def test_refresh_rebuilds_layer(self):
+        build = Mock(side_effect=["old", "new"])
+        get_cached_layer("Chicago", "metrics", build)
+        get_cached_layer("Chicago", "metrics", build, refresh=True)
+        self.assertEqual(get_cached_layer("Chicago", "metrics", build), "new")
+        self.assertEqual(build.call_count, 2)
+
+    def test_new_data_version_misses_cache(self):
+        build = Mock(side_effect=["v1", "v2"])
+        get_cached_layer("Chicago", "routes", build)
+        self.data_version.return_value = 2
+        self.assertEqual(get_cached_layer("Chicago", "routes", build), "v2")
+
+    def test_expire_keeps_layer_until_min_age(self):
+        build = Mock(side_effect=["old", "new"])
+        get_cached_layer("Chicago", "responses", build)
+        expire_layer("Chicago", "responses")
+        self.assertEqual(get_cached_layer("Chicago", "responses", build), "old")
+
+    def test_expire_drops_layer_older_than_min_age(self):
+        from django.core.cache import cache
+
+        build = Mock(side_effect=["old", "new"])
+        get_cached_layer("Chicago", "responses", build)
+        key = layer_cache_key("Chicago", "responses", 1)
+        built_at = cache.get(f"{key}:built_at")
+        cache.set(f"{key}:built_at", built_at - LAYER_MIN_AGES["responses"])
+
+        expire_layer("Chicago", "responses")
+        self.assertEqual(get_cached_layer("Chicago", "responses", build), "new")
+
+
+class DataVersionMemo(SimpleTestCase):
+    def setUp(self):
+        caching._data_versions.clear()
+        self.addCleanup(caching._data_versions.clear)
+        patcher = patch.object(caching, "DataVersion")
+        self.data_version = patcher.start()
+        self.addCleanup(patcher.stop)
+        versions = self.data_version.objects.filter.return_value.values_list
+        versions.return_value.first.return_value = 3
+        self.data_version.objects.get_or_create.return_value = (None, False)
+
+    def test_version_read_once_per_ttl(self):
+        self.assertEqual(get_data_version("Chicago"), 3)
+        self.assertEqual(get_data_version("Chicago"), 3)
+        self.data_version.objects.filter.assert_called_once()
+
+    def test_version_read_again_after_ttl(self):
+        get_data_version("Chicago")
+        version, read_at = caching._data_versions["Chicago"]
+        caching._data_versions["Chicago"] = (
+            version,
+            read_at - caching.DATA_VERSION_TTL,
+        )
+        get_data_version("Chicago")
+        self.assertEqual(self.data_version.objects.filter.call_count, 2)
+
+    def test_bump_drops_version_of_the_process(self):
+        get_data_version("Chicago")
+        bump_data_version("Chicago")
+        self.assertNotIn("Chicago", caching._data_versions)
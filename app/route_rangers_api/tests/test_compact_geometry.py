@@ -0,0 +1,121 @@
+import struct
+from parameterized import parameterized
+from unittest import TestCase
+
+from app.route_rangers_api.utils.compact_geometry import (
+    CompactLayerEncoder,
+    MULTILINESTRING,
+    POINT,
+    ROUTE_PROPERTIES,
+    STATION_PROPERTIES,
+    STRING,
+    quantized_parts,
+    write_varint,
+    zigzag,
+)
+
+
+def decode(payload: bytes):
+    """
+    Python port of decodeCompactLayer() in map.js
+    """
+    offset = 0
+
+    def varint():
+        nonlocal offset
+        value, shift = 0, 0
+        while True:
+            byte = payload[offset]
+            offset += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    def signed():
+        n = varint()
+        return n // 2 if n % 2 == 0 else -(n + 1) // 2
+
+    def string():
+        nonlocal offset
+        length = varint()
+        offset += length
+        return payload[offset - length : offset].decode("utf-8")
+
+    assert payload[:4] == b"RRC1"
+    geometry_type = payload[4]
+    origin_x, origin_y, scale = struct.unpack("<ddd", payload[5:29])
+    offset = 29
+    properties = []
+    for _ in range(varint()):
+        name = string()
+        properties.append((name, payload[offset]))
+        offset += 1
+
+    features, x, y = [], 0, 0
+    for _ in range(varint()):
+        values = {
+            name: string() if prop_type == STRING else signed()
+            for name, prop_type in properties
+        }
+        parts = []
+        for _ in range(varint()):
+            points = []
+            for _ in range(varint()):
+                x += signed()
+                y += signed()
+                points.append((origin_x + x / scale, origin_y + y / scale))
+            parts.append(points)
+        features.append((values, parts))
+    return geometry_type, features
+
+
+class CompactGeometry(TestCase):
+    @parameterized.expand([[0, 0], [-1, 1], [1, 2], [-2, 3], [150, 300]])
+    def test_zigzag(self, n, expected):
+        self.assertEqual(zigzag(n), expected)
+
+    @parameterized.expand(
+        [[0, b"\x00"], [127, b"\x7f"], [128, b"\x80\x01"], [300, b"\xac\x02"]]
+    )
+    def test_write_varint(self, n, expected):
+        out = bytearray()
+        write_varint(out, n)
+        self.assertEqual(bytes(out), expected)
+
+    def test_routes_round_trip(self):
+        encoder = CompactLayerEncoder(
+            MULTILINESTRING, (-88.7, 41.3), ROUTE_PROPERTIES, scale=100_000
+        )
+        line = [(-87.62980, 41.87810), (-87.62750, 41.88200), (-87.62000, 41.89000)]
+        encoder.add_feature(
+            {"route_name": "Red Line", "color": "c60c30", "mode": 1}, [line, line[:2]]
+        )
+        encoder.add_feature({"route_name": "Ñ", "color": None, "mode": 3}, [])
+
+        geometry_type, features = decode(encoder.to_bytes())
+        self.assertEqual(geometry_type, MULTILINESTRING)
+        values, parts = features[0]
+        self.assertEqual(
+            values, {"route_name": "Red Line", "color": "c60c30", "mode": 1}
+        )
+        self.assertEqual(len(parts), 2)
+        for (x, y), (expected_x, expected_y) in zip(parts[0], line):
+            self.assertAlmostEqual(x, expected_x, places=5)
+            self.assertAlmostEqual(y, expected_y, places=5)
+        self.assertEqual(features[1], ({"route_name": "Ñ", "color": "", "mode": 3}, []))
+
+    def test_duplicate_points_collapse(self):
+        encoder = CompactLayerEncoder(POINT, (41.3, -88.7), STATION_PROPERTIES)
+        encoder.add_feature(
+            {"station_name": "Roosevelt", "mode": 1},
+            [[(41.867370, -87.626700), (41.867371, -87.626701)]],
+        )
+        _, features = decode(encoder.to_bytes())
+        self.assertEqual(len(features[0][1][0]), 1)
+
+    def test_quantized_parts(self):
+        # as dumped by ROUTES_COMPACT_SQL for a MultiLineString of two lines
+        parts = quantized_parts([1, 1, 1, 2, 2], [0, 5, 9, 20, 21], [0, 1, 2, 30, 31])
+        self.assertEqual(parts, [[(0, 0), (5, 1), (9, 2)], [(20, 30), (21, 31)]])
+        self.assertEqual(quantized_parts(None, None, None), [])
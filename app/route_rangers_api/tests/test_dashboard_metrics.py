@@ -2,6 +2,7 @@ import pytest
 from parameterized import parameterized
 from unittest import TestCase, skip
 
+from app.route_rangers_api.utils.query_budget import query_budget
 from app.route_rangers_api.utils.metric_processing import (
     dashboard_metrics,
     get_ridership,
@@ -33,3 +34,9 @@ class testDash(TestCase):
         self.assertIs(bus < all, True)
         self.assertIs(train < all, True)
         self.assertIs(all < 100, True)
+
+    @parameterized.expand(["Chicago", "NewYork", "Portland"])
+    def test_metrics_query_count(self, city):
+        # one query each for ridership, routes and commuters
+        with query_budget(3):
+            dashboard_metrics(city)
@@ -0,0 +1,50 @@
+import datetime
+from parameterized import parameterized
+from unittest import TestCase
+from django.db.models import Q
+
+from app.route_rangers_api.utils.leaderboards import (
+    period_filter,
+    periods_between,
+    rank_units,
+)
+
+
+class Leaderboards(TestCase):
+    @parameterized.expand(
+        [
+            [
+                datetime.date(2023, 7, 2),
+                datetime.date(2023, 7, 31),
+                ["2023", "2023-07"],
+            ],
+            [
+                datetime.date(2023, 11, 1),
+                datetime.date(2024, 1, 2),
+                ["2023", "2023-11", "2023-12", "2024", "2024-01"],
+            ],
+        ]
+    )
+    def test_periods_between(self, start_date, end_date, periods):
+        self.assertEqual(periods_between(start_date, end_date), periods)
+
+    def test_rank_units(self):
+        averages = [
+            {"mode": 1, "name": "Clark/Lake", "avg_ridership": 5000},
+            {"mode": 1, "name": "Roosevelt", "avg_ridership": 7000},
+            {"mode": 1, "name": "Adams", "avg_ridership": 5000},
+            {"mode": 3, "name": "9", "avg_ridership": 20000},
+        ]
+        ranked = rank_units(averages, "mode", "name", size=2)
+        self.assertEqual(ranked[1], [("Roosevelt", 7000), ("Adams", 5000)])
+        self.assertEqual(ranked[3], [("9", 20000)])
+
+    @parameterized.expand(
+        [
+            ["2023", datetime.date(2023, 1, 1), datetime.date(2024, 1, 1)],
+            ["2023-07", datetime.date(2023, 7, 1), datetime.date(2023, 8, 1)],
+            ["2023-12", datetime.date(2023, 12, 1), datetime.date(2024, 1, 1)],
+        ]
+    )
+    def test_period_filter_is_half_open(self, period, start, end):
+        self.assertEqual(period_filter(period), Q(date__gte=start, date__lt=end))
@@ -0,0 +1,50 @@
+from parameterized import parameterized
+from unittest import TestCase
+
+from app.route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from app.route_rangers_api.utils.map_layers import (
+    initial_bbox,
+    layer_filters,
+    snap_bbox,
+)
+
+
+class MapLayers(TestCase):
+    @parameterized.expand(
+        [
+            [(-87.6321, 41.8752, -87.6201, 41.8849), (-87.64, 41.87, -87.62, 41.89)],
+            [(-87.64, 41.87, -87.62, 41.89), (-87.64, 41.87, -87.62, 41.89)],
+        ]
+    )
+    def test_snap_bbox_grows_outwards(self, bbox, expected):
+        snapped = snap_bbox(bbox)
+        for value, expected_value in zip(snapped, expected):
+            self.assertAlmostEqual(value, expected_value)
+        self.assertLessEqual(snapped[0], bbox[0])
+        self.assertLessEqual(snapped[1], bbox[1])
+        self.assertGreaterEqual(snapped[2], bbox[2])
+        self.assertGreaterEqual(snapped[3], bbox[3])
+
+    def test_layer_filters_without_filters(self):
+        self.assertEqual(layer_filters("r", "geo_representation", None, None), "")
+
+    def test_layer_filters_flips_envelope_for_stations(self):
+        filters = layer_filters("s", "location", 3, (0, 1, 2, 3), flipped=True)
+        self.assertIn("AND s.mode = %(mode)s", filters)
+        self.assertIn(
+            "s.location && ST_MakeEnvelope("
+            "%(min_lat)s, %(min_lon)s, %(max_lat)s, %(max_lon)s, 4326)",
+            filters,
+        )
+
+    @parameterized.expand([["Chicago"], ["NewYork"], ["Portland"]])
+    def test_initial_bbox_matches_the_warmed_key(self, city):
+        # the map sends the box as rendered in the page, the endpoints parse
+        # and snap it the same way the cache is warmed
+        bbox = initial_bbox(city)
+        sent = ",".join(str(value) for value in bbox)
+        self.assertEqual(
+            snap_bbox([float(value) for value in sent.split(",")]), snap_bbox(bbox)
+        )
+        lat, lon = CITY_CONTEXT[city]["Coordinates"]
+        self.assertTrue(bbox[0] < lon < bbox[2] and bbox[1] < lat < bbox[3])
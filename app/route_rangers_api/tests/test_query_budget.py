@@ -0,0 +1,88 @@
+from unittest import TestCase, skip
+from parameterized import parameterized
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from app.route_rangers_api.middleware import QueryBudgetMiddleware
+from app.route_rangers_api.utils.query_budget import QueryRecorder, query_budget
+
+# Most queries each page may run once its cached payloads are warm
+VIEW_BUDGETS = [
+    ["app:responses", 3],
+    ["app:survey", 2],
+    ["app:survey_p2", 2],
+    ["app:survey_p3", 2],
+    ["app:survey_p4", 2],
+    ["app:survey_p5", 2],
+]
+
+
+def fake_execute(sql, params, many, context):
+    return None
+
+
+class QueryRecorderTest(TestCase):
+    def test_counts_and_duplicates(self):
+        recorder = QueryRecorder()
+        recorder(fake_execute, "SELECT 1", None, False, {})
+        for station_id in range(3):
+            recorder(fake_execute, "SELECT * WHERE id = %s", [station_id], False, {})
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(recorder.duplicates, {"SELECT * WHERE id = %s": 3})
+        self.assertGreaterEqual(recorder.total_time, 0)
+
+    def test_query_budget(self):
+        with query_budget(2) as recorder:
+            recorder(fake_execute, "SELECT 1", None, False, {})
+            recorder(fake_execute, "SELECT 2", None, False, {})
+
+        with self.assertRaisesRegex(AssertionError, "3 queries run, budget is 2"):
+            with query_budget(2) as recorder:
+                for n in range(3):
+                    recorder(fake_execute, f"SELECT {n}", None, False, {})
+
+    def test_query_budget_duplicates(self):
+        with self.assertRaisesRegex(AssertionError, "1 statements run more than once"):
+            with query_budget(5) as recorder:
+                for station_id in range(3):
+                    recorder(
+                        fake_execute, "SELECT * WHERE id = %s", [station_id], False, {}
+                    )
+
+        with query_budget(5, allow_duplicates=True) as recorder:
+            for station_id in range(3):
+                recorder(
+                    fake_execute, "SELECT * WHERE id = %s", [station_id], False, {}
+                )
+
+    def test_middleware_reports_queries(self):
+        middleware = QueryBudgetMiddleware(lambda request: HttpResponse("ok"))
+        response = middleware(RequestFactory().get("/"))
+        self.assertEqual(response["X-Query-Count"], "0")
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+
+class DashboardQueryBudget(TestCase):
+    # the map, cards and graphs are fetched by the browser, the page itself
+    # must not touch the database
+    @parameterized.expand([["Chicago"], ["NewYork"], ["Portland"]])
+    def test_dashboard_runs_no_queries(self, city):
+        url = reverse("app:dashboard", kwargs={"city": city})
+        with query_budget(0):
+            response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+
+
+@skip("skipping until we can run tests differently locally vs on github")
+class ViewQueryBudgets(TestCase):
+    # access database settings to actually connect
+    @parameterized.expand(VIEW_BUDGETS)
+    def test_view_query_budget(self, view_name, max_queries):
+        client = Client()
+        url = reverse(view_name, kwargs={"city": "Chicago"})
+        # first request fills the caches
+        client.get(url)
+        with query_budget(max_queries):
+            client.get(url)
@@ -0,0 +1,49 @@
+import re
+from importlib import import_module
+from parameterized import parameterized
+from unittest import TestCase
+
+from app.route_rangers_api.utils.ridership_partitions import partition_name
+
+
+class RidershipPartitions(TestCase):
+    @parameterized.expand(
+        [
+            [2023, None, "route_rangers_api_ridershiproute_2023"],
+            [2023, "CHI", "route_rangers_api_ridershiproute_2023_chi"],
+        ]
+    )
+    def test_partition_name(self, year, city, expected):
+        self.assertEqual(
+            partition_name("route_rangers_api_ridershiproute", year, city), expected
+        )
+
+
+def constraint_names(sql, pattern):
+    return {name for names in re.findall(pattern, sql) for name in names if name}
+
+
+CREATED = r"CONSTRAINT (\w+) (?:PRIMARY KEY|UNIQUE)|CREATE INDEX (\w+)"
+# constraints and indexes of the table being replaced, renamed or dropped
+# before the new table is created
+REPLACED = r"(?:DROP|RENAME) CONSTRAINT (\w+)|DROP INDEX (\w+)"
+
+
+class RidershipPartitionsMigration(TestCase):
+    @parameterized.expand(
+        [["ridershiproute", "route"], ["ridershipstation", "station"]]
+    )
+    def test_constraint_names_match(self, table, unit):
+        # each direction must create the names the other one expects to find
+        migration = import_module(
+            "app.route_rangers_api.migrations.0016_ridership_partitions"
+        )
+        operation = migration.ridership_partitions(table, unit)
+        for created, replaced in [
+            (operation.sql, operation.reverse_sql),
+            (operation.reverse_sql, operation.sql),
+        ]:
+            self.assertEqual(
+                constraint_names(created, CREATED),
+                constraint_names(replaced, REPLACED),
+            )
@@ -0,0 +1,52 @@
+import datetime
+import json
+from parameterized import parameterized
+from unittest import TestCase, skip
+from unittest.mock import patch
+
+from app.route_rangers_api.utils import ridership_series
+from app.route_rangers_api.utils.ridership_series import (
+    series_fields,
+    series_filters,
+    get_ridership_series,
+)
+
+
+class RidershipSeries(TestCase):
+    @parameterized.expand(
+        [
+            ["all", None, ["bus", "subway", "total"]],
+            ["bus", None, ["bus"]],
+            ["subway", 7, ["subway", "subway_rolling"]],
+        ]
+    )
+    def test_series_fields(self, mode, rolling, expected):
+        self.assertEqual(series_fields(mode, rolling), expected)
+
+    def test_series_filters_without_range(self):
+        self.assertEqual(series_filters(None, None, 28), ("", "", {}))
+
+    def test_series_filters_pad_start_for_rolling_window(self):
+        start = datetime.date(2023, 3, 1)
+        end = datetime.date(2023, 4, 1)
+        daily_filters, bucket_filters, params = series_filters(start, end, 7)
+        self.assertIn("d.date >= %(padded_start)s", daily_filters)
+        self.assertIn("d.date < %(end)s", daily_filters)
+        self.assertIn("s.date >= %(start)s", bucket_filters)
+        self.assertEqual(params["padded_start"], datetime.date(2023, 2, 23))
+        self.assertEqual(params["start"], start)
+
+    @parameterized.expand([["Chicago", 1], ["NewYork", 1], ["Portland", 0]])
+    def test_subway_series_uses_city_subway_mode(self, city, subway_mode):
+        with patch.object(ridership_series, "connection") as connection:
+            ridership_series.get_ridership_series(city)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        self.assertEqual(cursor.execute.call_args[0][1]["subway"], subway_mode)
+
+    @skip("skipping until we can run tests differently locally vs on github")
+    def test_weekly_series_starts_on_monday(self):
+        series = json.loads(
+            get_ridership_series("Chicago", "week", start=datetime.date(2023, 1, 1))
+        )
+        for bucket in series:
+            self.assertEqual(datetime.date.fromisoformat(bucket["date"]).weekday(), 0)
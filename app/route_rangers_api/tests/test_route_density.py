@@ -0,0 +1,37 @@
+from unittest import TestCase
+from django.contrib.gis.geos import LineString
+
+from app.route_rangers_api.utils.route_density import (
+    cell_of,
+    line_cells,
+    route_counts,
+    route_deltas,
+)
+
+
+class RouteDensity(TestCase):
+    def test_cell_of(self):
+        self.assertEqual(cell_of(-87.6321, 41.8752, 0.01), (-8764, 4187))
+
+    def test_line_cells_include_crossed_cells(self):
+        cells = line_cells([(0.001, 0.001), (0.029, 0.001)], 0.01)
+        self.assertEqual(cells, {(0, 0), (1, 0), (2, 0)})
+
+    def test_route_counts(self):
+        # cells are 0.005 degrees wide
+        route = LineString([(0.001, 0.001), (0.006, 0.001), (0.006, 0.006)])
+        counts = route_counts(route)
+        self.assertEqual(counts[(0, 0)], [1, 1, 0])
+        self.assertEqual(counts[(1, 1)], [1, 0, 1])
+        self.assertEqual(sum(routes for routes, _, _ in counts.values()), 3)
+
+    def test_route_deltas_for_redrawn_route(self):
+        old = LineString([(0.001, 0.001), (0.004, 0.001)])
+        new = LineString([(0.001, 0.001), (0.006, 0.001)])
+        self.assertEqual(
+            route_deltas(old, new),
+            {(0, 0): [0, 0, -1], (1, 0): [1, 0, 1]},
+        )
+
+    def test_route_deltas_without_routes(self):
+        self.assertEqual(route_deltas(None, None), {})
@@ -0,0 +1,48 @@
+import datetime
+from importlib import import_module
+from parameterized import parameterized
+from unittest import TestCase
+
+from app.route_rangers_api.utils.service_calendar import (
+    federal_holidays,
+    get_day_type,
+)
+
+
+class ServiceCalendar(TestCase):
+    @parameterized.expand(
+        [
+            [datetime.date(2023, 7, 5), "weekday"],
+            [datetime.date(2023, 7, 8), "saturday"],
+            [datetime.date(2023, 7, 9), "sunday"],
+            # Independence Day
+            [datetime.date(2023, 7, 4), "holiday"],
+            # Thanksgiving
+            [datetime.date(2023, 11, 23), "holiday"],
+            # Christmas on a Sunday observed on Monday
+            [datetime.date(2022, 12, 26), "holiday"],
+            # New Year's Day 2022 on a Saturday observed the Friday before
+            [datetime.date(2021, 12, 31), "holiday"],
+            [datetime.datetime(2023, 5, 29, 0, 0), "holiday"],
+        ]
+    )
+    def test_get_day_type(self, date, day_type):
+        self.assertEqual(get_day_type(date), day_type)
+
+    def test_federal_holidays(self):
+        holidays = federal_holidays(2023)
+        self.assertEqual(len(holidays), 11)
+        self.assertEqual(
+            holidays[datetime.date(2023, 1, 16)], "Martin Luther King Jr. Day"
+        )
+        self.assertEqual(holidays[datetime.date(2023, 9, 4)], "Labor Day")
+
+    def test_day_type_migration_matches_calendar(self):
+        # the migration has its own copy of the holiday rules
+        migration = import_module(
+            "app.route_rangers_api.migrations.0017_ridership_day_type"
+        )
+        for year in range(2015, 2031):
+            self.assertEqual(
+                sorted(migration.holidays_of(year)), sorted(federal_holidays(year))
+            )
@@ -0,0 +1,53 @@
+import gzip
+import os
+import tempfile
+from unittest import TestCase
+
+from app.route_rangers_api.utils.static_artifacts import (
+    fingerprint_static_file,
+    fingerprinted_name,
+    load_manifest,
+)
+
+
+class StaticArtifacts(TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.path = os.path.join(self.folder.name, "ChicagoCensus_2020.geojson")
+
+    def write(self, content: bytes) -> None:
+        with open(self.path, "wb") as f:
+            f.write(content)
+
+    def test_fingerprinted_name(self):
+        name = fingerprinted_name("ChicagoCensus_2020.geojson", b"{}")
+        self.assertRegex(name, r"^ChicagoCensus_2020\.[0-9a-f]{12}\.geojson$")
+        self.assertNotEqual(
+            name, fingerprinted_name("ChicagoCensus_2020.geojson", b"[]")
+        )
+
+    def test_fingerprint_writes_compressed_copies(self):
+        self.write(b'{"type": "FeatureCollection", "features": []}')
+        hashed_name = fingerprint_static_file(self.path)
+
+        hashed_path = os.path.join(self.folder.name, hashed_name)
+        for suffix in ["", ".gz", ".br"]:
+            self.assertTrue(os.path.exists(hashed_path + suffix))
+        with gzip.open(hashed_path + ".gz") as f:
+            self.assertEqual(f.read(), b'{"type": "FeatureCollection", "features": []}')
+        self.assertEqual(
+            load_manifest(self.folder.name),
+            {"ChicagoCensus_2020.geojson": hashed_name},
+        )
+
+    def test_new_version_replaces_previous_copies(self):
+        self.write(b"old")
+        old_name = fingerprint_static_file(self.path)
+        self.write(b"new")
+        new_name = fingerprint_static_file(self.path)
+
+        files = os.listdir(self.folder.name)
+        self.assertNotIn(old_name, files)
+        self.assertNotIn(old_name + ".br", files)
+        self.assertIn(new_name, files)
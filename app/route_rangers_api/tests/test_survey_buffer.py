@@ -0,0 +1,51 @@
+import json
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from django.contrib.gis.geos import LineString, Point
+from django.test import override_settings
+
+from app.route_rangers_api.utils.survey_buffer import (
+    SUBMISSION_KINDS,
+    decode_values,
+    encode_values,
+    submit_survey_page,
+)
+
+
+class SurveyBuffer(TestCase):
+    def test_geometries_round_trip(self):
+        values = {
+            "trip_tod": 1,
+            "route": LineString([(-87.63, 41.88), (-87.6, 41.9)], srid=4326),
+            "starting_point": Point(-87.63, 41.88, srid=4326),
+            "end_point": None,
+        }
+        encoded = encode_values(values)
+        json.dumps(encoded)
+        decoded = decode_values(SUBMISSION_KINDS["trip"][0], encoded)
+        self.assertEqual(decoded["trip_tod"], 1)
+        self.assertTrue(decoded["route"].equals(values["route"]))
+        self.assertEqual(decoded["route"].srid, 4326)
+        self.assertIsNone(decoded["end_point"])
+
+    def test_buffered_pages_are_appended(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = str(Path(directory) / "survey_buffer.sqlite3")
+            with override_settings(SURVEY_WRITE_BUFFER=path):
+                for route_id in [1, 2]:
+                    submit_survey_page(
+                        "trip",
+                        user_id="user",
+                        route_id=route_id,
+                        city="CHI",
+                        values={"satisfied": 1},
+                    )
+            rows = sqlite3.connect(path).execute(
+                "SELECT kind, payload FROM survey_submissions ORDER BY id"
+            )
+            payloads = [(kind, json.loads(payload)) for kind, payload in rows]
+        self.assertEqual([kind for kind, _ in payloads], ["trip", "trip"])
+        self.assertEqual([payload["route_id"] for _, payload in payloads], [1, 2])
+        self.assertEqual(payloads[0][1]["values"], {"satisfied": 1})
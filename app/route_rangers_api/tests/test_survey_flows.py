@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from app.route_rangers_api.utils.survey_flows import flow_deltas, response_flow
+
+
+class SurveyFlows(TestCase):
+    def test_response_flow(self):
+        response = SimpleNamespace(
+            origin_tract_id=1, destination_tract_id=2, modes_of_transit=1, trip_tod=3
+        )
+        self.assertEqual(response_flow(response), (1, 2, 1, 3))
+
+    def test_response_flow_outside_tracts(self):
+        response = SimpleNamespace(
+            origin_tract_id=1, destination_tract_id=None, modes_of_transit=1, trip_tod=3
+        )
+        self.assertIsNone(response_flow(response))
+        self.assertIsNone(response_flow(None))
+
+    def test_flow_deltas_for_edited_trip(self):
+        self.assertEqual(
+            flow_deltas((1, 2, 1, 3), (1, 2, 2, 3)),
+            {(1, 2, 1, 3): -1, (1, 2, 2, 3): 1},
+        )
+
+    def test_flow_deltas_unchanged(self):
+        self.assertEqual(flow_deltas((1, 2, 1, 3), (1, 2, 1, 3)), {})
+        self.assertEqual(flow_deltas(None, None), {})
@@ -0,0 +1,28 @@
+from unittest import TestCase
+
+from app.route_rangers_api.utils.survey_responses import (
+    DERIVED_COLUMNS,
+    build_upsert,
+)
+
+
+class SurveyResponsesUpsert(TestCase):
+    def test_updates_only_given_answers(self):
+        sql, params = build_upsert(
+            "user", 2, "CHI", {"satisfied": 1, "transit_improvement": 3}
+        )
+        self.assertIn("ON CONFLICT ON CONSTRAINT survey_route", sql)
+        self.assertIn(
+            "SET satisfied = EXCLUDED.satisfied, "
+            "transit_improvement = EXCLUDED.transit_improvement\n",
+            sql,
+        )
+        self.assertEqual(params["route_id"], "2")
+        self.assertEqual(params["satisfied"], 1)
+
+    def test_locates_route_ends_in_tracts(self):
+        column, expression = DERIVED_COLUMNS["end_point"]
+        self.assertEqual(column, "destination_tract_id")
+        self.assertIn(
+            "ST_Contains(d.geographic_delimitation, %(end_point)s)", expression
+        )
@@ -0,0 +1,84 @@
+from unittest import TestCase, skip
+from unittest.mock import patch
+
+from app.route_rangers_api.utils.dashboard_payloads import build_responses
+from app.route_rangers_api.utils.query_budget import query_budget
+from app.route_rangers_api.utils import survey_counters
+from app.route_rangers_api.utils.survey_counters import answer_deltas
+from app.route_rangers_api.utils.survey_results_processing import (
+    TIME_OF_DAY,
+    fill_choice_counts,
+    get_rider_satisfaction,
+    get_transit_use_pct,
+)
+
+
+class SurveyResults(TestCase):
+    def test_fill_choice_counts_zero_fills_in_order(self):
+        counts = fill_choice_counts({3: 4, 1: 2}, TIME_OF_DAY, "tod")
+        self.assertEqual(
+            counts,
+            [
+                {"tod": "Peak Commute Hours", "count": 2},
+                {"tod": "Daytime", "count": 0},
+                {"tod": "Night", "count": 4},
+            ],
+        )
+
+    def test_fill_choice_counts_ignores_unknown_answers(self):
+        counts = fill_choice_counts({None: 5}, TIME_OF_DAY, "tod")
+        self.assertEqual(sum(count["count"] for count in counts), 0)
+
+    def test_answer_deltas_for_new_answers(self):
+        deltas = answer_deltas({}, {"users": 1, "frequent_transit": 2})
+        self.assertEqual(deltas, {("users", 1): 1, ("frequent_transit", 2): 1})
+
+    def test_record_answers_writes_counters_in_order(self):
+        with patch.object(survey_counters, "connection") as connection:
+            survey_counters.record_answers(
+                "CHI",
+                {"trip_tod": 3, "modes_of_transit": 2},
+                {"trip_tod": 1, "modes_of_transit": 4},
+            )
+        cursor = connection.cursor.return_value.__enter__.return_value
+        params = cursor.execute.call_args[0][1]
+        self.assertEqual(
+            [tuple(params[i + 1 : i + 3]) for i in range(0, len(params), 4)],
+            [
+                ("modes_of_transit", 2),
+                ("modes_of_transit", 4),
+                ("trip_tod", 1),
+                ("trip_tod", 3),
+            ],
+        )
+
+    def test_answer_deltas_move_edited_answer(self):
+        old = {"modes_of_transit": 1, "trip_tod": 2, "satisfied": None}
+        new = {"modes_of_transit": 3, "trip_tod": 2, "satisfied": 4}
+        self.assertEqual(
+            answer_deltas(old, new),
+            {
+                ("modes_of_transit", 1): -1,
+                ("modes_of_transit", 3): 1,
+                ("satisfied", 4): 1,
+            },
+        )
+
+    def test_percentages_from_counters(self):
+        counts = {
+            "users": {1: 8},
+            "frequent_transit": {1: 2, 2: 6},
+            "satisfied": {2: 1, 5: 3},
+        }
+        self.assertEqual(get_transit_use_pct(counts), 25.0)
+        self.assertEqual(get_rider_satisfaction(counts), 4.2)
+
+    def test_no_answers_yet(self):
+        self.assertEqual(get_transit_use_pct({}), "No answers yet!")
+        self.assertEqual(get_rider_satisfaction({}), "No satisfaction ratings yet!")
+
+    @skip("skipping until we can run tests differently locally vs on github")
+    def test_responses_query_budget(self):
+        # one row per counter, however many answers there are
+        with query_budget(1):
+            build_responses("Chicago")
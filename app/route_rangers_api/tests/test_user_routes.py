@@ -0,0 +1,54 @@
+import json
+from unittest import TestCase
+from django.contrib.gis.geos import LineString
+
+from app.route_rangers_api.utils.geometry_processing import (
+    parse_user_route,
+    simplify_user_route,
+)
+
+CHICAGO_BBOX = [-88.7, 41.3, -87.4, 42.65]
+
+
+class UserRoutes(TestCase):
+    def test_parse_user_route(self):
+        route = parse_user_route(
+            "[[-87.63, 41.88], [-87.63, 41.88], [-87.6, 41.9]]", CHICAGO_BBOX
+        )
+        self.assertEqual(route.coords, ((-87.63, 41.88), (-87.6, 41.9)))
+
+    def test_parse_user_route_clips_to_city(self):
+        route = parse_user_route("[[-87.5, 41.9], [-87.3, 41.9]]", CHICAGO_BBOX)
+        self.assertEqual(route.coords[-1], (-87.4, 41.9))
+
+    def test_parse_user_route_rejects_invalid_routes(self):
+        for line_string in [
+            None,
+            "not json",
+            '{"lng": -87.6}',
+            "[[-87.63, 41.88]]",
+            '[[-87.63, 41.88], [-87.6, "41.9"]]',
+            "[[-87.63, 41.88], [-87.6, Infinity]]",
+            "[[-74.0, 40.7], [-73.9, 40.8]]",
+        ]:
+            with self.assertRaises(ValueError):
+                parse_user_route(line_string, CHICAGO_BBOX)
+
+    def test_parse_user_route_accepts_routed_trips(self):
+        # the routing control posts every point of the road geometry
+        coords = [[-87.9 + i * 0.00004, 41.8 + (i % 2) * 0.00001] for i in range(10000)]
+        route = parse_user_route(json.dumps(coords), CHICAGO_BBOX)
+        self.assertEqual(route.num_points, 10000)
+        self.assertLessEqual(simplify_user_route(route).num_points, 250)
+
+    def test_simplify_user_route_caps_vertices(self):
+        # a zigzag the default tolerance can't simplify
+        route = LineString([(i * 0.001, (i % 2) * 0.001) for i in range(1000)])
+        simplified = simplify_user_route(route, max_vertices=50)
+        self.assertLessEqual(simplified.num_points, 50)
+        self.assertEqual(simplified.coords[0], route.coords[0])
+        self.assertEqual(simplified.coords[-1], route.coords[-1])
+
+    def test_simplify_user_route_keeps_short_routes(self):
+        route = LineString([(0, 0), (0.001, 0.001), (0.002, 0)])
+        self.assertEqual(simplify_user_route(route).coords, route.coords)
@@ -13,6 +13,32 @@ urlpatterns = [
     path("about/<str:city>", views.about_internal, name="about_int"),
     path("dashboard/<str:city>", views.dashboard, name="dashboard"),
     path("responses/<str:city>", views.responses, name="responses"),
+    path("api/<str:city>/routes", views.api_routes, name="api_routes"),
+    path("api/<str:city>/stations", views.api_stations, name="api_stations"),
+    path("api/<str:city>/user-routes", views.api_user_routes, name="api_user_routes"),
+    path(
+        "api/<str:city>/user-routes/density",
+        views.api_user_routes_density,
+        name="api_user_routes_density",
+    ),
+    path(
+        "api/<str:city>/user-routes/flows",
+        views.api_survey_flows,
+        name="api_survey_flows",
+    ),
+    path(
+        "api/<str:city>/user-routes/feed",
+        views.api_user_routes_feed,
+        name="api_user_routes_feed",
+    ),
+    path("api/<str:city>/metrics", views.api_metrics, name="api_metrics"),
+    path("api/<str:city>/ridership", views.api_ridership, name="api_ridership"),
+    path(
+        "api/<str:city>/ridership/daily",
+        views.api_daily_ridership,
+        name="api_daily_ridership",
+    ),
+    path("api/<str:city>/top/<str:mode>", views.api_top, name="api_top"),
     path("survey/<str:city>/", views.survey_p1, name="survey"),
     path("survey/<str:city>/2", views.survey_p2, name="survey_p2"),
     path("survey/<str:city>/3", views.survey_p3, name="survey_p3"),
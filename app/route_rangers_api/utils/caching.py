@@ -0,0 +1,130 @@
+"""
+Cache the payloads behind the dashboard endpoints, one entry per city and layer
+so that each layer can expire or be invalidated on its own.
+
+Every key includes the data version of the city, which ingestion bumps, so
+newly ingested data is served without flushing the cache. Each process reads
+the version at most once every DATA_VERSION_TTL seconds, so a cache hit
+doesn't also query the version, and picks up a new one within that delay.
+"""
+
+import math
+import time
+from typing import Callable, Dict, Tuple
+from django.core.cache import cache
+from django.db.models import F
+
+from route_rangers_api.models import DataVersion
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+
+# Lifetime in seconds of each layer. Transit and ridership data only change
+# when re-ingested, survey answers come in all the time.
+LAYER_CACHE_TIMEOUTS = {
+    "routes": 60 * 60 * 24,
+    "stations": 60 * 60 * 24,
+    "routes_compact": 60 * 60 * 24,
+    "stations_compact": 60 * 60 * 24,
+    "user_routes": 60 * 5,
+    "user_routes_density": 60 * 60,
+    "survey_flows": 60 * 60,
+    "metrics": 60 * 60 * 6,
+    "daily_ridership": 60 * 60 * 6,
+    "ridership": 60 * 60 * 6,
+    "top": 60 * 60 * 6,
+    "responses": 60 * 60,
+}
+# Layers invalidated on every change (i.e. each survey answer) are kept at
+# least this many seconds after being built, so a burst of changes rebuilds
+# them once instead of on every request
+LAYER_MIN_AGES = {
+    "responses": 30,
+    "user_routes_density": 30,
+    "survey_flows": 30,
+}
+
+# Seconds a process keeps the data version of a city before reading it again
+DATA_VERSION_TTL = 60
+# city -> data version and when it was read
+_data_versions: Dict[str, Tuple[int, float]] = {}
+
+
+def get_data_version(city: str) -> int:
+    """
+    Return the version of the ingested data of a city, 0 if it was never
+    bumped. Read from the database at most once every DATA_VERSION_TTL
+    seconds.
+    """
+    version, read_at = _data_versions.get(city, (None, None))
+    if read_at is not None and time.monotonic() - read_at < DATA_VERSION_TTL:
+        return version
+    version = (
+        DataVersion.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
+        .values_list("version", flat=True)
+        .first()
+    ) or 0
+    _data_versions[city] = (version, time.monotonic())
+    return version
+
+
+def bump_data_version(city: str) -> None:
+    """
+    Move a city to a new data version, making every cached payload
+    built from the previous data unreachable
+    """
+    _, created = DataVersion.objects.get_or_create(city=CITY_CONTEXT[city]["DB_Name"])
+    if not created:
+        DataVersion.objects.filter(city=CITY_CONTEXT[city]["DB_Name"]).update(
+            version=F("version") + 1
+        )
+    # the other processes see it once their copy expires
+    _data_versions.pop(city, None)
+
+
+def layer_cache_key(city: str, layer: str, version: int, *variant) -> str:
+    """
+    Build the cache key of a layer, variant holds the filters applied to it
+    (i.e. mode of transit)
+    """
+    return ":".join(
+        ["layer", city, f"v{version}", layer, *[str(part) for part in variant]]
+    )
+
+
+def get_cached_layer(
+    city: str, layer: str, build: Callable, *variant, refresh: bool = False
+):
+    """
+    Return the payload of a layer from the cache, calling build() to create
+    it on a miss or when refresh is True
+    """
+    key = layer_cache_key(city, layer, get_data_version(city), *variant)
+    payload = None if refresh else cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, LAYER_CACHE_TIMEOUTS[layer])
+        if layer in LAYER_MIN_AGES:
+            cache.set(f"{key}:built_at", time.time(), LAYER_CACHE_TIMEOUTS[layer])
+    return payload
+
+
+def invalidate_layer(city: str, layer: str, *variant) -> None:
+    """
+    Drop the cached payload of a layer so it is rebuilt on the next request
+    """
+    cache.delete(layer_cache_key(city, layer, get_data_version(city), *variant))
+
+
+def expire_layer(city: str, layer: str, *variant) -> None:
+    """
+    Mark the cached payload of a layer as outdated. It is dropped right away
+    if it is older than the minimum age of the layer, otherwise it expires
+    once it reaches it.
+    """
+    key = layer_cache_key(city, layer, get_data_version(city), *variant)
+    built_at = cache.get(f"{key}:built_at")
+    min_age = LAYER_MIN_AGES.get(layer, 0)
+    age = None if built_at is None else time.time() - built_at
+    if age is None or age >= min_age:
+        cache.delete(key)
+    else:
+        cache.touch(key, math.ceil(min_age - age))
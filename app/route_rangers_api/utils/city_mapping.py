@@ -2,6 +2,7 @@ CITIES_CHOICES = {"CHI": "Chicago", "NYC": "New York", "PDX": "Portland"}
 CITIES_CHOICES_SURVEY = {"Chicago": "CHI", "NewYork": "NYC", "Portland": "PDX"}
 # keying by "nospace" naming scheme b/c that is how things will be passed via the url
 # TODO this should probably be turned into a dataclass
+# "BBox" is [min_lon, min_lat, max_lon, max_lat] covering the city's transit network
 
 CITY_FIPS = {
     "nyc": {"state": "36", "county": ["061", "047", "081", "005", "085"]},
@@ -18,7 +19,9 @@ CITY_CONTEXT = {
         "csv": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/barplot_change_data.csv",
         "lineplot": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/data_connectedscatter.csv",
         "geojsonfilepath": "ChicagoCensus_2020.geojson",
+        "fips_state": CITY_FIPS["chicago"]["state"],
         "fips_county": CITY_FIPS["chicago"]["county"],
+        "BBox": [-88.7, 41.3, -87.4, 42.65],
         "subway_mode": 1,
         "bus_level": "route",
         "subway_level": "stations",
@@ -31,7 +34,9 @@ CITY_CONTEXT = {
         "csv": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/barplot_change_data.csv",
         "lineplot": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/data_connectedscatter.csv",
         "geojsonfilepath": "NewYorkCensus_2020.geojson",
+        "fips_state": CITY_FIPS["nyc"]["state"],
         "fips_county": CITY_FIPS["nyc"]["county"],
+        "BBox": [-74.28, 40.48, -73.68, 40.93],
         "subway_mode": 1,
         "bus_level": "route",
         "subway_level": "stations",
@@ -44,7 +49,9 @@ CITY_CONTEXT = {
         "csv": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/barplot_change_data.csv",
         "lineplot": "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/data_connectedscatter.csv",
         "geojsonfilepath": "PortlandCensus_2020.geojson",
+        "fips_state": CITY_FIPS["portland"]["state"],
         "fips_county": CITY_FIPS["portland"]["county"],
+        "BBox": [-123.2, 45.2, -122.25, 45.7],
         "subway_mode": 0,
         "bus_level": "stations",
         "subway_level": "stations",
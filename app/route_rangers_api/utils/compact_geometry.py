@@ -0,0 +1,261 @@
+"""
+Compact binary encoding of the route and station layers, decoded in map.js
+by decodeCompactLayer().
+
+Coordinates are quantized to a grid anchored at the corner of the city
+bounding box, delta encoded against the previous point of the layer and
+written as zigzag varints, so most points take 2 to 4 bytes instead of
+two floats in text. Layout (little endian):
+
+    magic "RRC1"
+    geometry type (1 byte): 1 Point, 2 MultiLineString
+    origin x, origin y, scale (float64 each)
+    number of properties (varint), then for each one
+        name (string) and type (1 byte): 0 integer, 1 string
+    number of features (varint), then for each feature
+        its property values in order
+        number of parts (varint, 0 if there is no geometry), then for each part
+            number of points (varint) and the dx, dy of every point (zigzag varint)
+
+Strings are written as their UTF-8 length (varint) followed by the bytes.
+Coordinates are encoded in the order they are stored, the decoder gives them
+back in that same order.
+
+PostGIS dumps and quantizes the points of the layers (ST_DumpPoints), so
+Python only writes the integers it gets back, without building a model
+instance or GEOS geometry per feature.
+"""
+
+import struct
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from django.db import connection
+
+from route_rangers_api.models import TransitRoute, TransitStation
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.geometry_processing import DEFAULT_ROUTE_LEVEL
+from route_rangers_api.utils.map_layers import BBox, bbox_params, layer_filters
+
+MAGIC = b"RRC1"
+POINT = 1
+MULTILINESTRING = 2
+INTEGER = 0
+STRING = 1
+# grid cells per degree, ~1m at the latitude of our cities
+QUANTIZATION_SCALE = 100_000
+
+# (name, type) of the properties written for each layer
+ROUTE_PROPERTIES = [("route_name", STRING), ("color", STRING), ("mode", INTEGER)]
+STATION_PROPERTIES = [("station_name", STRING), ("mode", INTEGER)]
+
+Part = Sequence[Tuple[float, float]]
+QuantizedPart = Sequence[Tuple[int, int]]
+
+# The points of every route quantized to the grid, with the part of the
+# MultiLineString each one belongs to. Uses the same simplified geometry as
+# the GeoJSON layer when available.
+ROUTES_COMPACT_SQL = f"""
+SELECT r.route_name, r.color, r.mode, points.parts, points.xs, points.ys
+FROM {TransitRoute._meta.db_table} r
+LEFT JOIN LATERAL (
+    SELECT array_agg(p.path[1] ORDER BY p.path) AS parts,
+        array_agg(
+            round((ST_X(p.geom) - %(origin_x)s) * %(scale)s)::bigint
+            ORDER BY p.path
+        ) AS xs,
+        array_agg(
+            round((ST_Y(p.geom) - %(origin_y)s) * %(scale)s)::bigint
+            ORDER BY p.path
+        ) AS ys
+    FROM ST_DumpPoints(
+        COALESCE(r.{DEFAULT_ROUTE_LEVEL}, r.geo_representation)
+    ) p
+) points ON true
+WHERE r.city = %(city)s {{filters}}
+ORDER BY r.id
+"""
+
+STATIONS_COMPACT_SQL = f"""
+SELECT s.station_name, s.mode,
+    round((ST_X(s.location) - %(origin_x)s) * %(scale)s)::bigint,
+    round((ST_Y(s.location) - %(origin_y)s) * %(scale)s)::bigint
+FROM {TransitStation._meta.db_table} s
+WHERE s.city = %(city)s {{filters}}
+ORDER BY s.id
+"""
+
+
+def zigzag(n: int) -> int:
+    """
+    Map signed integers to unsigned ones so small negatives stay small
+    (0, -1, 1, -2 ... -> 0, 1, 2, 3 ...)
+    """
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def write_varint(out: bytearray, n: int) -> None:
+    """
+    Append an unsigned integer using 7 bits per byte, the high bit marks
+    that more bytes follow
+    """
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def write_string(out: bytearray, value: Optional[str]) -> None:
+    encoded = (value or "").encode("utf-8")
+    write_varint(out, len(encoded))
+    out.extend(encoded)
+
+
+class CompactLayerEncoder:
+    """
+    Write the features of one layer, keeping the last quantized point so
+    every coordinate is delta encoded against the one before it
+    """
+
+    def __init__(
+        self,
+        geometry_type: int,
+        origin: Tuple[float, float],
+        properties: List[Tuple[str, int]],
+        scale: int = QUANTIZATION_SCALE,
+    ):
+        self.origin = origin
+        self.scale = scale
+        self.properties = properties
+        self.features = bytearray()
+        self.n_features = 0
+        self.last = (0, 0)
+
+        self.header = bytearray(MAGIC)
+        self.header.append(geometry_type)
+        self.header.extend(struct.pack("<ddd", origin[0], origin[1], scale))
+        write_varint(self.header, len(properties))
+        for name, prop_type in properties:
+            write_string(self.header, name)
+            self.header.append(prop_type)
+
+    def quantize(self, x: float, y: float) -> Tuple[int, int]:
+        return (
+            round((x - self.origin[0]) * self.scale),
+            round((y - self.origin[1]) * self.scale),
+        )
+
+    def add_feature(self, values: Dict, parts: Iterable[Part]) -> None:
+        """
+        Add a feature given its property values and the point sequences
+        of its geometry (a single one holding one point for a Point)
+        """
+        self.add_quantized_feature(
+            values, [[self.quantize(x, y) for x, y in part] for part in parts]
+        )
+
+    def add_quantized_feature(
+        self, values: Dict, parts: Iterable[QuantizedPart]
+    ) -> None:
+        """
+        Same as add_feature with the points already quantized to the grid
+        """
+        out = self.features
+        for name, prop_type in self.properties:
+            if prop_type == INTEGER:
+                write_varint(out, zigzag(values[name] or 0))
+            else:
+                write_string(out, values[name])
+
+        encoded_parts = []
+        for part in parts:
+            points = []
+            for point in part:
+                # points closer than the grid collapse into one
+                if not points or point != points[-1]:
+                    points.append(point)
+            encoded_parts.append(points)
+
+        write_varint(out, len(encoded_parts))
+        for points in encoded_parts:
+            write_varint(out, len(points))
+            for qx, qy in points:
+                write_varint(out, zigzag(qx - self.last[0]))
+                write_varint(out, zigzag(qy - self.last[1]))
+                self.last = (qx, qy)
+        self.n_features += 1
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(self.header)
+        write_varint(out, self.n_features)
+        out.extend(self.features)
+        return bytes(out)
+
+
+def quantized_parts(
+    parts: Optional[List[int]], xs: Optional[List[int]], ys: Optional[List[int]]
+) -> List[List[Tuple[int, int]]]:
+    """
+    Group the points dumped by ROUTES_COMPACT_SQL by the part they belong to
+    """
+    if parts is None:
+        return []
+    return [
+        [(x, y) for _, x, y in points]
+        for _, points in groupby(zip(parts, xs, ys), key=lambda point: point[0])
+    ]
+
+
+def compact_params(city: str, origin: Tuple[float, float], mode, bbox) -> Dict:
+    return {
+        "city": CITY_CONTEXT[city]["DB_Name"],
+        "mode": mode,
+        "origin_x": origin[0],
+        "origin_y": origin[1],
+        "scale": QUANTIZATION_SCALE,
+        **bbox_params(bbox),
+    }
+
+
+def get_routes_compact(
+    city: str, mode: Optional[int] = None, bbox: Optional[BBox] = None
+) -> bytes:
+    """
+    Given a city return its transit routes in the compact encoding,
+    optionally subset by mode of transit and bounding box
+    """
+    min_lon, min_lat = CITY_CONTEXT[city]["BBox"][:2]
+    encoder = CompactLayerEncoder(MULTILINESTRING, (min_lon, min_lat), ROUTE_PROPERTIES)
+
+    params = compact_params(city, (min_lon, min_lat), mode, bbox)
+    filters = layer_filters("r", "geo_representation", mode, bbox)
+    with connection.cursor() as cursor:
+        cursor.execute(ROUTES_COMPACT_SQL.format(filters=filters), params)
+        for route_name, color, route_mode, parts, xs, ys in cursor:
+            encoder.add_quantized_feature(
+                {"route_name": route_name, "color": color, "mode": route_mode},
+                quantized_parts(parts, xs, ys),
+            )
+    return encoder.to_bytes()
+
+
+def get_stations_compact(
+    city: str, mode: Optional[int] = None, bbox: Optional[BBox] = None
+) -> bytes:
+    """
+    Given a city return its transit stations in the compact encoding,
+    optionally subset by mode of transit and bounding box
+    """
+    # stations are stored as Point(lat, lon), so the grid origin is flipped too
+    min_lon, min_lat = CITY_CONTEXT[city]["BBox"][:2]
+    encoder = CompactLayerEncoder(POINT, (min_lat, min_lon), STATION_PROPERTIES)
+
+    params = compact_params(city, (min_lat, min_lon), mode, bbox)
+    filters = layer_filters("s", "location", mode, bbox, flipped=True)
+    with connection.cursor() as cursor:
+        cursor.execute(STATIONS_COMPACT_SQL.format(filters=filters), params)
+        for station_name, station_mode, x, y in cursor:
+            encoder.add_quantized_feature(
+                {"station_name": station_name, "mode": station_mode},
+                [[(x, y)]] if x is not None else [],
+            )
+    return encoder.to_bytes()
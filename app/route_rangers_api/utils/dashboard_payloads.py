@@ -0,0 +1,268 @@
+"""
+Cached payloads served by the dashboard and responses pages, and the hooks
+used to regenerate them after an ingestion
+"""
+
+import datetime
+import json
+from typing import Dict, Optional
+
+from route_rangers_api.utils.caching import get_cached_layer, bump_data_version
+from route_rangers_api.utils.city_mapping import (
+    CITY_CONTEXT,
+    CITIES_CHOICES_SURVEY,
+    CITY_RIDERSHIP_LEVEL,
+)
+from route_rangers_api.utils.compact_geometry import (
+    get_routes_compact,
+    get_stations_compact,
+)
+from route_rangers_api.utils.map_layers import (
+    BBox,
+    get_routes_geojson,
+    get_stations_geojson,
+    get_user_routes_geojson,
+    initial_bbox,
+    snap_bbox,
+)
+from route_rangers_api.utils.metric_processing import (
+    dashboard_metrics,
+    get_daily_ridership,
+    extract_top_ten,
+)
+from route_rangers_api.utils.ridership_series import get_ridership_series
+from route_rangers_api.utils.route_density import get_route_density
+from route_rangers_api.utils.survey_flows import get_survey_flows
+from route_rangers_api.utils.survey_counters import get_survey_counts
+from route_rangers_api.utils.survey_results_processing import (
+    get_number_of_responses,
+    get_transit_use_pct,
+    get_rider_satisfaction,
+    get_transit_mode,
+    get_trip_top,
+    get_transit_improv_drivers_dict,
+    get_transit_improv_riders_dict,
+)
+
+TOP_MODES = ["bus", "subway"]
+DAY_TYPES = ["weekday", "weekend"]
+
+
+def bbox_key(bbox: Optional[BBox]) -> str:
+    return "all" if bbox is None else ",".join(str(value) for value in bbox)
+
+
+def routes_payload(
+    city: str,
+    mode: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    refresh: bool = False,
+):
+    return get_cached_layer(
+        city,
+        "routes",
+        lambda: get_routes_geojson(city, mode, bbox),
+        mode,
+        bbox_key(bbox),
+        refresh=refresh,
+    )
+
+
+def stations_payload(
+    city: str,
+    mode: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    refresh: bool = False,
+):
+    return get_cached_layer(
+        city,
+        "stations",
+        lambda: get_stations_geojson(city, mode, bbox),
+        mode,
+        bbox_key(bbox),
+        refresh=refresh,
+    )
+
+
+def routes_compact_payload(
+    city: str,
+    mode: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    refresh: bool = False,
+):
+    return get_cached_layer(
+        city,
+        "routes_compact",
+        lambda: get_routes_compact(city, mode, bbox),
+        mode,
+        bbox_key(bbox),
+        refresh=refresh,
+    )
+
+
+def stations_compact_payload(
+    city: str,
+    mode: Optional[int] = None,
+    bbox: Optional[BBox] = None,
+    refresh: bool = False,
+):
+    return get_cached_layer(
+        city,
+        "stations_compact",
+        lambda: get_stations_compact(city, mode, bbox),
+        mode,
+        bbox_key(bbox),
+        refresh=refresh,
+    )
+
+
+def user_routes_payload(city: str, refresh: bool = False):
+    return get_cached_layer(
+        city, "user_routes", lambda: get_user_routes_geojson(city), refresh=refresh
+    )
+
+
+def user_routes_density_payload(city: str, refresh: bool = False):
+    return get_cached_layer(
+        city,
+        "user_routes_density",
+        lambda: get_route_density(city),
+        refresh=refresh,
+    )
+
+
+def survey_flows_payload(city: str, refresh: bool = False):
+    return get_cached_layer(
+        city, "survey_flows", lambda: get_survey_flows(city), refresh=refresh
+    )
+
+
+def metrics_payload(city: str, refresh: bool = False):
+    return get_cached_layer(
+        city, "metrics", lambda: json.dumps(dashboard_metrics(city)), refresh=refresh
+    )
+
+
+def daily_ridership_payload(city: str, refresh: bool = False):
+    return get_cached_layer(
+        city, "daily_ridership", lambda: get_daily_ridership(city), refresh=refresh
+    )
+
+
+def ridership_payload(
+    city: str,
+    granularity: str = "day",
+    mode: str = "all",
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    rolling: Optional[int] = None,
+    refresh: bool = False,
+):
+    """
+    Ridership time series resampled by day, week or month
+    """
+    return get_cached_layer(
+        city,
+        "ridership",
+        lambda: get_ridership_series(city, granularity, mode, start, end, rolling),
+        granularity,
+        mode,
+        start,
+        end,
+        rolling,
+        refresh=refresh,
+    )
+
+
+def top_payload(city: str, mode: str, day_type: str, refresh: bool = False):
+    """
+    Top 10 bus or subway stations/routes on weekdays or weekends
+    """
+    transit_mode = 3 if mode == "bus" else CITY_CONTEXT[city]["subway_mode"]
+    return get_cached_layer(
+        city,
+        "top",
+        lambda: extract_top_ten(
+            city=city,
+            mode=transit_mode,
+            transit_unit=CITY_RIDERSHIP_LEVEL[city][mode],
+            weekday=day_type == "weekday",
+        ),
+        mode,
+        day_type,
+        refresh=refresh,
+    )
+
+
+def build_responses(city: str) -> Dict:
+    # a handful of counters per city, see utils.survey_counters
+    counts = get_survey_counts(CITY_CONTEXT[city]["DB_Name"])
+    return {
+        "Response": get_number_of_responses(counts),
+        "Riders": get_transit_use_pct(counts),
+        "ridersatisfaction": get_rider_satisfaction(counts),
+        "transit_mode_graph": get_transit_mode(counts),
+        "toptengraph": get_trip_top(counts),
+        "tranrideimprov_rider": get_transit_improv_riders_dict(counts),
+        "tranrideimprov_drivers": get_transit_improv_drivers_dict(counts),
+    }
+
+
+def responses_payload(city: str, refresh: bool = False) -> Dict:
+    """
+    Survey results shown in the responses page
+    """
+    return get_cached_layer(
+        city, "responses", lambda: build_responses(city), refresh=refresh
+    )
+
+
+def warm_city_cache(city: str) -> None:
+    """
+    Regenerate every dashboard and responses payload of a city ahead of traffic
+    """
+    payloads = {
+        "routes": lambda: routes_payload(city, refresh=True),
+        "stations": lambda: stations_payload(city, refresh=True),
+        # the map asks for the compact layers of its initial bounding box
+        "routes_compact": lambda: routes_compact_payload(
+            city, bbox=snap_bbox(initial_bbox(city)), refresh=True
+        ),
+        "stations_compact": lambda: stations_compact_payload(
+            city, bbox=snap_bbox(initial_bbox(city)), refresh=True
+        ),
+        "user_routes": lambda: user_routes_payload(city, refresh=True),
+        "user_routes_density": lambda: user_routes_density_payload(city, refresh=True),
+        "survey_flows": lambda: survey_flows_payload(city, refresh=True),
+        "metrics": lambda: metrics_payload(city, refresh=True),
+        "daily_ridership": lambda: daily_ridership_payload(city, refresh=True),
+        "weekly ridership": lambda: ridership_payload(city, "week", refresh=True),
+        "responses": lambda: responses_payload(city, refresh=True),
+    }
+    for mode in TOP_MODES:
+        for day_type in DAY_TYPES:
+            payloads[f"top {mode} {day_type}"] = (
+                lambda mode=mode, day_type=day_type: top_payload(
+                    city, mode, day_type, refresh=True
+                )
+            )
+
+    for name, warm in payloads.items():
+        try:
+            warm()
+            print(f"Warmed {name} for {city}")
+        except Exception as e:
+            # i.e. a city without survey responses yet
+            print(f"Could not warm {name} for {city}: {e}")
+
+
+def refresh_city_cache(city: str) -> None:
+    """
+    Hook for ingestion scripts: bump the data version of a city, so the
+    new data is served right away, and warm the cache for it. city can be
+    given as named in the urls (NewYork) or in the database (NYC).
+    """
+    db_names = {db_name: name for name, db_name in CITIES_CHOICES_SURVEY.items()}
+    city = db_names.get(city, city)
+    bump_data_version(city)
+    warm_city_cache(city)
@@ -0,0 +1,125 @@
+"""
+Geometry helpers shared by the ingestion scripts and the views
+"""
+
+import json
+import math
+from typing import Dict, Optional, Sequence
+from django.contrib.gis.geos import (
+    GeometryCollection,
+    LineString,
+    MultiLineString,
+    Polygon,
+)
+
+# Tolerances (in degrees) of the simplified copies of a route stored on
+# TransitRoute, keyed by the name of the field holding each level
+ROUTE_SIMPLIFICATION_LEVELS = {
+    "geo_simplified_fine": 0.00005,
+    "geo_simplified_medium": 0.0002,
+    "geo_simplified_coarse": 0.001,
+}
+DEFAULT_ROUTE_LEVEL = "geo_simplified_fine"
+
+# Tolerance (in degrees) of the simplified copy of the routes drawn in the
+# survey and most vertices it keeps, the tolerance is raised until it fits
+USER_ROUTE_TOLERANCE = 0.00005
+USER_ROUTE_MAX_VERTICES = 250
+# Only a limit on the size of the request: routes planned with the routing
+# control come with every point of the road geometry, and the copy drawn on
+# the map is capped by USER_ROUTE_MAX_VERTICES anyway
+USER_ROUTE_MAX_INPUT_VERTICES = 100_000
+
+
+def simplify_route(
+    geo_representation: MultiLineString, tolerance: float
+) -> MultiLineString:
+    """
+    Simplify a route geometry, making sure the result is still a
+    MultiLineString so it can be stored in a MultiLineStringField
+    """
+    simple_geo_representation = geo_representation.simplify(
+        tolerance=tolerance, preserve_topology=True
+    )
+    # simplify() might alter the GEOS type; can't allow that
+    if isinstance(simple_geo_representation, LineString):
+        simple_geo_representation = MultiLineString(simple_geo_representation)
+    return simple_geo_representation
+
+
+def get_route_simplification_levels(
+    geo_representation: MultiLineString,
+) -> Dict[str, MultiLineString]:
+    """
+    Given the full geometry of a route return a dictionary with its
+    simplified versions keyed by TransitRoute field name
+    """
+    return {
+        level: simplify_route(geo_representation, tolerance)
+        for level, tolerance in ROUTE_SIMPLIFICATION_LEVELS.items()
+    }
+
+
+def parse_user_route(line_string: Optional[str], bbox: Sequence[float]) -> LineString:
+    """
+    Validate the route drawn by a user in the survey, a JSON list of
+    [lng, lat] pairs, and clip it to the extent of the city ([min_lon,
+    min_lat, max_lon, max_lat]). If it leaves the city and comes back only
+    its longest part inside is kept. Raises ValueError if it isn't a line
+    with a segment in the city.
+    """
+    try:
+        coords = json.loads(line_string)
+    except (TypeError, ValueError):
+        raise ValueError("The route drawn is not valid")
+    if not isinstance(coords, list) or len(coords) > USER_ROUTE_MAX_INPUT_VERTICES:
+        raise ValueError("The route drawn is not valid")
+
+    points = []
+    for coord in coords:
+        if not (
+            isinstance(coord, list)
+            and len(coord) == 2
+            and all(
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+                for value in coord
+            )
+        ):
+            raise ValueError("The route drawn is not valid")
+        # clicking twice on the same spot adds a repeated point
+        if not points or points[-1] != tuple(coord):
+            points.append(tuple(coord))
+    if len(points) < 2:
+        raise ValueError("Draw a route with at least two points")
+
+    route = LineString(points)
+    extent = Polygon.from_bbox(bbox)
+    if extent.contains(route):
+        return route
+    clipped = route.intersection(extent)
+    parts = clipped if isinstance(clipped, GeometryCollection) else [clipped]
+    lines = [part for part in parts if isinstance(part, LineString) and not part.empty]
+    if not lines:
+        raise ValueError("Draw the route inside the city")
+    return max(lines, key=lambda line: line.length)
+
+
+def simplify_user_route(
+    route: LineString,
+    tolerance: float = USER_ROUTE_TOLERANCE,
+    max_vertices: int = USER_ROUTE_MAX_VERTICES,
+) -> LineString:
+    """
+    Simplified copy of a route drawn in the survey with at most max_vertices,
+    stored next to it so the map doesn't simplify it on every request
+    """
+    simplified = route.simplify(tolerance, preserve_topology=True)
+    # without preserving topology a large enough tolerance keeps only the
+    # endpoints, so this always ends
+    while simplified.num_points > max_vertices:
+        tolerance *= 2
+        simplified = route.simplify(tolerance)
+    simplified.srid = route.srid
+    return simplified
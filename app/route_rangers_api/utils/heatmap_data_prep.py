@@ -213,6 +213,12 @@ def main() -> None:
     newyork_gdf.to_file(newyork_merged_path, driver="GeoJSON")
     portland_gdf.to_file(portland_merged_path, driver="GeoJSON")
 
+    # hashed and precompressed copies referenced by the dashboard
+    from route_rangers_api.utils.static_artifacts import fingerprint_static_file
+
+    for path in [chicago_merged_path, newyork_merged_path, portland_merged_path]:
+        print(f"Wrote {fingerprint_static_file(path)}")
+
 
 if __name__ == "__main__":
     main()
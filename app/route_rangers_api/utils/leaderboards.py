@@ -0,0 +1,111 @@
+"""
+Maintain Leaderboard, the stations and routes with the highest average daily
+ridership, so the top 10 widgets of the dashboard are simple lookups
+"""
+
+import datetime
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from route_rangers_api.models import Leaderboard, RidershipRoute, RidershipStation
+from route_rangers_api.utils.service_calendar import WEEKEND_DAY_TYPES
+
+# ranks stored per leaderboard, the most any widget can ask for
+LEADERBOARD_SIZE = 50
+
+
+def periods_between(start_date: datetime.date, end_date: datetime.date) -> List[str]:
+    """
+    Return the years (2023) and months (2023-07) overlapping a date range
+    """
+    periods = []
+    for year in range(start_date.year, end_date.year + 1):
+        periods.append(str(year))
+        first_month = start_date.month if year == start_date.year else 1
+        last_month = end_date.month if year == end_date.year else 12
+        periods.extend(
+            f"{year}-{month:02}" for month in range(first_month, last_month + 1)
+        )
+    return periods
+
+
+def period_filter(period: str) -> Q:
+    """
+    Half-open date range of a period, unlike date__month it can use the
+    indexes on date
+    """
+    if len(period) == 4:
+        start = datetime.date(int(period), 1, 1)
+        end = datetime.date(start.year + 1, 1, 1)
+    else:
+        year, month = [int(part) for part in period.split("-")]
+        start = datetime.date(year, month, 1)
+        end = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return Q(date__gte=start, date__lt=end)
+
+
+def rank_units(
+    averages: List[Dict], mode_field: str, name_field: str, size: int
+) -> Dict[int, List[Tuple[str, int]]]:
+    """
+    Given the average ridership of every station or route return the top
+    size of each mode of transit, ties broken by name
+    """
+    by_mode = defaultdict(list)
+    for average in averages:
+        by_mode[average[mode_field]].append(
+            (average[name_field], average["avg_ridership"])
+        )
+    return {
+        mode: sorted(units, key=lambda unit: (-unit[1], unit[0]))[:size]
+        for mode, units in by_mode.items()
+    }
+
+
+def rebuild_leaderboards(
+    city: str, periods: List[str], size: int = LEADERBOARD_SIZE
+) -> int:
+    """
+    Rebuild the leaderboards of a city (as named in the database, i.e. CHI)
+    for the given periods. Returns the number of rows written.
+    """
+    units = [
+        ("station", RidershipStation, "station__mode", "station__station_name"),
+        ("route", RidershipRoute, "route__mode", "route__route_name"),
+    ]
+    rows = []
+    for period in periods:
+        for unit_level, model, mode_field, name_field in units:
+            for day_type in ["weekday", "weekend"]:
+                # city is the partition key of the ridership tables
+                ridership = model.objects.filter(period_filter(period), city=city)
+                # the day type is stored on every row, see utils.service_calendar
+                if day_type == "weekday":
+                    ridership = ridership.filter(day_type="weekday")
+                else:
+                    ridership = ridership.filter(day_type__in=WEEKEND_DAY_TYPES)
+                averages = ridership.values(mode_field, name_field).annotate(
+                    avg_ridership=Sum("ridership") / Count("ridership")
+                )
+                ranked = rank_units(averages, mode_field, name_field, size)
+                for mode, top_units in ranked.items():
+                    for rank, (name, avg_ridership) in enumerate(top_units, start=1):
+                        rows.append(
+                            Leaderboard(
+                                city=city,
+                                mode=mode,
+                                unit_level=unit_level,
+                                day_type=day_type,
+                                period=period,
+                                rank=rank,
+                                name=name,
+                                avg_ridership=avg_ridership,
+                            )
+                        )
+
+    with transaction.atomic():
+        Leaderboard.objects.filter(city=city, period__in=periods).delete()
+        Leaderboard.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
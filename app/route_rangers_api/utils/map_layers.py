@@ -0,0 +1,263 @@
+"""
+Build the GeoJSON layers drawn on the dashboard map.
+
+The FeatureCollections are assembled by PostGIS (ST_AsGeoJSON + json_agg) and
+returned as a single string, so no model instance or GEOS object is created
+per feature.
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from django.db import connection
+
+from route_rangers_api.models import TransitRoute, TransitStation, SurveyResponse
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.geometry_processing import (
+    DEFAULT_ROUTE_LEVEL,
+    ROUTE_SIMPLIFICATION_LEVELS,
+)
+
+# [min_lon, min_lat, max_lon, max_lat]
+BBox = Tuple[float, float, float, float]
+# degrees, bounding boxes are snapped outwards to this grid (~1km)
+BBOX_GRID = 0.01
+# ~10cm, more digits only add bytes to the payload
+GEOJSON_DECIMALS = 6
+# degrees of longitude and latitude on each side of the center of a city
+# loaded by the map when it opens, enough for the padded view at the initial
+# zoom on large screens
+INITIAL_VIEW_MARGINS = (0.25, 0.15)
+
+# Wraps a query returning one "feature" json per row into a FeatureCollection.
+# COALESCE keeps an empty layer as a valid collection instead of null.
+FEATURE_COLLECTION_SQL = """
+SELECT json_build_object(
+    'type', 'FeatureCollection',
+    'features', COALESCE(json_agg(features.feature), '[]'::json)
+)::text
+FROM ({features_sql}) features
+"""
+
+# Routes ingested before the simplified columns existed are simplified on the fly
+ROUTES_FEATURES_SQL = f"""
+SELECT json_build_object(
+    'type', 'Feature',
+    'id', r.id,
+    'geometry', ST_AsGeoJSON(
+        COALESCE(
+            r.{DEFAULT_ROUTE_LEVEL},
+            ST_Multi(ST_SimplifyPreserveTopology(r.geo_representation, %(tolerance)s))
+        ),
+        %(decimals)s
+    )::json,
+    'properties', json_build_object(
+        'route_name', r.route_name, 'color', r.color, 'mode', r.mode
+    )
+) AS feature
+FROM {TransitRoute._meta.db_table} r
+WHERE r.city = %(city)s {{filters}}
+"""
+
+STATIONS_FEATURES_SQL = f"""
+SELECT json_build_object(
+    'type', 'Feature',
+    'id', s.id,
+    'geometry', ST_AsGeoJSON(s.location, %(decimals)s)::json,
+    'properties', json_build_object('station_name', s.station_name, 'mode', s.mode)
+) AS feature
+FROM {TransitStation._meta.db_table} s
+WHERE s.city = %(city)s {{filters}}
+"""
+
+# The map expects the line of a user route as [lat, lng] pairs and its
+# endpoints as stored, hence ST_FlipCoordinates only on the line. The line is
+# the simplified copy stored when the route is submitted.
+USER_ROUTES_FEATURES_SQL = f"""
+SELECT json_build_object(
+    'type', 'Feature',
+    'geometry', json_build_object(
+        'type', 'GeometryCollection',
+        'geometries', json_build_array(
+            ST_AsGeoJSON(ST_FlipCoordinates(u.route_simplified), %(decimals)s)::json,
+            ST_AsGeoJSON(u.starting_point, %(decimals)s)::json,
+            ST_AsGeoJSON(u.end_point, %(decimals)s)::json
+        )
+    ),
+    'properties', json_build_object('id', u.id)
+) AS feature, u.id
+FROM {SurveyResponse._meta.db_table} u
+WHERE u.city = %(city)s
+    AND u.route_simplified IS NOT NULL
+    AND u.starting_point IS NOT NULL
+    AND u.end_point IS NOT NULL
+    {{filters}}
+"""
+
+# One page of the user routes feed. last_id is the cursor to poll from next
+# time, next_cursor is only set when the page is full and more rows may follow.
+USER_ROUTES_FEED_SQL = """
+SELECT json_build_object(
+    'type', 'FeatureCollection',
+    'features', COALESCE(json_agg(page.feature ORDER BY page.id), '[]'::json),
+    'last_id', COALESCE(max(page.id), %(after)s),
+    'next_cursor', CASE WHEN count(*) = %(limit)s THEN max(page.id) END
+)::text
+FROM ({features_sql} ORDER BY u.id LIMIT %(limit)s) page
+"""
+USER_ROUTES_PAGE_SIZE = 500
+
+
+def build_feature_collection(features_sql: str, params: Dict) -> str:
+    """
+    Run a query returning one GeoJSON feature per row and return the
+    FeatureCollection built by the database
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(FEATURE_COLLECTION_SQL.format(features_sql=features_sql), params)
+        return cursor.fetchone()[0]
+
+
+def snap_bbox(bbox: BBox, grid: float = BBOX_GRID) -> BBox:
+    """
+    Grow a [min_lon, min_lat, max_lon, max_lat] bounding box outwards to the
+    nearest multiples of grid, so nearby viewports share the same cache entry
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (
+        round(math.floor(min_lon / grid) * grid, 6),
+        round(math.floor(min_lat / grid) * grid, 6),
+        round(math.ceil(max_lon / grid) * grid, 6),
+        round(math.ceil(max_lat / grid) * grid, 6),
+    )
+
+
+def initial_bbox(city: str) -> BBox:
+    """
+    Bounding box the map asks for when it opens, before any move, so it can be
+    warmed ahead of traffic. Not snapped, the endpoints snap it.
+    """
+    lat, lon = CITY_CONTEXT[city]["Coordinates"]
+    lon_margin, lat_margin = INITIAL_VIEW_MARGINS
+    return (
+        round(lon - lon_margin, 6),
+        round(lat - lat_margin, 6),
+        round(lon + lon_margin, 6),
+        round(lat + lat_margin, 6),
+    )
+
+
+def layer_filters(
+    alias: str,
+    geometry: str,
+    mode: Optional[int],
+    bbox: Optional[BBox],
+    flipped: bool = False,
+) -> str:
+    """
+    SQL conditions for the optional mode of transit and bounding box of a
+    layer. The bounding box uses the && operator so the GiST index of the
+    geometry is used, flipped is for geometries stored as (lat, lon).
+    """
+    filters = []
+    if mode is not None:
+        filters.append(f"AND {alias}.mode = %(mode)s")
+    if bbox is not None:
+        if flipped:
+            envelope = "%(min_lat)s, %(min_lon)s, %(max_lat)s, %(max_lon)s"
+        else:
+            envelope = "%(min_lon)s, %(min_lat)s, %(max_lon)s, %(max_lat)s"
+        filters.append(f"AND {alias}.{geometry} && ST_MakeEnvelope({envelope}, 4326)")
+    return " ".join(filters)
+
+
+def bbox_params(bbox: Optional[BBox]) -> Dict:
+    if bbox is None:
+        return {}
+    return dict(zip(["min_lon", "min_lat", "max_lon", "max_lat"], bbox))
+
+
+def get_routes_geojson(
+    city: str, mode: Optional[int] = None, bbox: Optional[BBox] = None
+) -> str:
+    """
+    Given a city return a GeoJSON FeatureCollection with its transit routes,
+    optionally subset by mode of transit and bounding box
+    """
+    # reduce load time and data transfer size by using the simplified geometry
+    # stored at ingestion time instead of the full one
+    params = {
+        "city": CITY_CONTEXT[city]["DB_Name"],
+        "mode": mode,
+        "tolerance": ROUTE_SIMPLIFICATION_LEVELS[DEFAULT_ROUTE_LEVEL],
+        "decimals": GEOJSON_DECIMALS,
+        **bbox_params(bbox),
+    }
+    filters = layer_filters("r", "geo_representation", mode, bbox)
+    sql = ROUTES_FEATURES_SQL.format(filters=filters)
+    return build_feature_collection(sql, params)
+
+
+def get_stations_geojson(
+    city: str, mode: Optional[int] = None, bbox: Optional[BBox] = None
+) -> str:
+    """
+    Given a city return a GeoJSON FeatureCollection with its transit stations,
+    optionally subset by mode of transit and bounding box
+    """
+    params = {
+        "city": CITY_CONTEXT[city]["DB_Name"],
+        "mode": mode,
+        "decimals": GEOJSON_DECIMALS,
+        **bbox_params(bbox),
+    }
+    # stations are stored as Point(lat, lon)
+    filters = layer_filters("s", "location", mode, bbox, flipped=True)
+    sql = STATIONS_FEATURES_SQL.format(filters=filters)
+    return build_feature_collection(sql, params)
+
+
+def get_user_routes_geojson(city: str) -> str:
+    """
+    Given a city return a GeoJSON FeatureCollection with the routes drawn by
+    users in the survey and their endpoints
+    """
+    params = {
+        "city": CITY_CONTEXT[city]["DB_Name"],
+        "decimals": GEOJSON_DECIMALS,
+    }
+    sql = USER_ROUTES_FEATURES_SQL.format(filters="")
+    return build_feature_collection(sql, params)
+
+
+def get_user_routes_feed(
+    city: str,
+    after: int = 0,
+    limit: int = USER_ROUTES_PAGE_SIZE,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> str:
+    """
+    Given a city return a page of the routes drawn by users with an id
+    greater than after, oldest first, optionally restricted to the responses
+    submitted in [since, until)
+    """
+    params = {
+        "city": CITY_CONTEXT[city]["DB_Name"],
+        "decimals": GEOJSON_DECIMALS,
+        "after": after,
+        "limit": limit,
+        "since": since,
+        "until": until,
+    }
+    # ids grow with every submission, so the cursor filter uses the primary key
+    filters = ["AND u.id > %(after)s"]
+    if since is not None:
+        filters.append("AND u.response_date >= %(since)s")
+    if until is not None:
+        filters.append("AND u.response_date < %(until)s")
+    features_sql = USER_ROUTES_FEATURES_SQL.format(filters=" ".join(filters))
+
+    with connection.cursor() as cursor:
+        cursor.execute(USER_ROUTES_FEED_SQL.format(features_sql=features_sql), params)
+        return cursor.fetchone()[0]
@@ -7,14 +7,21 @@ import pandas as pd
 from route_rangers_api.models import (
     TransitModes,
     TransitRoute,
-    RidershipRoute,
-    RidershipStation,
+    DailyRidership,
     Demographics,
+    Leaderboard,
 )
 from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+import datetime
 import json
 from django.core.serializers.json import DjangoJSONEncoder
 
+TRAIN_MODES = [TransitModes.SUBWAY, TransitModes.LIGHT_RAIL, TransitModes.RAIL]
+# Year of ridership averaged in the cards, as a half-open range so the
+# indexes on date can be used
+YEAR_START = datetime.date(2023, 1, 1)
+YEAR_END = datetime.date(2024, 1, 1)
+
 
 def dashboard_metrics(city: str):
     dashboard_card_data = {}
@@ -44,59 +51,46 @@ def dashboard_metrics(city: str):
 
 def get_ridership(city: str):
     """
-    Get ridership for the city and be able to subset by mode of transit average per day
+    Get ridership for the city and be able to subset by mode of transit average per day.
+    Every total is computed in a single query with conditional aggregates.
     """
+    # one row per unit level since route and station ridership are averaged
+    # separately
+    totals = (
+        DailyRidership.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
+        .values("unit_level")
+        .annotate(
+            all=Sum("ridership", filter=Q(date__gte=YEAR_START, date__lt=YEAR_END)),
+            bus=Sum("ridership", filter=Q(mode=TransitModes.BUS)),
+            **{
+                f"train_{mode}": Sum("ridership", filter=Q(mode=mode))
+                for mode in TRAIN_MODES
+            },
+        )
+        .order_by()
+    )
 
-    # all
-    routes = RidershipRoute.objects.filter(
-        route_id__city=CITY_CONTEXT[city]["DB_Name"], date__year=2023
-    ).aggregate(daily_ridership=(Sum("ridership") / 365))
-    stations = RidershipStation.objects.filter(
-        station_id__city=CITY_CONTEXT[city]["DB_Name"], date__year=2023
-    ).aggregate(daily_ridership=(Sum("ridership") / 365))
-    if routes["daily_ridership"] is None:
-        routes["daily_ridership"] = 0
-    if stations["daily_ridership"] is None:
-        stations["daily_ridership"] = 0
-    all = routes["daily_ridership"] + stations["daily_ridership"]
-    bus = get_ridership_by_mode(city, TransitModes.BUS)
-    subway = get_ridership_by_mode(city, TransitModes.SUBWAY)
-    light_rail = get_ridership_by_mode(city, TransitModes.LIGHT_RAIL)
-    rail = get_ridership_by_mode(city, TransitModes.RAIL)
-    train = subway + light_rail + rail
+    all, bus, train = 0, 0, 0
+    for unit_level_totals in totals:
+        all += (unit_level_totals["all"] or 0) // 365
+        bus += (unit_level_totals["bus"] or 0) // 365
+        for mode in TRAIN_MODES:
+            train += (unit_level_totals[f"train_{mode}"] or 0) // 365
     return (all, bus, train)
 
 
-def get_ridership_by_mode(city: str, mode: TransitModes):
-    mode_routes = RidershipRoute.objects.filter(
-        route_id__city=CITY_CONTEXT[city]["DB_Name"], route_id__mode=mode
-    ).aggregate(daily_ridership=(Sum("ridership") / 365))
-    mode_stations = RidershipStation.objects.filter(
-        station_id__city=CITY_CONTEXT[city]["DB_Name"],
-        station_id__mode=mode,
-    ).aggregate(daily_ridership=(Sum("ridership") / 365))
-    if mode_routes["daily_ridership"] is None:
-        mode_routes["daily_ridership"] = 0
-    if mode_stations["daily_ridership"] is None:
-        mode_stations["daily_ridership"] = 0
-    return mode_routes["daily_ridership"] + mode_stations["daily_ridership"]
-
-
 def get_routes(city: str):
     """
     Get routes and be able to subset by mode of transit
     """
     # get num routes
-    all_routes = TransitRoute.objects.filter(city=CITY_CONTEXT[city]["DB_Name"]).count()
-    bus_routes = TransitRoute.objects.filter(
-        city=CITY_CONTEXT[city]["DB_Name"], mode=TransitModes.BUS
-    ).count()
-    train_routes = TransitRoute.objects.filter(
-        city=CITY_CONTEXT[city]["DB_Name"],
-        mode__in=[TransitModes.LIGHT_RAIL, TransitModes.RAIL, TransitModes.SUBWAY],
-    ).count()
+    routes = TransitRoute.objects.filter(city=CITY_CONTEXT[city]["DB_Name"]).aggregate(
+        all_routes=Count("id"),
+        bus_routes=Count("id", filter=Q(mode=TransitModes.BUS)),
+        train_routes=Count("id", filter=Q(mode__in=TRAIN_MODES)),
+    )
 
-    return all_routes, bus_routes, train_routes
+    return routes["all_routes"], routes["bus_routes"], routes["train_routes"]
 
 
 def get_pct_riders(city: str):
@@ -119,123 +113,58 @@ def get_pct_riders(city: str):
 
 
 def extract_top_ten(
-    city: str, mode: int, transit_unit: str = "stations", weekday: bool = True
+    city: str,
+    mode: int,
+    transit_unit: str = "stations",
+    weekday: bool = True,
+    n: int = 10,
+    period: str = "2023",
 ):
     """
-    Extract ridership for top 10 stations or top 10 routes
+    Extract ridership for top n (10 by default) stations or routes of a
+    period, read from the leaderboards rebuilt at ingestion time
     """
-    top_ten_units = []
-    if transit_unit == "stations":
-        stations = RidershipStation.objects.filter(
-            station_id__city=CITY_CONTEXT[city]["DB_Name"],
-            date__year=2023,
-            station_id__mode=mode,
-        )
-        if weekday:
-            stations = stations.exclude(Q(date__week_day=1) | Q(date__week_day=7))
-        else:
-            stations = stations.filter(Q(date__week_day=1) | Q(date__week_day=7))
-        top_ten_stations = (
-            stations.values("station_id__station_name")
-            .annotate(avg_ridership=Sum("ridership") / Count("ridership"))
-            .order_by("-avg_ridership")[:10]
-        )
-        for station in top_ten_stations:
-            station_value = {
-                "name": station["station_id__station_name"],
-                "avg_ridership": station["avg_ridership"],
-            }
-            top_ten_units.append(station_value)
-    else:
-        routes = RidershipRoute.objects.filter(
-            route_id__city=CITY_CONTEXT[city]["DB_Name"],
-            date__year=2023,
-            route_id__mode=mode,
-        )
-        if weekday:
-            routes = routes.filter(date__week_day__in=[1, 2, 3, 4, 5])
-        else:
-            routes = routes.exclude(Q(date__week_day=1) | Q(date__week_day=7))
-
-        top_ten_routes = (
-            routes.values("route_id__route_name")
-            .annotate(avg_ridership=Sum("ridership") / Count("ridership"))
-            .order_by("-avg_ridership")[:10]
-        )
-        for route in top_ten_routes:
-            route_value = {
-                "name": route["route_id__route_name"],
-                "avg_ridership": route["avg_ridership"],
-            }
-            top_ten_units.append(route_value)
-
-    return json.dumps(list(top_ten_units), cls=DjangoJSONEncoder)
+    top_units = Leaderboard.objects.filter(
+        city=CITY_CONTEXT[city]["DB_Name"],
+        mode=mode,
+        unit_level="station" if transit_unit == "stations" else "route",
+        day_type="weekday" if weekday else "weekend",
+        period=period,
+        rank__lte=n,
+    ).order_by("rank")
+
+    return json.dumps(
+        list(top_units.values("name", "avg_ridership")), cls=DjangoJSONEncoder
+    )
 
 
 def get_daily_ridership(city: str):
     """
     Extract daily ridership to be graphed
     """
-    # 1. Create queries
-    # Bus ridership
-    bus_route_daily_ridership = (
-        RidershipRoute.objects.filter(
-            route_id__mode=3, route_id__city=CITY_CONTEXT[city]["DB_Name"]
-        )
-        .values("date")
-        .annotate(total_ridership=Sum("ridership"))
-        .order_by("date")
-    )
-    bus_station_daily_ridership = (
-        RidershipStation.objects.filter(
-            station_id__mode=3, station_id__city=CITY_CONTEXT[city]["DB_Name"]
+    # Bus ridership is reported by route or by station depending on the city,
+    # subway ridership by station
+    daily_totals = (
+        DailyRidership.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
+        .filter(
+            Q(mode=TransitModes.BUS) | Q(mode=TransitModes.SUBWAY, unit_level="station")
         )
-        .values("date")
+        .values("date", "mode")
         .annotate(total_ridership=Sum("ridership"))
         .order_by("date")
     )
 
-    # Subway ridership
-    subway_station_daily_ridership = (
-        RidershipStation.objects.filter(
-            station_id__mode=1, station_id__city=CITY_CONTEXT[city]["DB_Name"]
-        )
-        .values("date")
-        .annotate(total_ridership=Sum("ridership"))
-        .order_by("date")
-    )
-
-    # 2. Populate day dictionaries
+    # Reformat to pass as the way specified by D3
     daily_ridership = {}
-    for bus_route in bus_route_daily_ridership:
-        daily_ridership[bus_route["date"]] = {}
-        daily_ridership[bus_route["date"]]["bus_route"] = bus_route["total_ridership"]
-    for bus_station in bus_station_daily_ridership:
-        if bus_station["date"] not in daily_ridership.keys():
-            daily_ridership[bus_station["date"]] = {}
-        daily_ridership[bus_station["date"]]["bus_station"] = bus_station[
-            "total_ridership"
-        ]
-    for subway_station in subway_station_daily_ridership:
-        if subway_station["date"] not in daily_ridership.keys():
-            daily_ridership[subway_station["date"]] = {}
-        daily_ridership[subway_station["date"]]["subway"] = subway_station[
-            "total_ridership"
-        ]
-
-    # 3. Reformat to pass as the way specified by D3
-    ridership_list = []
-    for date, daily_dict in daily_ridership.items():
-        bus_ridership = daily_dict.get("bus_route", 0) + daily_dict.get(
-            "bus_station", 0
+    for daily_total in daily_totals:
+        date_ridership = daily_ridership.setdefault(
+            daily_total["date"],
+            {"date": daily_total["date"], "bus": 0, "subway": 0, "total": 0},
         )
-        subway_ridership = daily_dict.get("subway", 0)
-        date_ridership = {
-            "date": date,
-            "bus": bus_ridership,
-            "subway": subway_ridership,
-            "total": bus_ridership + subway_ridership,
-        }
-        ridership_list.append(date_ridership)
-
-    return json.dumps(list(ridership_list), cls=DjangoJSONEncoder)
+        if daily_total["mode"] == TransitModes.BUS:
+            date_ridership["bus"] += daily_total["total_ridership"]
+        else:
+            date_ridership["subway"] += daily_total["total_ridership"]
+        date_ridership["total"] += daily_total["total_ridership"]
+
+    return json.dumps(list(daily_ridership.values()), cls=DjangoJSONEncoder)
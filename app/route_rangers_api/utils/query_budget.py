@@ -0,0 +1,74 @@
+"""
+Record the SQL run while handling a request (or any block of code) to catch
+N+1 patterns and query regressions. Used by middleware.QueryBudgetMiddleware
+in development and by the query budget tests.
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+from django.db import connection
+
+
+class QueryRecorder:
+    """
+    Execute wrapper (see connection.execute_wrapper) keeping the SQL and
+    duration of every query it sees
+    """
+
+    def __init__(self):
+        self.queries: List[Tuple[str, float]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_time(self) -> float:
+        """
+        Seconds spent running SQL
+        """
+        return sum(duration for _, duration in self.queries)
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        """
+        SQL run more than once and how many times. Parameters are ignored, the
+        same statement run in a loop with different ids is the N+1 pattern.
+        """
+        counts = Counter(sql for sql, _ in self.queries)
+        return {sql: n for sql, n in counts.items() if n > 1}
+
+
+@contextmanager
+def record_queries() -> Iterator[QueryRecorder]:
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+@contextmanager
+def query_budget(max_queries: int, allow_duplicates: bool = False):
+    """
+    Fail with the list of queries run if the block runs more than max_queries,
+    or runs the same SQL twice unless allow_duplicates is True
+    """
+    with record_queries() as recorder:
+        yield recorder
+
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f"{recorder.count} queries run, budget is {max_queries}")
+    if recorder.duplicates and not allow_duplicates:
+        problems.append(f"{len(recorder.duplicates)} statements run more than once")
+    if problems:
+        queries = "\n".join(f"  {sql}" for sql, _ in recorder.queries)
+        raise AssertionError("; ".join(problems) + f":\n{queries}")
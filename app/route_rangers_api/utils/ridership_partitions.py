@@ -0,0 +1,81 @@
+"""
+Maintain the partitions of RidershipRoute and RidershipStation, which are
+partitioned by year (RANGE on date) and each year by city (LIST on city), see
+migration 0016. Queries filtering on a date range and city only scan the
+partitions of those years and cities, and a year no longer needed can be
+detached without touching the rest of the table.
+"""
+
+from typing import Iterable, List, Optional
+from django.db import connection
+
+from route_rangers_api.models import RidershipRoute, RidershipStation
+from route_rangers_api.utils.city_mapping import CITIES_CHOICES
+
+PARTITIONED_TABLES = [RidershipRoute._meta.db_table, RidershipStation._meta.db_table]
+
+CREATE_YEAR_PARTITION = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+FOR VALUES FROM (%(start)s) TO (%(end)s) PARTITION BY LIST (city)
+"""
+CREATE_CITY_PARTITION = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+FOR VALUES IN (%(city)s)
+"""
+CREATE_DEFAULT_PARTITION = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} DEFAULT
+"""
+
+
+def partition_name(table: str, year: int, city: Optional[str] = None) -> str:
+    """
+    Name of the partition of a ridership table holding a year, or the
+    ridership of a city (as named in the database, i.e. CHI) in that year
+    """
+    name = f"{table}_{year}"
+    return name if city is None else f"{name}_{city.lower()}"
+
+
+def ensure_ridership_partitions(years: Iterable[int]) -> None:
+    """
+    Create the partitions of the given years that don't exist yet. Run it
+    before ingesting a new year, otherwise its rows end up in the default
+    partition and the year partition can't be created until they are moved.
+    """
+    years = sorted(set(years))
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            for year in years:
+                year_partition = partition_name(table, year)
+                cursor.execute(
+                    CREATE_YEAR_PARTITION.format(partition=year_partition, table=table),
+                    {"start": f"{year}-01-01", "end": f"{year + 1}-01-01"},
+                )
+                for city in CITIES_CHOICES:
+                    cursor.execute(
+                        CREATE_CITY_PARTITION.format(
+                            partition=partition_name(table, year, city),
+                            table=year_partition,
+                        ),
+                        {"city": city},
+                    )
+                cursor.execute(
+                    CREATE_DEFAULT_PARTITION.format(
+                        partition=f"{year_partition}_default", table=year_partition
+                    )
+                )
+
+
+def detach_ridership_year(year: int) -> List[str]:
+    """
+    Detach the partitions of a year from the ridership tables and return
+    their names. The detached tables keep their rows until dropped, so they
+    can be archived first.
+    """
+    detached = []
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            year_partition = partition_name(table, year)
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {year_partition}")
+            detached.append(year_partition)
+    return detached
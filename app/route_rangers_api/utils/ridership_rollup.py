@@ -0,0 +1,64 @@
+"""
+Maintain DailyRidership, the daily totals by city, mode of transit and unit
+level (route or station) read by the dashboard metrics
+"""
+
+import datetime
+from typing import Optional
+from django.db import transaction
+from django.db.models import Sum
+
+from route_rangers_api.models import DailyRidership, RidershipRoute, RidershipStation
+
+
+def refresh_daily_ridership(
+    city: str,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> int:
+    """
+    Rebuild the rollup of a city (as named in the database, i.e. CHI) for the
+    dates between start_date and end_date (inclusive), all of them if no
+    dates are given. Returns the number of rows written.
+    """
+    dates = {}
+    if start_date is not None:
+        dates["date__gte"] = start_date
+    if end_date is not None:
+        dates["date__lte"] = end_date
+
+    route_totals = (
+        RidershipRoute.objects.filter(city=city, **dates)
+        .values("route__mode", "date")
+        .annotate(total=Sum("ridership"))
+    )
+    station_totals = (
+        RidershipStation.objects.filter(city=city, **dates)
+        .values("station__mode", "date")
+        .annotate(total=Sum("ridership"))
+    )
+    rows = [
+        DailyRidership(
+            city=city,
+            mode=total["route__mode"],
+            unit_level="route",
+            date=total["date"],
+            ridership=total["total"],
+        )
+        for total in route_totals
+    ] + [
+        DailyRidership(
+            city=city,
+            mode=total["station__mode"],
+            unit_level="station",
+            date=total["date"],
+            ridership=total["total"],
+        )
+        for total in station_totals
+    ]
+
+    # replace the dates touched in one go so readers never see them half done
+    with transaction.atomic():
+        DailyRidership.objects.filter(city=city, **dates).delete()
+        DailyRidership.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
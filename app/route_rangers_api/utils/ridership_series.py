@@ -0,0 +1,149 @@
+"""
+Ridership time series for the trends graph, resampled to days, weeks or months
+and optionally smoothed with a rolling average.
+
+Everything is computed by Postgres over DailyRidership (date_trunc for the
+buckets, a window function for the rolling average) and returned as a single
+JSON string, so long date ranges are never sent to the browser day by day.
+"""
+
+import datetime
+from typing import Dict, List, Optional, Tuple
+from django.db import connection
+
+from route_rangers_api.models import DailyRidership, TransitModes
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+
+GRANULARITIES = ["day", "week", "month"]
+# days averaged by the rolling averages
+ROLLING_WINDOWS = [7, 28]
+# series returned for each mode, "all" is what the trends graph draws
+SERIES_MODES = {
+    "all": ["bus", "subway", "total"],
+    "bus": ["bus"],
+    "subway": ["subway"],
+}
+
+# Bus ridership is reported by route or by station depending on the city,
+# subway ridership by station. The subway series is the city's rail mode
+# (light rail in Portland, see CITY_CONTEXT).
+# Weeks start on Monday. Buckets hold the total ridership of the days in the
+# range and the rolling average as of their last day, which also looks at the
+# days before the start of the range.
+RIDERSHIP_SERIES_SQL = f"""
+WITH daily AS (
+    SELECT d.date,
+        COALESCE(SUM(d.ridership) FILTER (WHERE d.mode = %(bus)s), 0) AS bus,
+        COALESCE(
+            SUM(d.ridership) FILTER (
+                WHERE d.mode = %(subway)s AND d.unit_level = 'station'
+            ),
+            0
+        ) AS subway
+    FROM {DailyRidership._meta.db_table} d
+    WHERE d.city = %(city)s
+        AND (d.mode = %(bus)s OR (d.mode = %(subway)s AND d.unit_level = 'station'))
+        {{daily_filters}}
+    GROUP BY d.date
+),
+smoothed AS (
+    SELECT daily.date, daily.bus, daily.subway, daily.bus + daily.subway AS total,
+        AVG(daily.bus) OVER w AS bus_rolling,
+        AVG(daily.subway) OVER w AS subway_rolling,
+        AVG(daily.bus + daily.subway) OVER w AS total_rolling
+    FROM daily
+    WINDOW w AS (
+        ORDER BY daily.date
+        RANGE BETWEEN %(window)s::interval PRECEDING AND CURRENT ROW
+    )
+),
+buckets AS (
+    SELECT date_trunc(%(granularity)s, s.date)::date AS date,
+        SUM(s.bus) AS bus,
+        SUM(s.subway) AS subway,
+        SUM(s.total) AS total,
+        round((array_agg(s.bus_rolling ORDER BY s.date DESC))[1], 1) AS bus_rolling,
+        round((array_agg(s.subway_rolling ORDER BY s.date DESC))[1], 1)
+            AS subway_rolling,
+        round((array_agg(s.total_rolling ORDER BY s.date DESC))[1], 1)
+            AS total_rolling
+    FROM smoothed s
+    WHERE TRUE {{bucket_filters}}
+    GROUP BY 1
+)
+SELECT COALESCE(
+    json_agg(json_build_object('date', b.date, {{fields}}) ORDER BY b.date),
+    '[]'::json
+)::text
+FROM buckets b
+"""
+
+
+def series_fields(mode: str, rolling: Optional[int]) -> List[str]:
+    """
+    Names of the series returned for a mode ("all", "bus" or "subway"), each
+    followed by its rolling average if one was asked for
+    """
+    fields = []
+    for series in SERIES_MODES[mode]:
+        fields.append(series)
+        if rolling is not None:
+            fields.append(f"{series}_rolling")
+    return fields
+
+
+def series_filters(
+    start: Optional[datetime.date],
+    end: Optional[datetime.date],
+    rolling: Optional[int],
+) -> Tuple[str, str, Dict]:
+    """
+    SQL conditions restricting the series to [start, end). The daily totals
+    also include the rolling - 1 days before start so the first rolling
+    averages are computed over a full window.
+    """
+    daily_filters, bucket_filters, params = [], [], {}
+    if start is not None:
+        padding = rolling - 1 if rolling is not None else 0
+        params["start"] = start
+        params["padded_start"] = start - datetime.timedelta(days=padding)
+        daily_filters.append("AND d.date >= %(padded_start)s")
+        bucket_filters.append("AND s.date >= %(start)s")
+    if end is not None:
+        params["end"] = end
+        daily_filters.append("AND d.date < %(end)s")
+    return " ".join(daily_filters), " ".join(bucket_filters), params
+
+
+def get_ridership_series(
+    city: str,
+    granularity: str = "day",
+    mode: str = "all",
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    rolling: Optional[int] = None,
+) -> str:
+    """
+    Given a city return its bus and/or subway ridership between start and
+    end (exclusive) by day, week or month as a JSON list, optionally with
+    the 7 or 28 day rolling averages
+    """
+    daily_filters, bucket_filters, params = series_filters(start, end, rolling)
+    fields = ", ".join(
+        f"'{field}', b.{field}" for field in series_fields(mode, rolling)
+    )
+    sql = RIDERSHIP_SERIES_SQL.format(
+        daily_filters=daily_filters, bucket_filters=bucket_filters, fields=fields
+    )
+    params.update(
+        {
+            "city": CITY_CONTEXT[city]["DB_Name"],
+            "bus": TransitModes.BUS,
+            "subway": CITY_CONTEXT[city]["subway_mode"],
+            "granularity": granularity,
+            "window": f"{rolling - 1 if rolling is not None else 0} days",
+        }
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
@@ -0,0 +1,175 @@
+"""
+Count the routes drawn by survey respondents on a square grid, so the
+dashboard can show where the demand is at a payload size that only depends on
+the area covered, not on the number of responses.
+
+Every cell stores how many routes cross it and how many start or end in it.
+The counts are kept up to date by survey_p2 when a route is saved (removing
+the previous route of the response if it is redrawn) and can be rebuilt from
+the responses with the rebuild_route_density script.
+"""
+
+import json
+import math
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+from django.db import connection, transaction
+
+from route_rangers_api.models import RouteDensityCell, SurveyResponse
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+
+# degrees, ~500m
+DENSITY_CELL_SIZE = 0.005
+DENSITY_FIELDS = ["x", "y", "routes", "starts", "ends"]
+
+Cell = Tuple[int, int]
+# cell -> [routes, starts, ends]
+CellCounts = Dict[Cell, List[int]]
+
+# Adds the deltas of a batch of cells in one statement, creating the cells
+# seen for the first time
+UPSERT_CELLS_SQL = f"""
+INSERT INTO {RouteDensityCell._meta.db_table} AS cell
+    (city, x, y, routes, starts, ends)
+VALUES {{values}}
+ON CONFLICT (city, x, y) DO UPDATE SET
+    routes = cell.routes + EXCLUDED.routes,
+    starts = cell.starts + EXCLUDED.starts,
+    ends = cell.ends + EXCLUDED.ends
+"""
+
+
+def cell_of(lon: float, lat: float, size: float = DENSITY_CELL_SIZE) -> Cell:
+    return (math.floor(lon / size), math.floor(lat / size))
+
+
+def line_cells(
+    coords: Sequence[Tuple[float, float]], size: float = DENSITY_CELL_SIZE
+) -> Set[Cell]:
+    """
+    Cells crossed by a line given as (lon, lat) pairs, found by walking each
+    segment in steps of a quarter of a cell
+    """
+    cells = set()
+    for (lon1, lat1), (lon2, lat2) in zip(coords, coords[1:]):
+        steps = max(1, math.ceil(math.hypot(lon2 - lon1, lat2 - lat1) / (size / 4)))
+        for step in range(steps + 1):
+            fraction = step / steps
+            cells.add(
+                cell_of(
+                    lon1 + (lon2 - lon1) * fraction,
+                    lat1 + (lat2 - lat1) * fraction,
+                    size,
+                )
+            )
+    if len(coords) == 1:
+        cells.add(cell_of(*coords[0], size))
+    return cells
+
+
+def route_counts(route) -> CellCounts:
+    """
+    Counts added to the grid by a route (a LineString in lon, lat or None)
+    """
+    counts = defaultdict(lambda: [0, 0, 0])
+    if route is None or len(route.coords) == 0:
+        return counts
+    coords = route.coords
+    for cell in line_cells(coords):
+        counts[cell][0] += 1
+    counts[cell_of(*coords[0])][1] += 1
+    counts[cell_of(*coords[-1])][2] += 1
+    return counts
+
+
+def route_deltas(old_route, new_route) -> CellCounts:
+    """
+    Change in the counts of every cell when the route of a response goes
+    from old_route to new_route (either can be None)
+    """
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for sign, route in [(-1, old_route), (1, new_route)]:
+        for cell, counts in route_counts(route).items():
+            for i, count in enumerate(counts):
+                deltas[cell][i] += sign * count
+    return {cell: delta for cell, delta in deltas.items() if any(delta)}
+
+
+def add_to_cells(city: str, deltas: CellCounts) -> None:
+    """
+    Add the given counts to the cells of a city (as named in the database,
+    i.e. CHI)
+    """
+    if not deltas:
+        return
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(deltas))
+    # sorted so concurrent saves lock the cells in the same order
+    params = [
+        value
+        for (x, y), (routes, starts, ends) in sorted(deltas.items())
+        for value in (city, x, y, routes, starts, ends)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_CELLS_SQL.format(values=values), params)
+
+
+def record_route(city: str, old_route, new_route) -> None:
+    """
+    Update the grid of a city (as named in the database, i.e. CHI) after the
+    route of a response was saved, given its route before (None for a new
+    response) and after
+    """
+    add_to_cells(city, route_deltas(old_route, new_route))
+
+
+def rebuild_route_density(city: str) -> int:
+    """
+    Recount the routes of a city (as named in the database, i.e. CHI) on the
+    grid from the survey responses. Returns the number of cells written.
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+    drawn_routes = (
+        SurveyResponse.objects.filter(city=city)
+        .exclude(route=None)
+        .values_list("route", flat=True)
+    )
+    for route in drawn_routes.iterator():
+        for cell, counts in route_counts(route).items():
+            for i, count in enumerate(counts):
+                totals[cell][i] += count
+
+    with transaction.atomic():
+        RouteDensityCell.objects.filter(city=city).delete()
+        RouteDensityCell.objects.bulk_create(
+            [
+                RouteDensityCell(
+                    city=city, x=x, y=y, routes=routes, starts=starts, ends=ends
+                )
+                for (x, y), (routes, starts, ends) in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def get_route_density(city: str) -> str:
+    """
+    Given a city return its grid as JSON: the cell size in degrees and the
+    fields of every non empty cell one after the other in `cells`, so cell
+    i is cells[i * 5:(i + 1) * 5]. Cell (x, y) covers longitudes
+    [x * cell_size, (x + 1) * cell_size) and the same for latitudes.
+    """
+    cells = (
+        RouteDensityCell.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
+        .exclude(routes=0, starts=0, ends=0)
+        .order_by("x", "y")
+        .values_list(*DENSITY_FIELDS)
+    )
+    return json.dumps(
+        {
+            "cell_size": DENSITY_CELL_SIZE,
+            "fields": DENSITY_FIELDS,
+            "cells": [value for cell in cells for value in cell],
+        },
+        separators=(",", ":"),
+    )
@@ -0,0 +1,76 @@
+"""
+Service calendar of the ridership data: every date is a weekday, Saturday,
+Sunday or holiday (federal holidays, on the day they are observed). The day
+type is stored on the ridership rows at ingestion so weekday/weekend splits
+are equality filters instead of extracting the day of the week of every row.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Dict
+
+# day types counted as weekend by the dashboard, holidays usually run a
+# Sunday schedule
+WEEKEND_DAY_TYPES = ["saturday", "sunday", "holiday"]
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> datetime.date:
+    """
+    Date of the nth weekday (Monday is 0) of a month, the last one if n is -1
+    """
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + datetime.timedelta(days=offset + 7 * (n - 1))
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(holiday: datetime.date) -> datetime.date:
+    """
+    Holidays falling on a Saturday are observed on Friday, on a Sunday on Monday
+    """
+    if holiday.weekday() == 5:
+        return holiday - datetime.timedelta(days=1)
+    if holiday.weekday() == 6:
+        return holiday + datetime.timedelta(days=1)
+    return holiday
+
+
+@lru_cache(maxsize=None)
+def federal_holidays(year: int) -> Dict[datetime.date, str]:
+    """
+    Observed dates of the federal holidays of a year
+    """
+    holidays = {
+        observed(datetime.date(year, 1, 1)): "New Year's Day",
+        nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+        nth_weekday(year, 2, 0, 3): "Presidents' Day",
+        nth_weekday(year, 5, 0, -1): "Memorial Day",
+        observed(datetime.date(year, 7, 4)): "Independence Day",
+        nth_weekday(year, 9, 0, 1): "Labor Day",
+        nth_weekday(year, 10, 0, 2): "Columbus Day",
+        observed(datetime.date(year, 11, 11)): "Veterans Day",
+        nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+        observed(datetime.date(year, 12, 25)): "Christmas Day",
+    }
+    if year >= 2021:
+        holidays[observed(datetime.date(year, 6, 19))] = "Juneteenth"
+    return holidays
+
+
+def get_day_type(date: datetime.date) -> str:
+    """
+    Day type of a date: weekday, saturday, sunday or holiday
+    """
+    if isinstance(date, datetime.datetime):
+        date = date.date()
+    # New Year's Day can be observed on December 31 of the year before
+    if date in federal_holidays(date.year) or date in federal_holidays(date.year + 1):
+        return "holiday"
+    if date.weekday() == 5:
+        return "saturday"
+    if date.weekday() == 6:
+        return "sunday"
+    return "weekday"
@@ -0,0 +1,85 @@
+"""
+Content-hashed and precompressed copies of the large static files generated
+by our scripts (i.e. the census GeoJSONs of the heatmap).
+
+The hash in the file name changes whenever the content does, so browsers and
+CDNs can cache them forever. WhiteNoise serves the .gz/.br siblings to the
+clients that accept them.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Dict
+
+STATIC_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"
+)
+MANIFEST_NAME = "artifacts_manifest.json"
+HASH_LENGTH = 12
+
+
+def fingerprinted_name(name: str, content: bytes) -> str:
+    """
+    Insert the hash of the content before the extension of a file name
+    (i.e. ChicagoCensus_2020.geojson -> ChicagoCensus_2020.1a2b3c4d5e6f.geojson)
+    """
+    digest = hashlib.md5(content, usedforsecurity=False).hexdigest()[:HASH_LENGTH]
+    root, extension = os.path.splitext(name)
+    return f"{root}.{digest}{extension}"
+
+
+def load_manifest(folder: str = STATIC_FOLDER) -> Dict[str, str]:
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def fingerprint_static_file(path: str) -> str:
+    """
+    Write the hashed, gzipped and brotli compressed copies of a file next to
+    it, drop the copies of its previous versions and record the new name in
+    the manifest. Returns the hashed name.
+    """
+    # only needed when generating the files, not to serve them
+    import brotli
+
+    folder, name = os.path.split(path)
+    with open(path, "rb") as f:
+        content = f.read()
+
+    manifest = load_manifest(folder)
+    hashed_name = fingerprinted_name(name, content)
+    previous_name = manifest.get(name)
+    if previous_name and previous_name != hashed_name:
+        for suffix in ["", ".gz", ".br"]:
+            previous_path = os.path.join(folder, previous_name + suffix)
+            if os.path.exists(previous_path):
+                os.remove(previous_path)
+
+    hashed_path = os.path.join(folder, hashed_name)
+    with open(hashed_path, "wb") as f:
+        f.write(content)
+    # mtime=0 so the same content always produces the same bytes
+    with open(hashed_path + ".gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    with open(hashed_path + ".br", "wb") as f:
+        f.write(brotli.compress(content, quality=11))
+
+    manifest[name] = hashed_name
+    with open(os.path.join(folder, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return hashed_name
+
+
+@lru_cache
+def get_fingerprinted_name(name: str) -> str:
+    """
+    Return the hashed name of a static file, or the name itself if it was
+    never fingerprinted. The manifest only changes on deploy, so it is cached.
+    """
+    return load_manifest().get(name, name)
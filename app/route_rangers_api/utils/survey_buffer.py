@@ -0,0 +1,160 @@
+"""
+Optional write-behind buffer for the survey. When SURVEY_WRITE_BUFFER is set
+to the path of a SQLite file, the survey pages append their validated answers
+to it instead of writing to the database, so their latency doesn't depend on
+how loaded the database is. The flush_survey_buffer script applies them in
+order, in one transaction per batch.
+
+The journal is a local file: it has to be on a persistent disk and the script
+has to run on the same machine as the web server. Answers show up in the
+dashboard once they are flushed.
+"""
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.geos import GEOSGeometry
+from django.db import transaction
+
+from route_rangers_api.models import SurveyResponse, SurveyUser
+from route_rangers_api.utils.caching import expire_layer, invalidate_layer
+from route_rangers_api.utils.city_mapping import CITIES_CHOICES_SURVEY
+from route_rangers_api.utils.survey_responses import (
+    save_survey_trip,
+    save_survey_user,
+)
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS survey_submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    error TEXT
+)
+"""
+
+# kind of page -> model of its answers and how to save them
+SUBMISSION_KINDS = {
+    "user": (SurveyUser, save_survey_user),
+    "trip": (SurveyResponse, save_survey_trip),
+}
+
+# layers of the dashboard and responses pages showing survey answers
+SURVEY_LAYERS = ["responses", "user_routes_density", "survey_flows"]
+
+# city as named in the database -> as named in the urls
+SURVEY_CITIES = {db_name: city for city, db_name in CITIES_CHOICES_SURVEY.items()}
+
+_journals = threading.local()
+
+
+def open_journal(path: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Connection to the journal, one per thread and path
+    """
+    path = path or settings.SURVEY_WRITE_BUFFER
+    journals = _journals.__dict__.setdefault("by_path", {})
+    if path not in journals:
+        journal = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # readers don't block the writers, every append is synced to disk
+        journal.execute("PRAGMA journal_mode=WAL")
+        journal.execute("PRAGMA synchronous=FULL")
+        journal.execute(JOURNAL_SCHEMA)
+        journals[path] = journal
+    return journals[path]
+
+
+def encode_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Make the answers of a page JSON serializable, geometries as EWKT
+    """
+    return {
+        name: value.ewkt if isinstance(value, GEOSGeometry) else value
+        for name, value in values.items()
+    }
+
+
+def decode_values(model, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inverse of encode_values for the fields of a model
+    """
+    return {
+        name: (
+            GEOSGeometry(value)
+            if value is not None
+            and isinstance(model._meta.get_field(name), GeometryField)
+            else value
+        )
+        for name, value in values.items()
+    }
+
+
+def save_submission(kind: str, payload: Dict[str, Any]) -> None:
+    """
+    Write the answers of a page to the database
+    """
+    model, save = SUBMISSION_KINDS[kind]
+    save(**{**payload, "values": decode_values(model, payload["values"])})
+
+
+def submit_survey_page(kind: str, **payload) -> None:
+    """
+    Save the answers of a page of kind "user" (first page) or "trip", right
+    away or through the buffer if SURVEY_WRITE_BUFFER is set. The payload is
+    the arguments of save_survey_user or save_survey_trip.
+    """
+    if not settings.SURVEY_WRITE_BUFFER:
+        SUBMISSION_KINDS[kind][1](**payload)
+        return
+    payload = {**payload, "values": encode_values(payload["values"])}
+    open_journal().execute(
+        "INSERT INTO survey_submissions (kind, payload) VALUES (?, ?)",
+        (kind, json.dumps(payload)),
+    )
+
+
+def flush_survey_buffer(batch_size: int = 500, path: Optional[str] = None) -> int:
+    """
+    Apply the oldest batch of buffered pages in one transaction and remove
+    them from the journal. A page that can't be saved is kept in the journal
+    with its error and skipped. Returns the number of pages read.
+    """
+    journal = open_journal(path)
+    rows = journal.execute(
+        "SELECT id, kind, payload FROM survey_submissions "
+        "WHERE error IS NULL ORDER BY id LIMIT ?",
+        (batch_size,),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    cities = set()
+    with transaction.atomic():
+        for submission_id, kind, payload in rows:
+            payload = json.loads(payload)
+            try:
+                with transaction.atomic():
+                    save_submission(kind, payload)
+            except Exception as e:
+                print(f"survey submission {submission_id} not saved: {e}")
+                journal.execute(
+                    "UPDATE survey_submissions SET error = ? WHERE id = ?",
+                    (repr(e), submission_id),
+                )
+                continue
+            cities.add(payload["city"])
+    # replaying a batch if this fails doesn't change the counts, see
+    # utils.survey_responses
+    journal.execute(
+        "DELETE FROM survey_submissions WHERE id <= ? AND error IS NULL",
+        (rows[-1][0],),
+    )
+
+    for city in cities:
+        for layer in SURVEY_LAYERS:
+            expire_layer(SURVEY_CITIES[city], layer)
+        invalidate_layer(SURVEY_CITIES[city], "user_routes")
+    return len(rows)
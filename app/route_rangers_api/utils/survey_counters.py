@@ -0,0 +1,151 @@
+"""
+Keep SurveyCounter, the number of survey answers of each city by question and
+answer, up to date as the survey is filled, so the responses page reads a
+few counters instead of counting every SurveyUser and SurveyResponse.
+
+The survey views take the answers of a user or response before and after
+saving it and apply the difference in one upsert, so editing an answer
+moves one count from the old answer to the new one.
+"""
+
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from django.db import connection, transaction
+from django.db.models import Count
+
+from route_rangers_api.models import SurveyCounter, SurveyResponse, SurveyUser
+
+# question -> answer picked, None if not answered
+Answers = Dict[str, Optional[int]]
+# question -> answer -> count
+SurveyCounts = Dict[str, Dict[int, int]]
+
+# the suggested improvements are graphed separately for car owners
+IMPROVEMENT_QUESTIONS = {
+    1: "transit_improvement_drivers",
+    2: "transit_improvement_riders",
+}
+RESPONSE_QUESTIONS = ["modes_of_transit", "trip_tod", "satisfied"]
+
+# Adds the deltas of a batch of answers in one statement, creating the
+# counters seen for the first time
+UPSERT_COUNTERS_SQL = f"""
+INSERT INTO {SurveyCounter._meta.db_table} AS counter (city, question, answer, count)
+VALUES {{values}}
+ON CONFLICT ON CONSTRAINT survey_counter
+DO UPDATE SET count = counter.count + EXCLUDED.count
+"""
+
+
+def user_answers(user: Optional[SurveyUser]) -> Answers:
+    """
+    Answers counted for a user, every user is counted under "users"
+    """
+    if user is None:
+        return {}
+    return {"users": 1, "frequent_transit": user.frequent_transit}
+
+
+def response_answers(response: Optional[SurveyResponse]) -> Answers:
+    """
+    Answers counted for a response to the trip questions
+    """
+    if response is None:
+        return {}
+    answers = {question: getattr(response, question) for question in RESPONSE_QUESTIONS}
+    improvement_question = IMPROVEMENT_QUESTIONS.get(response.user_id.car_owner)
+    if improvement_question is not None:
+        answers[improvement_question] = response.transit_improvement
+    return answers
+
+
+def answer_deltas(old: Answers, new: Answers) -> Dict[Tuple[str, int], int]:
+    """
+    Change in the count of every (question, answer) when the answers of a
+    user or response go from old to new
+    """
+    deltas = defaultdict(int)
+    for question in old.keys() | new.keys():
+        old_answer, new_answer = old.get(question), new.get(question)
+        if old_answer == new_answer:
+            continue
+        if old_answer is not None:
+            deltas[(question, old_answer)] -= 1
+        if new_answer is not None:
+            deltas[(question, new_answer)] += 1
+    return {key: delta for key, delta in deltas.items() if delta != 0}
+
+
+def record_answers(city: str, old: Answers, new: Answers) -> None:
+    """
+    Update the counters of a city (as named in the database, i.e. CHI) after
+    a user or response was saved, given its answers before (empty for a new
+    one) and after
+    """
+    deltas = answer_deltas(old, new)
+    if not deltas:
+        return
+    values = ", ".join(["(%s, %s, %s, %s)"] * len(deltas))
+    # sorted so concurrent saves lock the counters in the same order
+    params = [
+        value
+        for (question, answer), delta in sorted(deltas.items())
+        for value in (city, question, answer, delta)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_COUNTERS_SQL.format(values=values), params)
+
+
+def get_survey_counts(city: str) -> SurveyCounts:
+    """
+    Given a city (as named in the database, i.e. CHI) return its counters
+    """
+    counts = defaultdict(dict)
+    for counter in SurveyCounter.objects.filter(city=city):
+        counts[counter.question][counter.answer] = counter.count
+    return dict(counts)
+
+
+def rebuild_survey_counters(city: str) -> int:
+    """
+    Recount the answers of a city (as named in the database, i.e. CHI) from
+    the survey tables. Returns the number of counters written.
+    """
+    users = SurveyUser.objects.filter(city=city)
+    responses = SurveyResponse.objects.filter(city=city)
+    counts = defaultdict(int)
+    counts[("users", 1)] = users.count()
+    for row in (
+        users.exclude(frequent_transit=None)
+        .values("frequent_transit")
+        .annotate(count=Count("user_id"))
+        .order_by()
+    ):
+        counts[("frequent_transit", row["frequent_transit"])] = row["count"]
+    for question in RESPONSE_QUESTIONS:
+        for row in (
+            responses.exclude(**{question: None})
+            .values(question)
+            .annotate(count=Count("id"))
+            .order_by()
+        ):
+            counts[(question, row[question])] = row["count"]
+    for row in (
+        responses.exclude(transit_improvement=None)
+        .filter(user_id__car_owner__in=list(IMPROVEMENT_QUESTIONS))
+        .values("user_id__car_owner", "transit_improvement")
+        .annotate(count=Count("id"))
+        .order_by()
+    ):
+        question = IMPROVEMENT_QUESTIONS[row["user_id__car_owner"]]
+        counts[(question, row["transit_improvement"])] = row["count"]
+
+    with transaction.atomic():
+        SurveyCounter.objects.filter(city=city).delete()
+        SurveyCounter.objects.bulk_create(
+            [
+                SurveyCounter(city=city, question=question, answer=answer, count=count)
+                for (question, answer), count in counts.items()
+            ]
+        )
+    return len(counts)
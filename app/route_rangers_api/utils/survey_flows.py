@@ -0,0 +1,165 @@
+"""
+Count the survey trips of each city between census tracts (an origin-destination
+matrix) by mode and time of day, so flow maps read a few sparse counts instead
+of locating every starting and end point in the tract polygons.
+
+survey_p2 locates the two ends of a route in the tracts once, in the
+statement saving it (see utils.survey_responses), and moves its trip from its
+previous flow (if the route, mode or time of day was changed) to the new one.
+The matrix can be rebuilt from the responses with the rebuild_survey_flows script.
+"""
+
+import json
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from django.contrib.gis.db.models.functions import PointOnSurface
+from django.db import connection, transaction
+
+from route_rangers_api.models import Demographics, SurveyResponse, SurveyTripFlow
+from route_rangers_api.utils.city_mapping import (
+    CITY_CONTEXT,
+    MODES_OF_TRANSIT,
+    TIME_OF_DAY,
+)
+
+FLOW_FIELDS = ["origin", "destination", "modes_of_transit", "trip_tod", "count"]
+
+# origin tract, destination tract, mode, time of day
+Flow = Tuple[int, int, int, int]
+
+SURVEY_FLOWS_TABLE = SurveyTripFlow._meta.db_table
+
+# Adds the deltas of a batch of flows in one statement, creating the flows
+# seen for the first time
+UPSERT_FLOWS_SQL = f"""
+INSERT INTO {SURVEY_FLOWS_TABLE} AS flow
+    (city, origin_id, destination_id, modes_of_transit, trip_tod, count)
+VALUES {{values}}
+ON CONFLICT (city, origin_id, destination_id, modes_of_transit, trip_tod)
+DO UPDATE SET count = flow.count + EXCLUDED.count
+"""
+
+# Id of the tract containing a point, NULL if it is outside every tract
+TRACT_OF_SQL = f"""(
+    SELECT d.id FROM {Demographics._meta.db_table} d
+    WHERE ST_Contains(d.geographic_delimitation, {{point}})
+    ORDER BY d.id LIMIT 1
+)"""
+
+# Spatial join of the starting and end points of the responses of a city
+# with the tract polygons
+ASSIGN_TRACTS_SQL = f"""
+UPDATE {SurveyResponse._meta.db_table} r
+SET origin_tract_id = {TRACT_OF_SQL.format(point="r.starting_point")},
+    destination_tract_id = {TRACT_OF_SQL.format(point="r.end_point")}
+WHERE r.city = %(city)s
+"""
+
+COUNT_FLOWS_SQL = f"""
+INSERT INTO {SURVEY_FLOWS_TABLE}
+    (city, origin_id, destination_id, modes_of_transit, trip_tod, count)
+SELECT city, origin_tract_id, destination_tract_id, modes_of_transit, trip_tod,
+    count(*)
+FROM {SurveyResponse._meta.db_table}
+WHERE city = %(city)s
+    AND origin_tract_id IS NOT NULL AND destination_tract_id IS NOT NULL
+    AND modes_of_transit IS NOT NULL AND trip_tod IS NOT NULL
+GROUP BY city, origin_tract_id, destination_tract_id, modes_of_transit, trip_tod
+"""
+
+
+def response_flow(response: Optional[SurveyResponse]) -> Optional[Flow]:
+    """
+    Flow a response is counted in, None if it isn't counted (both ends must be
+    in a tract and the mode and time of day answered)
+    """
+    if response is None:
+        return None
+    flow = (
+        response.origin_tract_id,
+        response.destination_tract_id,
+        response.modes_of_transit,
+        response.trip_tod,
+    )
+    return None if None in flow else flow
+
+
+def flow_deltas(old: Optional[Flow], new: Optional[Flow]) -> Dict[Flow, int]:
+    """
+    Change in the count of every flow when a response goes from the old flow
+    to the new one
+    """
+    deltas = defaultdict(int)
+    if old is not None:
+        deltas[old] -= 1
+    if new is not None:
+        deltas[new] += 1
+    return {flow: delta for flow, delta in deltas.items() if delta != 0}
+
+
+def record_flow(city: str, old: Optional[Flow], new: Optional[Flow]) -> None:
+    """
+    Update the matrix of a city (as named in the database, i.e. CHI) after a
+    response was saved, given its flow before (None for a new response) and
+    after
+    """
+    deltas = flow_deltas(old, new)
+    if not deltas:
+        return
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(deltas))
+    # sorted so concurrent saves lock the flows in the same order
+    params = [
+        value
+        for flow, delta in sorted(deltas.items())
+        for value in (city, *flow, delta)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_FLOWS_SQL.format(values=values), params)
+
+
+def rebuild_survey_flows(city: str) -> int:
+    """
+    Locate the responses of a city (as named in the database, i.e. CHI) in
+    the tracts again and recount its matrix. Returns the number of flows
+    written.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(ASSIGN_TRACTS_SQL, {"city": city})
+        SurveyTripFlow.objects.filter(city=city).delete()
+        cursor.execute(COUNT_FLOWS_SQL, {"city": city})
+        return cursor.rowcount
+
+
+def get_survey_flows(city: str) -> str:
+    """
+    Given a city return its matrix as JSON: the fields of every non empty
+    flow one after the other in `flows`, so flow i is flows[i * 5:(i + 1) * 5],
+    and the GEOID and a point inside every tract they refer to, by tract id.
+    """
+    flows = list(
+        SurveyTripFlow.objects.filter(city=CITY_CONTEXT[city]["DB_Name"], count__gt=0)
+        .order_by("origin", "destination", "modes_of_transit", "trip_tod")
+        .values_list(*FLOW_FIELDS)
+    )
+    tract_ids = {flow[0] for flow in flows} | {flow[1] for flow in flows}
+    tracts = (
+        Demographics.objects.filter(id__in=tract_ids)
+        .annotate(center=PointOnSurface("geographic_delimitation"))
+        .values_list("id", "state", "county", "census_tract", "center")
+    )
+    return json.dumps(
+        {
+            "fields": FLOW_FIELDS,
+            "flows": [value for flow in flows for value in flow],
+            "tracts": {
+                tract_id: {
+                    "geoid": f"{state}{county}{census_tract}",
+                    "center": [round(center.x, 5), round(center.y, 5)],
+                }
+                for tract_id, state, county, census_tract, center in tracts
+            },
+            "modes_of_transit": MODES_OF_TRANSIT,
+            "trip_tod": TIME_OF_DAY,
+        },
+        separators=(",", ":"),
+    )
@@ -0,0 +1,176 @@
+"""
+Save the answers of each page of the survey about a trip with a single
+INSERT ... ON CONFLICT DO UPDATE on the survey_route constraint (user and
+route id), instead of fetching the response and then saving it. A page
+submitted twice or from two tabs updates the same row instead of failing on
+the constraint.
+
+The statement also returns the row as it was before, so the views can update
+the counters (utils.survey_counters, utils.route_density, utils.survey_flows)
+without reading it first. Concurrent submits of the same trip (i.e. from two
+tabs) are serialized with a lock on the user and route id taken before the
+statement, so each one sees the row written by the previous one. The counters
+are updated in the same transaction as the row, each kind in one statement
+writing its rows sorted, so concurrent saves of different trips lock the
+shared counters in the same order and can't deadlock.
+
+Saving a page twice (i.e. replaying the write buffer, see utils.survey_buffer)
+leaves the row and the counters as saving it once.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from django.db import connection, transaction
+from django.forms import ModelForm
+
+from route_rangers_api.models import SurveyResponse, SurveyUser
+from route_rangers_api.utils.route_density import record_route
+from route_rangers_api.utils.survey_counters import (
+    record_answers,
+    response_answers,
+    user_answers,
+)
+from route_rangers_api.utils.survey_flows import (
+    TRACT_OF_SQL,
+    record_flow,
+    response_flow,
+)
+
+SURVEY_RESPONSES_TABLE = SurveyResponse._meta.db_table
+SURVEY_USERS_TABLE = SurveyUser._meta.db_table
+
+# Columns set from an answer in the same statement
+DERIVED_COLUMNS = {
+    "starting_point": (
+        "origin_tract_id",
+        TRACT_OF_SQL.format(point="%(starting_point)s"),
+    ),
+    "end_point": ("destination_tract_id", TRACT_OF_SQL.format(point="%(end_point)s")),
+}
+
+# old is the row before the statement (empty for a new trip), new the row
+# written. The car_owner answer of the user is needed to count the suggested
+# improvements.
+UPSERT_RESPONSE_SQL = f"""
+WITH old AS (
+    SELECT r.*, false AS is_new
+    FROM {SURVEY_RESPONSES_TABLE} r
+    WHERE r.user_id_id = %(user_id_id)s AND r.route_id = %(route_id)s
+),
+new AS (
+    INSERT INTO {SURVEY_RESPONSES_TABLE} AS r
+        (user_id_id, route_id, city, response_date, {{columns}})
+    VALUES (%(user_id_id)s, %(route_id)s, %(city)s, now(), {{values}})
+    ON CONFLICT ON CONSTRAINT survey_route DO UPDATE SET {{updates}}
+    RETURNING r.*, true AS is_new
+)
+SELECT response.*, u.car_owner AS user_car_owner
+FROM (SELECT * FROM old UNION ALL SELECT * FROM new) response
+JOIN {SURVEY_USERS_TABLE} u ON u.user_id = response.user_id_id
+"""
+
+# Held until the end of the transaction. A row lock (SELECT ... FOR UPDATE)
+# wouldn't serialize the first submits of a trip, when there is no row yet.
+LOCK_TRIP_SQL = "SELECT pg_advisory_xact_lock(hashtext(%(key)s))"
+
+# Returns the user id only if the user is new
+INSERT_USER_SQL = f"""
+INSERT INTO {SURVEY_USERS_TABLE} (user_id, city, {{columns}})
+VALUES (%(user_id)s, %(city)s, {{values}})
+ON CONFLICT (user_id) DO NOTHING
+RETURNING user_id
+"""
+
+
+def form_values(form: ModelForm) -> Dict[str, Any]:
+    """
+    Cleaned values of the model fields of a valid survey form
+    """
+    return {name: form.cleaned_data[name] for name in form._meta.fields}
+
+
+def build_upsert(
+    user_id: str, route_id: int, city: str, values: Dict[str, Any]
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters saving the given field values of a trip
+    """
+    params = {"user_id_id": user_id, "route_id": str(route_id), "city": city}
+    columns, placeholders = [], []
+    for name, value in values.items():
+        field = SurveyResponse._meta.get_field(name)
+        columns.append(field.column)
+        placeholders.append(f"%({name})s")
+        params[name] = field.get_db_prep_save(value, connection)
+        if name in DERIVED_COLUMNS:
+            column, expression = DERIVED_COLUMNS[name]
+            columns.append(column)
+            placeholders.append(expression)
+    sql = UPSERT_RESPONSE_SQL.format(
+        columns=", ".join(columns),
+        values=", ".join(placeholders),
+        updates=", ".join(f"{column} = EXCLUDED.{column}" for column in columns),
+    )
+    return sql, params
+
+
+def upsert_survey_response(
+    user_id: str, route_id: int, city: str, values: Dict[str, Any]
+) -> Tuple[Optional[SurveyResponse], SurveyResponse]:
+    """
+    Save the given field values of the trip route_id of a user in a city (as
+    named in the database, i.e. CHI), creating it if needed. Returns the
+    response before (None if it is new) and after.
+    """
+    old = new = None
+    sql, params = build_upsert(user_id, route_id, city, values)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                LOCK_TRIP_SQL, {"key": f"{SURVEY_RESPONSES_TABLE}:{user_id}:{route_id}"}
+            )
+        for response in SurveyResponse.objects.raw(sql, params):
+            # avoid a query when the counters read the car_owner answer
+            response.user_id = SurveyUser(
+                user_id=response.user_id_id, car_owner=response.user_car_owner
+            )
+            if response.is_new:
+                new = response
+            else:
+                old = response
+    return old, new
+
+
+def save_survey_user(user_id: str, city: str, values: Dict[str, Any]) -> None:
+    """
+    Save a new user of a city (as named in the database, i.e. CHI) with the
+    answers to the first page and count them
+    """
+    params = {"user_id": user_id, "city": city}
+    for name, value in values.items():
+        params[name] = SurveyUser._meta.get_field(name).get_db_prep_save(
+            value, connection
+        )
+    sql = INSERT_USER_SQL.format(
+        columns=", ".join(values), values=", ".join(f"%({name})s" for name in values)
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            is_new = cursor.fetchone() is not None
+        if is_new:
+            record_answers(
+                city, {}, user_answers(SurveyUser(user_id=user_id, city=city, **values))
+            )
+
+
+def save_survey_trip(
+    user_id: str, route_id: int, city: str, values: Dict[str, Any]
+) -> None:
+    """
+    Save the answers to a page about a trip and update the counters
+    """
+    with transaction.atomic():
+        old, new = upsert_survey_response(user_id, route_id, city, values)
+        record_answers(city, response_answers(old), response_answers(new))
+        record_route(city, old.route if old else None, new.route)
+        record_flow(city, response_flow(old), response_flow(new))
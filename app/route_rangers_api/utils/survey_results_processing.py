@@ -14,167 +14,113 @@ import geopandas as gpd
 from geopandas import GeoDataFrame
 import json
 from shapely.geometry import MultiPolygon
-from django.db.models import Avg, Count, Sum
-from typing import Dict
-
-
-from route_rangers_api.models import (
-    SurveyUser,
-    SurveyResponse,
-)
-from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from typing import Dict, List
+
+
+from route_rangers_api.utils.survey_counters import SurveyCounts
+
+
+# Answer choices of the survey questions graphed in the responses page
+MODES_OF_TRANSIT = {
+    1: "Bus",
+    2: "Train",
+    3: "Car",
+    4: "Bike",
+    5: "Walking",
+    6: "Rideshare",
+}
+TIME_OF_DAY = {1: "Peak Commute Hours", 2: "Daytime", 3: "Night"}
+TRANSIT_IMPROVEMENT = {
+    1: "More frequent service",
+    2: "More accurate schedule times",
+    3: "Fewer transfers or a more direct route",
+    4: "It feels safe at the station and onboard",
+    5: "No improvement needed",
+}
+
+
+def fill_choice_counts(
+    counts: Dict[int, int], choices: Dict[int, str], label: str
+) -> List[Dict]:
+    """
+    Given the number of responses by answer, return a count for every
+    choice of the question in order, 0 for those nobody picked
+    """
+    return [
+        {label: choice_name, "count": counts.get(choice_id, 0)}
+        for choice_id, choice_name in choices.items()
+    ]
 
 
-def get_number_of_responses(city: str) -> int:
+def get_number_of_responses(counts: SurveyCounts) -> int:
     """
-    Given a city return the number of users who
+    Given the survey counters of a city return the number of users who
     filled out our transit survey
     """
-    all_responses = (
-        SurveyUser.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-        .distinct("user_id")
-        .count()
-    )
-    return all_responses
+    return counts.get("users", {}).get(1, 0)
 
 
-def get_transit_use_pct(city: str) -> float:
+def get_transit_use_pct(counts: SurveyCounts) -> float:
     """
-    Given a city return the number of users who
+    Given the survey counters of a city return the percentage of users who
     use transit regularly
     """
-
-    use_transit = SurveyUser.objects.filter(
-        city=CITY_CONTEXT[city]["DB_Name"], frequent_transit=1
-    ).aggregate(daily_ridership=(Sum("frequent_transit")))
-
-    if use_transit != 0:
-        percentage = (
-            use_transit["daily_ridership"]
-            / (
-                SurveyUser.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-                .distinct("user_id")
-                .count()
-            )
-            * 100
-        )
-    else:
+    users = get_number_of_responses(counts)
+    if users == 0:
         return "No answers yet!"
-
+    percentage = counts.get("frequent_transit", {}).get(1, 0) / users * 100
     return round(percentage, 1)
 
 
-def get_rider_satisfaction(city: str) -> float:
+def get_rider_satisfaction(counts: SurveyCounts) -> float:
     """
-    Given a city return the avg transit satisfaction
-    rating for reponses that include an answer to that
-    question (e.g. exclude null responses)
+    Given the survey counters of a city return the avg transit satisfaction
+    rating for reponses that include an answer to that question
     """
-    satisfied_responses = (
-        SurveyResponse.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-        .exclude(satisfied=None)
-        .count()
-    )
-
-    if satisfied_responses != 0:
-        average = (
-            SurveyResponse.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-            .exclude(satisfied=None)
-            .aggregate((Sum("satisfied")))
-        )["satisfied__sum"] / satisfied_responses
-    else:
-        "No satisfaction ratings yet!"
+    satisfied_responses = sum(counts.get("satisfied", {}).values())
+    if satisfied_responses == 0:
+        return "No satisfaction ratings yet!"
+    total = sum(rating * count for rating, count in counts.get("satisfied", {}).items())
+    return round(total / satisfied_responses, 1)
 
-    return round(average, 1)
 
-
-def get_transit_mode(city: str) -> Dict:
+def get_transit_mode(counts: SurveyCounts) -> List[Dict]:
     """
-    Given a city, return a dictionary with a count
-    of responses by transit mode. Legend for transit modes:
+    Given the survey counters of a city, return a list with a count
+    of responses by transit mode
     """
-    MODES_OF_TRANSIT = {
-        1: "Bus",
-        2: "Train",
-        3: "Car",
-        4: "Bike",
-        5: "Walking",
-        6: "Rideshare",
-    }
-
-    mode_count = []
-
-    for mode_id, mode_name in MODES_OF_TRANSIT.items():
-        count_by_mode = SurveyResponse.objects.filter(
-            city=CITY_CONTEXT[city]["DB_Name"], modes_of_transit=mode_id
-        ).count()
-        mode_count.append({"transit_type": mode_name, "count": count_by_mode})
-
-    return mode_count
+    return fill_choice_counts(
+        counts.get("modes_of_transit", {}), MODES_OF_TRANSIT, "transit_type"
+    )
 
 
-def get_trip_top(city: str) -> Dict:
+def get_trip_top(counts: SurveyCounts) -> List[Dict]:
     """
-    Given a city, return a dictionary with a count
+    Given the survey counters of a city, return a list with a count
     of responses by time of day
     """
-
-    TIME_OF_DAY = {1: "Peak Commute Hours", 2: "Daytime", 3: "Night"}
-    tod_count = []
-
-    for tod_id, tod_name in TIME_OF_DAY.items():
-        count_by_tod = SurveyResponse.objects.filter(
-            city=CITY_CONTEXT[city]["DB_Name"], trip_tod=tod_id
-        ).count()
-        tod_count.append({"tod": tod_name, "count": count_by_tod})
-
-    return tod_count
+    return fill_choice_counts(counts.get("trip_tod", {}), TIME_OF_DAY, "tod")
 
 
-def get_transit_improv_drivers_dict(city: str) -> Dict:
+def get_transit_improv_drivers_dict(counts: SurveyCounts) -> List[Dict]:
     """
-    Given a city, return a dictionary with a count
-    of responses by suggested improvement
+    Given the survey counters of a city, return a list with a count of
+    responses by suggested improvement from car owners
     """
-    TRANSIT_IMPROVEMENT = {
-        1: "More frequent service",
-        2: "More accurate schedule times",
-        3: "Fewer transfers or a more direct route",
-        4: "It feels safe at the station and onboard",
-        5: "No improvement needed",
-    }
-
-    improv = []
-    for improv_id, improv_name in TRANSIT_IMPROVEMENT.items():
-        count_by_improv = SurveyResponse.objects.filter(
-            city=CITY_CONTEXT[city]["DB_Name"],
-            transit_improvement=improv_id,
-            user_id_id__car_owner=1,  # Filter by car_owner
-        ).count()
-        improv.append({"transit_type": improv_name, "count": count_by_improv})
-    return improv
+    return fill_choice_counts(
+        counts.get("transit_improvement_drivers", {}),
+        TRANSIT_IMPROVEMENT,
+        "transit_type",
+    )
 
 
-def get_transit_improv_riders_dict(city: str) -> Dict:
+def get_transit_improv_riders_dict(counts: SurveyCounts) -> List[Dict]:
     """
-    Given a city, return a dictionary with a count
-    of responses by suggested improvement
+    Given the survey counters of a city, return a list with a count of
+    responses by suggested improvement from people without a car
     """
-    TRANSIT_IMPROVEMENT = {
-        1: "More frequent service",
-        2: "More accurate schedule times",
-        3: "Fewer transfers or a more direct route",
-        4: "It feels safe at the station and onboard",
-        5: "No improvement needed",
-    }
-
-    improv = []
-
-    for improv_id, improv_name in TRANSIT_IMPROVEMENT.items():
-        count_by_improv = SurveyResponse.objects.filter(
-            city=CITY_CONTEXT[city]["DB_Name"],
-            transit_improvement=improv_id,
-            user_id_id__car_owner=2,  # Filter by car_owner
-        ).count()
-        improv.append({"transit_type": improv_name, "count": count_by_improv})
-    return improv
+    return fill_choice_counts(
+        counts.get("transit_improvement_riders", {}),
+        TRANSIT_IMPROVEMENT,
+        "transit_type",
+    )
@@ -4,39 +4,55 @@ from django.http import HttpResponse, HttpResponseRedirect
 from django.template import loader
 from django.http import Http404, JsonResponse
 from django.urls import reverse
-from django.core.serializers import serialize
 from django.templatetags.static import static
 from django.contrib.gis.geos import GEOSGeometry, MultiLineString, LineString, Point
 from django.views.decorators.cache import cache_page
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+import datetime
 import uuid
 import json
 
-from app.route_rangers_api.utils.metric_processing import (
-    dashboard_metrics,
-    get_daily_ridership,
-    extract_top_ten,
-)
 from app.route_rangers_api.utils.city_mapping import (
     CITY_CONTEXT,
     CITIES_CHOICES_SURVEY,
     MODES_OF_TRANSIT,
-    CITY_RIDERSHIP_LEVEL,
 )
-from app.route_rangers_api.utils.survey_results_processing import (
-    get_number_of_responses,
-    get_transit_use_pct,
-    get_rider_satisfaction,
-    get_transit_mode,
-    get_trip_top,
-    get_transit_improv_drivers_dict,
-    get_transit_improv_riders_dict,
+from app.route_rangers_api.utils.caching import expire_layer, invalidate_layer
+from app.route_rangers_api.utils.dashboard_payloads import (
+    TOP_MODES,
+    DAY_TYPES,
+    routes_payload,
+    stations_payload,
+    routes_compact_payload,
+    stations_compact_payload,
+    user_routes_payload,
+    user_routes_density_payload,
+    survey_flows_payload,
+    metrics_payload,
+    daily_ridership_payload,
+    ridership_payload,
+    top_payload,
+    responses_payload,
+)
+from app.route_rangers_api.utils.map_layers import (
+    USER_ROUTES_PAGE_SIZE,
+    get_user_routes_feed,
+    initial_bbox,
+    snap_bbox,
 )
-from route_rangers_api.models import (
-    TransitRoute,
-    TransitStation,
-    SurveyResponse,
-    SurveyUser,
+from app.route_rangers_api.utils.geometry_processing import (
+    parse_user_route,
+    simplify_user_route,
 )
+from app.route_rangers_api.utils.ridership_series import (
+    GRANULARITIES,
+    ROLLING_WINDOWS,
+    SERIES_MODES,
+)
+from app.route_rangers_api.utils.survey_buffer import submit_survey_page
+from app.route_rangers_api.utils.survey_responses import form_values
+from app.route_rangers_api.utils.static_artifacts import get_fingerprinted_name
 from route_rangers_api.forms import (
     RiderSurvey1,
     RiderSurvey2,
@@ -75,119 +91,16 @@ def about_internal(request, city: str):
     return render(request, "about_internal.html", context)
 
 
-# caching for 6 hours since the data doesn't change often
-@cache_page(60 * 60 * 6)
 def dashboard(request, city: str):
-    # Get existing routes and stations
-    routes = TransitRoute.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-    # reduce load time and data transfer size by overwriting model attribute
-    TOLERANCE = 0.00005
-    for route in routes:
-        simple_geo_representation = route.geo_representation.simplify(
-            tolerance=TOLERANCE, preserve_topology=True
-        )
-        # simplify() might alter the GEOS type; can't allow that
-        if isinstance(simple_geo_representation, LineString):
-            simple_geo_representation = MultiLineString(simple_geo_representation)
-        route.geo_representation = simple_geo_representation
-
-    routes_json = serialize(
-        "geojson",
-        routes,
-        geometry_field="geo_representation",
-        fields=("route_name", "color", "mode"),
-    )
-
-    # Get Stations:
-    stations = TransitStation.objects.filter(city=CITY_CONTEXT[city]["DB_Name"])
-    stations_json = serialize(
-        "geojson", stations, geometry_field="location", fields=("station_name", "mode")
-    )
-
-    # Get user-drawn routes and endpoints
-    user_routes = SurveyResponse.objects.filter(
-        city=CITY_CONTEXT[city]["DB_Name"],
-        route__isnull=False,
-        starting_point__isnull=False,
-        end_point__isnull=False,
-    )
-    # reduce load time and data transfer size by overwriting model attribute
-    user_features = []
-    for user_drawn in user_routes:
-        simple_route = user_drawn.route.simplify(
-            tolerance=TOLERANCE, preserve_topology=True
-        )
-        user_drawn.route = simple_route
-        user_features.append(
-            {
-                "type": "Feature",
-                "geometry": {
-                    "type": "GeometryCollection",
-                    "geometries": [
-                        {
-                            "type": "LineString",
-                            "coordinates": [
-                                # TODO: figure out why these are reversed y,x
-                                # instead of x,y
-                                [coord[1], coord[0]]
-                                for coord in user_drawn.route.coords
-                            ],
-                        },
-                        {
-                            "type": "Point",
-                            "coordinates": [
-                                user_drawn.starting_point.x,
-                                user_drawn.starting_point.y,
-                            ],
-                        },
-                        {
-                            "type": "Point",
-                            "coordinates": [
-                                user_drawn.end_point.x,
-                                user_drawn.end_point.y,
-                            ],
-                        },
-                    ],
-                },
-                "properties": {"id": user_drawn.id},
-            }
-        )
-
-    # When you make a geoJSON yourself, you don't need to serialize it
-    user_drawn_json = {"type": "FeatureCollection", "features": user_features}
-
+    """
+    Dashboard shell, the map layers, cards and graphs are fetched by the
+    browser from the api_* endpoints below
+    """
     city_name = CITY_CONTEXT[city]["CityName"]
 
-    # Get dashboard metrics:
-    dashboard_dict = dashboard_metrics(city)
-
-    # Get daily ridership:
-    daily_ridership_json = get_daily_ridership(city)
-
-    # Get top transit stations:
-    top_bus_weekend = extract_top_ten(
-        city=city, mode=3, transit_unit=CITY_RIDERSHIP_LEVEL[city]["bus"], weekday=False
-    )
-    top_subway_weekend = extract_top_ten(
-        city=city,
-        mode=CITY_CONTEXT[city]["subway_mode"],
-        transit_unit=CITY_RIDERSHIP_LEVEL[city]["subway"],
-        weekday=False,
-    )
-    top_bus_weekday = extract_top_ten(
-        city=city, mode=3, transit_unit=CITY_RIDERSHIP_LEVEL[city]["bus"], weekday=True
-    )
-    top_subway_weekday = extract_top_ten(
-        city=city,
-        mode=CITY_CONTEXT[city]["subway_mode"],
-        transit_unit=CITY_CONTEXT[city]["subway_level"],
-        weekday=True,
-    )
-
     context = {
         "City": CITY_CONTEXT[city]["CityName"],
         "City_NoSpace": city,
-        "citydata": dashboard_dict,
         "heatmaplabel": f"{city_name} By Census Tract",
         "about_class": "cs-li-link",
         "cities_class": "cs-li-link",
@@ -195,15 +108,11 @@ def dashboard(request, city: str):
         "survey_class": "cs-li-link",
         "feedback_class": "cs-li-link",
         "coordinates": CITY_CONTEXT[city]["Coordinates"],
-        "stations": stations_json,
-        "daily_ridership": daily_ridership_json,
-        "top_bus_weekend": top_bus_weekend,
-        "top_bus_weekday": top_bus_weekday,
-        "top_subway_weekend": top_subway_weekend,
-        "top_subway_weekday": top_subway_weekday,
+        "initial_bbox": ",".join(str(value) for value in initial_bbox(city)),
         "lineplot": CITY_CONTEXT[city]["lineplot"],
-        "geojsonfilepath": static(CITY_CONTEXT[city]["geojsonfilepath"]),
-        "routes": routes_json,
+        "geojsonfilepath": static(
+            get_fingerprinted_name(CITY_CONTEXT[city]["geojsonfilepath"])
+        ),
         "heatmap_categories": [
             "median_income",
             "total_weighted_commute_time",
@@ -236,12 +145,225 @@ def dashboard(request, city: str):
             "Percent of people who commute via subway": "percentage_public_to_work",
             "Population": "population",
         },
-        "user_drawn": user_drawn_json,
     }
 
     return render(request, "dashboard.html", context)
 
 
+def check_city(city: str) -> None:
+    """
+    Raise a 404 for cities we don't have data for
+    """
+    if city not in CITY_CONTEXT:
+        raise Http404(f"No data for {city}")
+
+
+def get_mode_param(request):
+    """
+    Return the mode of transit passed as the `mode` query parameter, if any
+    """
+    mode = request.GET.get("mode")
+    if mode is None:
+        return None
+    if not mode.isdigit():
+        raise Http404(f"Invalid mode of transit: {mode}")
+    return int(mode)
+
+
+def json_response(payload: str) -> HttpResponse:
+    """
+    Return an already serialized JSON payload
+    """
+    return HttpResponse(payload, content_type="application/json")
+
+
+def is_compact_request(request) -> bool:
+    """
+    Check if the compact binary encoding (see utils.compact_geometry) was
+    requested with `format=compact` instead of GeoJSON
+    """
+    layer_format = request.GET.get("format", "geojson")
+    if layer_format not in ("geojson", "compact"):
+        raise Http404(f"Invalid format: {layer_format}")
+    return layer_format == "compact"
+
+
+def compact_response(payload: bytes) -> HttpResponse:
+    return HttpResponse(payload, content_type="application/octet-stream")
+
+
+def get_bbox_param(request):
+    """
+    Return the bounding box passed as `bbox=min_lon,min_lat,max_lon,max_lat`,
+    if any, snapped outwards to a grid so it can be cached
+    """
+    bbox = request.GET.get("bbox")
+    if bbox is None:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = [float(value) for value in bbox.split(",")]
+    except ValueError:
+        raise Http404(f"Invalid bbox: {bbox}")
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise Http404(f"Invalid bbox: {bbox}")
+    return snap_bbox((min_lon, min_lat, max_lon, max_lat))
+
+
+def api_routes(request, city: str):
+    check_city(city)
+    mode = get_mode_param(request)
+    bbox = get_bbox_param(request)
+    if is_compact_request(request):
+        return compact_response(routes_compact_payload(city, mode, bbox))
+    return json_response(routes_payload(city, mode, bbox))
+
+
+def api_stations(request, city: str):
+    check_city(city)
+    mode = get_mode_param(request)
+    bbox = get_bbox_param(request)
+    if is_compact_request(request):
+        return compact_response(stations_compact_payload(city, mode, bbox))
+    return json_response(stations_payload(city, mode, bbox))
+
+
+def api_user_routes(request, city: str):
+    check_city(city)
+    return json_response(user_routes_payload(city))
+
+
+def get_int_param(request, name: str, default: int, maximum: int = None) -> int:
+    """
+    Return a non negative integer query parameter, capped at maximum
+    """
+    value = request.GET.get(name)
+    if value is None:
+        return default
+    if not value.isdigit():
+        raise Http404(f"Invalid {name}: {value}")
+    return min(int(value), maximum) if maximum is not None else int(value)
+
+
+def get_datetime_param(request, name: str):
+    """
+    Return a date (2024-05-01) or datetime (2024-05-01T08:00) query parameter
+    """
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise Http404(f"Invalid {name}: {value}")
+        parsed = datetime.datetime.combine(parsed_date, datetime.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def api_user_routes_density(request, city: str):
+    """
+    Number of user-drawn routes crossing, starting and ending in each cell of
+    a grid over the city, see utils.route_density
+    """
+    check_city(city)
+    return json_response(user_routes_density_payload(city))
+
+
+def api_survey_flows(request, city: str):
+    """
+    Number of survey trips between each pair of census tracts by mode and
+    time of day, see utils.survey_flows
+    """
+    check_city(city)
+    return json_response(survey_flows_payload(city))
+
+
+def api_user_routes_feed(request, city: str):
+    """
+    Routes drawn by users after the `after` cursor (a response id), in pages
+    of at most `limit`, optionally only those submitted in [since, until)
+    """
+    check_city(city)
+    feed = get_user_routes_feed(
+        city,
+        after=get_int_param(request, "after", 0),
+        limit=get_int_param(
+            request, "limit", USER_ROUTES_PAGE_SIZE, maximum=USER_ROUTES_PAGE_SIZE
+        ),
+        since=get_datetime_param(request, "since"),
+        until=get_datetime_param(request, "until"),
+    )
+    return json_response(feed)
+
+
+def api_metrics(request, city: str):
+    check_city(city)
+    return json_response(metrics_payload(city))
+
+
+def api_daily_ridership(request, city: str):
+    check_city(city)
+    return json_response(daily_ridership_payload(city))
+
+
+def get_date_param(request, name: str):
+    """
+    Return a date (2024-05-01) query parameter
+    """
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise Http404(f"Invalid {name}: {value}")
+    return parsed
+
+
+def api_ridership(request, city: str):
+    """
+    Ridership by `granularity` (day, week or month) between `start` and `end`
+    (exclusive) for `mode` (all, bus or subway), with the `rolling` 7 or 28
+    day average if asked for
+    """
+    check_city(city)
+    granularity = request.GET.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        raise Http404(f"Invalid granularity: {granularity}")
+    mode = request.GET.get("mode", "all")
+    if mode not in SERIES_MODES:
+        raise Http404(f"Invalid mode of transit: {mode}")
+    rolling = request.GET.get("rolling")
+    if rolling is not None:
+        if not rolling.isdigit() or int(rolling) not in ROLLING_WINDOWS:
+            raise Http404(f"Invalid rolling window: {rolling}")
+        rolling = int(rolling)
+    start = get_date_param(request, "start")
+    end = get_date_param(request, "end")
+    if start is not None and end is not None and start >= end:
+        raise Http404(f"Invalid date range: {start} to {end}")
+
+    return json_response(
+        ridership_payload(city, granularity, mode, start, end, rolling)
+    )
+
+
+def api_top(request, city: str, mode: str):
+    """
+    Top 10 bus or subway stations/routes, `day_type` is either weekday
+    (default) or weekend
+    """
+    check_city(city)
+    if mode not in TOP_MODES:
+        raise Http404(f"No top 10 for {mode}")
+    day_type = request.GET.get("day_type", "weekday")
+    if day_type not in DAY_TYPES:
+        raise Http404(f"Invalid day type: {day_type}")
+
+    return json_response(top_payload(city, mode, day_type))
+
+
 def survey_p1(request, city: str):
     """
     Survey intro page
@@ -253,13 +375,18 @@ def survey_p1(request, city: str):
     if request.method == "POST":
         # create new SurveyUser object
         city_survey = CITIES_CHOICES_SURVEY[city]
-        survey_answer = SurveyUser(user_id=request.session["uuid"], city=city_survey)
-
-        update_survey = RiderSurvey1(request.POST, instance=survey_answer)
-        # update and save
-        update_survey.save()
+        form = RiderSurvey1(request.POST)
+        if form.is_valid():
+            # written now or through the buffer, see utils.survey_buffer
+            submit_survey_page(
+                "user",
+                user_id=request.session["uuid"],
+                city=city_survey,
+                values=form_values(form),
+            )
+            expire_layer(city, "responses")
 
-        return redirect(reverse("app:survey_p2", kwargs={"city": city}))
+            return redirect(reverse("app:survey_p2", kwargs={"city": city}))
 
     else:  # GET
         form = RiderSurvey1()
@@ -280,46 +407,50 @@ def survey_p2(request, city: str, user_id: str = None):
     if request.method == "POST":
         # post form data to database
         city_survey = CITIES_CHOICES_SURVEY[city]
+        form = RiderSurvey2(request.POST)
+        # Validate the line string drawn, clipped to the city
         try:
-            survey_answer = SurveyResponse.objects.get(
-                user_id_id=user_id, city=city_survey, route_id=route_id
+            route = parse_user_route(
+                request.POST.get("lineString"), CITY_CONTEXT[city]["BBox"]
             )
-            survey_answer = RiderSurvey2(request.POST, instance=survey_answer)
-        except Exception as e:
-            print(e)
-            survey_answer = SurveyResponse(
-                user_id_id=user_id, city=city_survey, route_id=route_id
+        except ValueError as e:
+            form.add_error(None, str(e))
+        if form.is_valid():
+            # Access the first and last points
+            starting_point = route.coords[0]
+            end_point = route.coords[-1]
+
+            # Insert or update the trip in one statement, see
+            # utils.survey_responses
+            submit_survey_page(
+                "trip",
+                user_id=user_id,
+                route_id=route_id,
+                city=city_survey,
+                values={
+                    **form_values(form),
+                    "route": route,
+                    "route_simplified": simplify_user_route(route),
+                    "starting_point": Point(starting_point),
+                    "end_point": Point(end_point),
+                },
             )
-            print(f"survey answer pg 2: {survey_answer}")
-            survey_answer = RiderSurvey2(request.POST, instance=survey_answer)
-
-        # Get the line string data and update database
-        post_line_string = request.POST.get("lineString")
-        # Convert the string to a list of tuples
-        line_string_coords = json.loads(post_line_string)
-        # Create a LineString object
-        route = LineString(line_string_coords)
-        # Access the first and last points
-        starting_point = route.coords[0]
-        end_point = route.coords[-1]
-
-        # Update row in database
-
-        survey_answer.route = route
-        survey_answer.starting_point = Point(starting_point)
-        survey_answer.end_point = Point(end_point)
-        survey_answer.save()
-
-        # return selected mode of transit from form
-        selected_mode_index = survey_answer.cleaned_data["modes_of_transit"]
-        selected_mode = MODES_OF_TRANSIT[selected_mode_index]
-
-        if selected_mode == "Train" or selected_mode == "Bus":
-            return redirect(reverse("app:survey_p3", kwargs={"city": city}))
-        elif selected_mode == "Car" or selected_mode == "Rideshare":
-            return redirect(reverse("app:survey_p4", kwargs={"city": city}))
-        else:
-            return redirect(reverse("app:survey_p5", kwargs={"city": city}))
+            expire_layer(city, "responses")
+            expire_layer(city, "user_routes_density")
+            expire_layer(city, "survey_flows")
+            # only the user-drawn routes layer of the dashboard is now outdated
+            invalidate_layer(city, "user_routes")
+
+            # return selected mode of transit from form
+            selected_mode_index = form.cleaned_data["modes_of_transit"]
+            selected_mode = MODES_OF_TRANSIT[selected_mode_index]
+
+            if selected_mode == "Train" or selected_mode == "Bus":
+                return redirect(reverse("app:survey_p3", kwargs={"city": city}))
+            elif selected_mode == "Car" or selected_mode == "Rideshare":
+                return redirect(reverse("app:survey_p4", kwargs={"city": city}))
+            else:
+                return redirect(reverse("app:survey_p5", kwargs={"city": city}))
 
     else:  # GET
         form = RiderSurvey2()
@@ -338,23 +469,29 @@ def survey_p3(request, city: str):
     print(request.method)
 
     if request.method == "POST":
-        survey_answer = SurveyResponse.objects.get(
-            user_id_id=user_id, route_id=route_id
-        )
-        update_survey = RiderSurvey3(request.POST, instance=survey_answer)
-        update_survey.save()
+        city_survey = CITIES_CHOICES_SURVEY[city]
+        form = RiderSurvey3(request.POST)
+        if form.is_valid():
+            submit_survey_page(
+                "trip",
+                user_id=user_id,
+                route_id=route_id,
+                city=city_survey,
+                values=form_values(form),
+            )
+            expire_layer(city, "responses")
 
-        # check if user has another trip to report
-        another_trip = update_survey.cleaned_data["another_trip"]
+            # check if user has another trip to report
+            another_trip = form.cleaned_data["another_trip"]
 
-        # Not recognizing T/F as booleans so using string
-        if another_trip == "True" and int(route_id) < 3:
-            route_id += 1
-            print(route_id)
-            request.session["route_id"] = route_id
-            return redirect(reverse("app:survey_p2", kwargs={"city": city}))
-        else:
-            return redirect(reverse("app:thanks", kwargs={"city": city}))
+            # Not recognizing T/F as booleans so using string
+            if another_trip == "True" and int(route_id) < 3:
+                route_id += 1
+                print(route_id)
+                request.session["route_id"] = route_id
+                return redirect(reverse("app:survey_p2", kwargs={"city": city}))
+            else:
+                return redirect(reverse("app:thanks", kwargs={"city": city}))
 
     else:  # GET
         form = RiderSurvey3()
@@ -372,22 +509,26 @@ def survey_p4(request, city: str):
     route_id = request.session.get("route_id")
     print(request.method)
     if request.method == "POST":
-        survey_answer = SurveyResponse.objects.get(
-            user_id_id=user_id, route_id=route_id
-        )
-        update_survey = RiderSurvey4(request.POST, instance=survey_answer)
-        update_survey.save()
+        form = RiderSurvey4(request.POST)
+        if form.is_valid():
+            submit_survey_page(
+                "trip",
+                user_id=user_id,
+                route_id=route_id,
+                city=CITIES_CHOICES_SURVEY[city],
+                values=form_values(form),
+            )
 
-        # check if user has another trip to report
-        another_trip = update_survey.cleaned_data["another_trip"]
+            # check if user has another trip to report
+            another_trip = form.cleaned_data["another_trip"]
 
-        if another_trip == "True" and int(route_id) < 3:
-            route_id += 1
-            print(route_id)
-            request.session["route_id"] = route_id
-            return redirect(reverse("app:survey_p2", kwargs={"city": city}))
-        else:
-            return redirect(reverse("app:thanks", kwargs={"city": city}))
+            if another_trip == "True" and int(route_id) < 3:
+                route_id += 1
+                print(route_id)
+                request.session["route_id"] = route_id
+                return redirect(reverse("app:survey_p2", kwargs={"city": city}))
+            else:
+                return redirect(reverse("app:thanks", kwargs={"city": city}))
 
     else:  # GET
         form = RiderSurvey4()
@@ -446,20 +587,15 @@ def thanks(request, city: str):
 def responses(request, city: str):
     context = {
         "City": CITY_CONTEXT[city]["CityName"],
-        "Response": get_number_of_responses(city),
         "City_NoSpace": city,
-        "Riders": get_transit_use_pct(city),
         "about_class": "cs-li-link",
         "cities_class": "cs-li-link",
         "policy_class": "cs-li-link ",
         "survey_class": "cs-li-link",
         "feedback_class": "cs-li-link cs-active",
         "coordinates": CITY_CONTEXT[city]["Coordinates"],
-        "ridersatisfaction": get_rider_satisfaction(city),
-        "transit_mode_graph": get_transit_mode(city),
-        "toptengraph": get_trip_top(city),
-        "tranrideimprov_rider": get_transit_improv_riders_dict(city),
-        "tranrideimprov_drivers": get_transit_improv_drivers_dict(city),
+        # survey results: Response, Riders, ridersatisfaction and graphs
+        **responses_payload(city),
     }
     return render(request, "responses.html", context)
 
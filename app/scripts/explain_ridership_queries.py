@@ -0,0 +1,70 @@
+"""
+Print the query plans and timings of the ridership access paths used by the
+dashboard, to check that the indexes on RidershipRoute/RidershipStation are
+used. Month filters are run both with EXTRACT (date__month, how they used to
+be written) and with the half-open date range used now. Django already turns
+date__year into a BETWEEN, so yearly filters are only run as a range.
+Weekends are also filtered by the stored day_type instead of the day of the
+week of every row.
+
+Usage:
+    python -m manage runscript explain_ridership_queries --script-args <city> <year>
+"""
+
+import datetime
+from django.db import connection
+from django.db.models import Count, Q, Sum
+
+from route_rangers_api.models import RidershipRoute, RidershipStation
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.service_calendar import WEEKEND_DAY_TYPES
+
+
+def explain(label: str, queryset) -> None:
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+        plan = [row[0] for row in cursor.fetchall()]
+    print(f"\n### {label}")
+    print("\n".join(plan))
+
+
+def run(city: str = "NewYork", year: str = "2023"):
+    db_name = CITY_CONTEXT[city]["DB_Name"]
+    start = datetime.date(int(year), 1, 1)
+    end = datetime.date(int(year) + 1, 1, 1)
+    month_start = datetime.date(int(year), 7, 1)
+    month_end = datetime.date(int(year), 8, 1)
+
+    for model, fk in [(RidershipStation, "station"), (RidershipRoute, "route")]:
+        name = model.__name__
+        yearly = model.objects.filter(city=db_name)
+        explain(
+            f"{name} yearly total by mode, half-open range",
+            yearly.filter(date__gte=start, date__lt=end)
+            .values(f"{fk}__mode")
+            .annotate(total=Sum("ridership")),
+        )
+        weekend = Q(date__week_day=1) | Q(date__week_day=7)
+        explain(
+            f"{name} monthly weekend averages, EXTRACT(month)",
+            yearly.filter(weekend, date__year=int(year), date__month=7)
+            .values(f"{fk}__mode", "date")
+            .annotate(avg_ridership=Sum("ridership") / Count("ridership")),
+        )
+        explain(
+            f"{name} monthly weekend averages, half-open range",
+            yearly.filter(weekend, date__gte=month_start, date__lt=month_end)
+            .values(f"{fk}__mode", "date")
+            .annotate(avg_ridership=Sum("ridership") / Count("ridership")),
+        )
+        explain(
+            f"{name} monthly weekend averages, half-open range and day_type",
+            yearly.filter(
+                day_type__in=WEEKEND_DAY_TYPES,
+                date__gte=month_start,
+                date__lt=month_end,
+            )
+            .values(f"{fk}__mode", "date")
+            .annotate(avg_ridership=Sum("ridership") / Count("ridership")),
+        )
@@ -10,6 +10,11 @@ import os
 import pytz
 from dotenv import load_dotenv
 from app.scripts.utils import make_request, build_start_end_date_str
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
+from route_rangers_api.utils.ridership_rollup import refresh_daily_ridership
+from route_rangers_api.utils.leaderboards import rebuild_leaderboards, periods_between
+from route_rangers_api.utils.ridership_partitions import ensure_ridership_partitions
+from route_rangers_api.utils.service_calendar import get_day_type
 from route_rangers_api.models import (
     TransitRoute,
     RidershipRoute,
@@ -145,7 +150,11 @@ def ingest_daily_bus_ridership(daily_bus_json, date: datetime.date) -> None:
             ).first()
             obs_route_id = obs_route.id
             obs = RidershipRoute(
-                route_id=obs_route_id, date=date, ridership=row["rides"]
+                route_id=obs_route_id,
+                city="CHI",
+                date=date,
+                day_type=get_day_type(date),
+                ridership=row["rides"],
             )
             obs.save()
         except IntegrityError:
@@ -192,7 +201,11 @@ def ingest_daily_subway_ridership(daily_subway_json, date: datetime.date) -> Non
             )
             obs_station_id = obs_station.id
             obs = RidershipStation(
-                station_id=obs_station_id, date=date, ridership=row["rides"]
+                station_id=obs_station_id,
+                city="CHI",
+                date=date,
+                day_type=get_day_type(date),
+                ridership=row["rides"],
             )
             obs.save()
         except IntegrityError:
@@ -221,6 +234,8 @@ def run(
         tzinfo=CHI_TZ
     )
 
+    ensure_ridership_partitions(range(start_date.year, end_date.year + 1))
+
     if transit_type in ["subway", "both"]:
         print("Ingesting subway ridership data into RidershipStation")
         ingest_subway_ridership(start_date=start_date, end_date=end_date)
@@ -228,3 +243,11 @@ def run(
     if transit_type in ["bus", "both"]:
         print("Ingesting bus ridership data into RouteRidership")
         ingest_bus_ridership(start_date=start_date, end_date=end_date)
+
+    print("Updating daily ridership rollup")
+    refresh_daily_ridership("CHI", start_date.date(), end_date.date())
+    print("Rebuilding top stations and routes")
+    rebuild_leaderboards("CHI", periods_between(start_date, end_date))
+
+    print("Refreshing cached dashboard data for Chicago")
+    refresh_city_cache("Chicago")
@@ -7,6 +7,11 @@ import logging
 from dotenv import load_dotenv
 from django.db import IntegrityError
 from app.scripts.utils import make_request, build_start_end_date_str
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
+from route_rangers_api.utils.ridership_rollup import refresh_daily_ridership
+from route_rangers_api.utils.leaderboards import rebuild_leaderboards, periods_between
+from route_rangers_api.utils.ridership_partitions import ensure_ridership_partitions
+from route_rangers_api.utils.service_calendar import get_day_type
 from route_rangers_api.models import (
     TransitRoute,
     RidershipRoute,
@@ -133,7 +138,13 @@ def ingest_daily_bus_ridership(daily_bus_json, date: datetime.date) -> None:
             obs_route = TransitRoute.objects.get(city="NYC", route_id=row["bus_route"])
             obs_route_id = obs_route.id
             ridership = int(float(row["total_ridership"]))
-            obs = RidershipRoute(route_id=obs_route_id, date=date, ridership=ridership)
+            obs = RidershipRoute(
+                route_id=obs_route_id,
+                city="NYC",
+                date=date,
+                day_type=get_day_type(date),
+                ridership=ridership,
+            )
             obs.save()
         except IntegrityError:
             print(f"{row['bus_route']} - {row['date']} already ingested")
@@ -177,7 +188,11 @@ def ingest_daily_subway_ridership(daily_subway_json, date: datetime.date) -> Non
             obs_station_id = obs_station.id
             ridership = int(float(row["total_ridership"]))
             obs = RidershipStation(
-                station_id=obs_station_id, date=date, ridership=ridership
+                station_id=obs_station_id,
+                city="NYC",
+                date=date,
+                day_type=get_day_type(date),
+                ridership=ridership,
             )
             obs.save()
         except IntegrityError:
@@ -204,6 +219,8 @@ def run(
         tzinfo=NY_TZ
     )
 
+    ensure_ridership_partitions(range(start_date.year, end_date.year + 1))
+
     if transit_type in ["subway", "both"]:
         print("Ingesting subway ridership data into RidershipStation")
         ingest_subway_ridership(start_date=start_date, end_date=end_date)
@@ -211,3 +228,11 @@ def run(
     if transit_type in ["bus", "both"]:
         print("Ingesting bus ridership data into RouteRidership")
         ingest_bus_ridership(start_date=start_date, end_date=end_date)
+
+    print("Updating daily ridership rollup")
+    refresh_daily_ridership("NYC", start_date.date(), end_date.date())
+    print("Rebuilding top stations and routes")
+    rebuild_leaderboards("NYC", periods_between(start_date, end_date))
+
+    print("Refreshing cached dashboard data for New York")
+    refresh_city_cache("NewYork")
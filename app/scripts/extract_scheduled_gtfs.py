@@ -9,6 +9,10 @@ from datetime import datetime
 
 from django.contrib.gis.geos import GEOSGeometry, LineString, Point, MultiLineString
 from route_rangers_api.models import TransitStation, TransitRoute, StationRouteRelation
+from route_rangers_api.utils.geometry_processing import (
+    get_route_simplification_levels,
+)
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
 from django.db.utils import IntegrityError
 
 # to avoid a namespace conflict when creating shapely MultiLineStrings in geopandas
@@ -263,13 +267,16 @@ def ingest_transit_routes(geom_shapes: gpd.GeoDataFrame) -> None:
     for i, row in geom_shapes.iterrows():
         print(f"Now ingesting route {i}...")
         print(row["route_id"])
+        geo_representation = GEOSGeometry(row["geometry"])
         obs = TransitRoute(
             city=row["city"],
             route_id=row["route_id"],
             route_name=row["route_long_name"],
             color=row["route_color"],
-            geo_representation=GEOSGeometry(row["geometry"]),
+            geo_representation=geo_representation,
             mode=row["route_type"],
+            # simplify once here so views never have to do it per request
+            **get_route_simplification_levels(geo_representation),
         )
         print(
             f"Observation created: {obs.city}, {obs.route_id}, "
@@ -345,9 +352,11 @@ def ingest_multiple_feeds(
     a list.
     """
 
+    ingested_cities = set()
     for url in feed_url_list:
         print(f"Getting static GTFS transit feed from {url}...")
         city, agency, feed = get_gtfs_feed(url)
+        ingested_cities.add(city)
         print(f"{city} {agency} feed acquired from URL")
         gtfs_df_dict = get_gtfs_component_dfs(city, feed)
 
@@ -377,6 +386,10 @@ def ingest_multiple_feeds(
         # TODO: Consider doing an ingestion of transfers.txt if it exists
         # TODO: Consider reading out stdout to a log for inspection of ingestion errors
 
+    for city in ingested_cities:
+        print(f"Refreshing cached dashboard data for {city}")
+        refresh_city_cache(city)
+
 
 def run():
     """TODO: Build out into a script that gets GTFS feed for
@@ -0,0 +1,29 @@
+"""
+Apply the survey answers buffered in SURVEY_WRITE_BUFFER to the database, in
+one transaction per batch. Run it once to empty the buffer or with watch=yes
+next to the web server while the buffer is on.
+
+Usage:
+    python -m manage runscript flush_survey_buffer --script-args <watch> <batch_size>
+"""
+
+import time
+
+from route_rangers_api.utils.survey_buffer import flush_survey_buffer
+
+# seconds between checks of an empty buffer
+WATCH_INTERVAL = 1
+
+
+def run(watch: str = "no", batch_size: str = "500"):
+    """
+    Flush the buffer until it is empty, and keep flushing if watch="yes"
+    """
+    while True:
+        n_pages = flush_survey_buffer(int(batch_size))
+        if n_pages:
+            print(f"Flushed {n_pages} survey pages")
+        elif watch == "yes":
+            time.sleep(WATCH_INTERVAL)
+        else:
+            break
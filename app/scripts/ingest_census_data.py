@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 from django.db import IntegrityError
 from route_rangers_api.models import Demographics
 from route_rangers_api.utils.city_mapping import CITY_FIPS
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
 
 ###############################################################################
 # SETUP
@@ -193,6 +194,10 @@ def run():
             upload_census_data(clean_data)
         logging.info(f"{city.upper()} data ingested.")
 
+    # census data feeds the commuter share cards of every city
+    for city in ["Portland", "Chicago", "NewYork"]:
+        refresh_city_cache(city)
+
 
 if __name__ == "__main__":
     run()
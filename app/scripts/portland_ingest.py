@@ -47,6 +47,11 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "geodjango.settings")
 django.setup()
 
 from route_rangers_api.models import TransitStation, RidershipStation
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
+from route_rangers_api.utils.ridership_rollup import refresh_daily_ridership
+from route_rangers_api.utils.leaderboards import rebuild_leaderboards, periods_between
+from route_rangers_api.utils.ridership_partitions import ensure_ridership_partitions
+from route_rangers_api.utils.service_calendar import get_day_type
 
 
 def format_input_ridership_data(
@@ -99,8 +104,10 @@ def ingest_pdx_ridership_data(
 
                     ridership_obj = RidershipStation.objects.create(
                         date=date_obj,
+                        day_type=get_day_type(date_obj),
                         ridership=record["ridership"],
                         station_id=foreign_key,
+                        city="PDX",
                     )
 
                     if foreign_key % 10 == 0:
@@ -136,7 +143,11 @@ def run():
     """
     start_date = datetime(2023, 7, 2)
     end_date = datetime(2023, 7, 31)
+    ensure_ridership_partitions(range(start_date.year, end_date.year + 1))
     ingest_pdx_ridership_data(json_file_path, start_date, end_date)
+    refresh_daily_ridership("PDX", start_date.date(), end_date.date())
+    rebuild_leaderboards("PDX", periods_between(start_date, end_date))
+    refresh_city_cache("Portland")
 
 
 if __name__ == "__main__":
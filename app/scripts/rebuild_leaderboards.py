@@ -0,0 +1,34 @@
+"""
+Rebuild the top stations and routes of the dashboard from the ingested
+ridership. The ingestion scripts do it for the dates they ingest, this is for
+doing it by hand (i.e. after correcting ridership already ingested).
+
+Usage:
+    python -m manage runscript rebuild_leaderboards --script-args <city> <start_date> <end_date>
+"""
+
+import datetime
+
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.dashboard_payloads import refresh_city_cache
+from route_rangers_api.utils.leaderboards import rebuild_leaderboards, periods_between
+
+
+def run(
+    city: str = "all",
+    start_date_str: str = "2023-01-01",
+    end_date_str: str = "2023-12-31",
+):
+    """
+    Rebuild the leaderboards of one city (as named in the urls, i.e. NewYork)
+    or all of them for the years and months between the two dates
+    """
+    start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
+    end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
+    periods = periods_between(start_date, end_date)
+
+    cities = CITY_CONTEXT.keys() if city == "all" else [city]
+    for city_name in cities:
+        n_rows = rebuild_leaderboards(CITY_CONTEXT[city_name]["DB_Name"], periods)
+        print(f"Wrote {n_rows} leaderboard rows for {city_name}")
+        refresh_city_cache(city_name)
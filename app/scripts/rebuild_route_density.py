@@ -0,0 +1,24 @@
+"""
+Recount the user-drawn routes on the density grid of the dashboard from the
+survey responses. survey_p2 keeps the grid up to date, this is for filling it
+the first time or after changing the cell size.
+
+Usage:
+    python -m manage runscript rebuild_route_density --script-args <city>
+"""
+
+from route_rangers_api.utils.caching import invalidate_layer
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.route_density import rebuild_route_density
+
+
+def run(city: str = "all"):
+    """
+    Rebuild the grid of one city (as named in the urls, i.e. NewYork) or all
+    of them
+    """
+    cities = CITY_CONTEXT.keys() if city == "all" else [city]
+    for city_name in cities:
+        n_cells = rebuild_route_density(CITY_CONTEXT[city_name]["DB_Name"])
+        invalidate_layer(city_name, "user_routes_density")
+        print(f"Wrote {n_cells} route density cells for {city_name}")
@@ -0,0 +1,24 @@
+"""
+Recount the survey answers of the responses page from the survey tables. The
+survey views keep the counters up to date, this is for fixing them by hand
+(i.e. after deleting test responses).
+
+Usage:
+    python -m manage runscript rebuild_survey_counters --script-args <city>
+"""
+
+from route_rangers_api.utils.caching import invalidate_layer
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.survey_counters import rebuild_survey_counters
+
+
+def run(city: str = "all"):
+    """
+    Rebuild the counters of one city (as named in the urls, i.e. NewYork) or
+    all of them
+    """
+    cities = CITY_CONTEXT.keys() if city == "all" else [city]
+    for city_name in cities:
+        n_counters = rebuild_survey_counters(CITY_CONTEXT[city_name]["DB_Name"])
+        invalidate_layer(city_name, "responses")
+        print(f"Wrote {n_counters} survey counters for {city_name}")
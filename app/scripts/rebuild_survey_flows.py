@@ -0,0 +1,24 @@
+"""
+Locate the survey responses in the census tracts again and recount the
+origin-destination matrix of the survey trips. survey_p2 keeps the matrix up
+to date, this is for filling it after the tract geometries are (re)ingested.
+
+Usage:
+    python -m manage runscript rebuild_survey_flows --script-args <city>
+"""
+
+from route_rangers_api.utils.caching import invalidate_layer
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.survey_flows import rebuild_survey_flows
+
+
+def run(city: str = "all"):
+    """
+    Rebuild the matrix of one city (as named in the urls, i.e. NewYork) or all
+    of them
+    """
+    cities = CITY_CONTEXT.keys() if city == "all" else [city]
+    for city_name in cities:
+        n_flows = rebuild_survey_flows(CITY_CONTEXT[city_name]["DB_Name"])
+        invalidate_layer(city_name, "survey_flows")
+        print(f"Wrote {n_flows} survey trip flows for {city_name}")
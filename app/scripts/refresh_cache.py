@@ -0,0 +1,25 @@
+"""
+Bump the data version of a city and regenerate the dashboard and responses
+payloads ahead of traffic. Ingestion scripts call refresh_city_cache() when
+they finish, this script is for running it by hand (i.e. after a deploy).
+
+Usage:
+    python -m manage runscript refresh_cache --script-args <city> <bump>
+"""
+
+from route_rangers_api.utils.caching import bump_data_version
+from route_rangers_api.utils.city_mapping import CITY_CONTEXT
+from route_rangers_api.utils.dashboard_payloads import warm_city_cache
+
+
+def run(city: str = "all", bump: str = "yes"):
+    """
+    Refresh one city (as named in the urls, i.e. NewYork) or all of them.
+    Pass bump="no" to only warm the cache for the current data version.
+    """
+    cities = CITY_CONTEXT.keys() if city == "all" else [city]
+    for city_name in cities:
+        if bump == "yes":
+            bump_data_version(city_name)
+        warm_city_cache(city_name)
+    print("Cache refresh complete")
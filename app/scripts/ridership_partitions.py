@@ -0,0 +1,26 @@
+"""
+Create the ridership partitions of some years ahead of ingesting them, or
+detach the partitions of a year no longer shown in the dashboard. Detached
+partitions are left as standalone tables to archive and drop by hand.
+
+Usage:
+    python -m manage runscript ridership_partitions --script-args create <year> [<year> ...]
+    python -m manage runscript ridership_partitions --script-args detach <year>
+"""
+
+from route_rangers_api.utils.ridership_partitions import (
+    ensure_ridership_partitions,
+    detach_ridership_year,
+)
+
+
+def run(action: str = "create", *years: str):
+    if action == "create":
+        ensure_ridership_partitions(int(year) for year in years)
+        print(f"Ridership partitions ready for {', '.join(years)}")
+    elif action == "detach":
+        for year in years:
+            for partition in detach_ridership_year(int(year)):
+                print(f"Detached {partition}")
+    else:
+        print(f"Unknown action {action}, use create or detach")